@@ -0,0 +1,192 @@
+# coding: utf-8
+
+"""
+Copyright 2021 João T. Carvalho-Neto, Fernando A. Pedersen and Matheus N. S. Silva
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+****************************************
+Stellector Project Horus 3D parts.
+
+Benchmarks of the part builders
+****************************************
+"""
+
+import sys, os, time, json, subprocess, statistics
+import argparse
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import horus_freecad as hf
+import spiralCoil_freecad as sc
+from horus_build import scriptArgs
+
+
+benchParts = hf.horusParts + sorted(sc.coilParts)
+defaultHistory = 'bench_history.json'
+
+
+def timeBuild(name, repeat):
+	"""Menor tempo de construcao da parte (com dependencias) em 'repeat' construcoes e a forma obtida."""
+	best = None
+	for i in range(repeat):
+		t0 = time.perf_counter()
+		shape = hf.build([name])[name]
+		dt = time.perf_counter() - t0
+		best = dt if best is None else min(best, dt)
+	return best, shape
+
+def csgBenchmark(names, repeat):
+	"""Compara, parte a parte, as cadeias booleanas sequenciais com as operacoes agrupadas de csg()."""
+	print('%-20s %12s %12s %8s %10s' % ('parte', 'sequencial', 'agrupado', 'ganho', 'dV/V'))
+	mode = hf.csgMode
+	try:
+		for name in names:
+			hf.csgMode = 'sequential'
+			ts, ss = timeBuild(name, repeat)
+			hf.csgMode = 'batch'
+			tb, sb = timeBuild(name, repeat)
+			dv = abs(sb.Volume - ss.Volume)/ss.Volume
+			print('%-20s %10.2f s %10.2f s %7.2fx %10.2e' % (name, ts, tb, ts/tb, dv))
+	finally:
+		hf.csgMode = mode
+
+def buildPart(name):
+	if name in sc.coilParts:
+		return sc.molaPart(sc.coilParts[name])
+	return hf.build([name])[name]
+
+def measure(name):
+	"""Constroi a parte uma vez (com dependencias, sem cache) neste interpretador; retorna tempo, pico de memoria e topologia."""
+	import resource
+	t0 = time.perf_counter()
+	shape = buildPart(name)
+	dt = time.perf_counter() - t0
+	rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss/1024.0   #kB no Linux
+	return {'time': dt, 'peakRss': rss, 'faces': len(shape.Faces), 'edges': len(shape.Edges), 'solids': len(shape.Solids), 'volume': shape.Volume}
+
+def interpreter():
+	"""Comando que executa este script num interpretador novo (python ou FreeCADCmd)."""
+	if os.path.basename(sys.executable).lower().startswith('freecad'):
+		return [sys.executable, os.path.abspath(__file__), '--pass']
+	return [sys.executable, os.path.abspath(__file__)]
+
+def benchPart(name, repeat):
+	"""Mede 'repeat' construcoes da parte, cada uma num interpretador novo; tempo e a mediana, memoria o maximo."""
+	runs = []
+	for i in range(repeat):
+		out = subprocess.run(interpreter() + ['measure', name], check = True, stdout = subprocess.PIPE, universal_newlines = True).stdout
+		runs.append(json.loads(out.strip().splitlines()[-1]))
+	result = {k: runs[-1][k] for k in ('faces', 'edges', 'solids', 'volume')}
+	result.update(times = [r['time'] for r in runs], time = statistics.median(r['time'] for r in runs), peakRss = max(r['peakRss'] for r in runs))
+	return result
+
+def gitRevision():
+	try:
+		return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd = os.path.dirname(os.path.abspath(__file__)),
+							stdout = subprocess.PIPE, stderr = subprocess.DEVNULL, universal_newlines = True).stdout.strip()
+	except OSError:
+		return ''
+
+def loadHistory(fileName):
+	if not os.path.exists(fileName):
+		return []
+	with open(fileName) as f:
+		return json.load(f)
+
+def runBenchmark(names, repeat, historyFile, label = ''):
+	"""Mede as partes e acrescenta a execucao ao historico JSON; retorna a execucao."""
+	import FreeCAD
+	run = {'date': time.strftime('%Y-%m-%d %H:%M:%S'), 'revision': gitRevision(), 'label': label,
+			'freecad': '.'.join(FreeCAD.Version()[:3]), 'repeat': repeat, 'parts': {}}
+	print('%-20s %10s %10s %7s %7s %7s' % ('parte', 'tempo', 'pico RSS', 'faces', 'arestas', 'solidos'))
+	for name in names:
+		r = run['parts'][name] = benchPart(name, repeat)
+		print('%-20s %8.2f s %7.0f MB %7d %7d %7d' % (name, r['time'], r['peakRss'], r['faces'], r['edges'], r['solids']))
+	history = loadHistory(historyFile)
+	history.append(run)
+	with open(historyFile, 'w') as f:
+		json.dump(history, f, indent = 1)
+	return run
+
+def compareRuns(base, new, threshold):
+	"""Compara duas execucoes do historico; retorna a lista de regressoes (tempo ou memoria acima de 1+threshold
+	vezes a base, ou topologia diferente)."""
+	regressions = []
+	print('%-20s %10s %10s %8s %10s %10s %8s' % ('parte', 'tempo base', 'tempo', 'razao', 'RSS base', 'RSS', 'razao'))
+	for name in new['parts']:
+		if name not in base['parts']:
+			continue
+		b, n = base['parts'][name], new['parts'][name]
+		rt, rm = n['time']/b['time'], n['peakRss']/b['peakRss']
+		flags = []
+		if rt > 1 + threshold:
+			flags.append('tempo')
+		if rm > 1 + threshold:
+			flags.append('memoria')
+		flags += [k for k in ('faces', 'edges', 'solids') if n[k] != b[k]]
+		print('%-20s %8.2f s %8.2f s %7.2fx %7.0f MB %7.0f MB %7.2fx %s' % (name, b['time'], n['time'], rt, b['peakRss'], n['peakRss'], rm, ' '.join(flags)))
+		if flags:
+			regressions.append((name, flags))
+	return regressions
+
+def parseArgs(args):
+	parser = argparse.ArgumentParser(prog = 'horus_bench.py', description = 'Medidas de desempenho da construcao das partes do Horus.')
+	sub = parser.add_subparsers(dest = 'command')
+	p = sub.add_parser('csg', help = 'compara cadeias booleanas sequenciais e agrupadas')
+	p.add_argument('parts', nargs = '*', default = hf.horusParts)
+	p.add_argument('-n', '--repeat', type = int, default = 3, help = 'construcoes por parte (vale o menor tempo)')
+	p = sub.add_parser('run', help = 'mede cada parte em interpretadores novos e acrescenta ao historico')
+	p.add_argument('parts', nargs = '*', default = benchParts)
+	p.add_argument('-n', '--repeat', type = int, default = 3, help = 'construcoes por parte (vale a mediana)')
+	p.add_argument('--history', default = defaultHistory, help = 'arquivo JSON do historico')
+	p.add_argument('--label', default = '', help = 'descricao da execucao')
+	p = sub.add_parser('compare', help = 'compara duas execucoes do historico')
+	p.add_argument('base', nargs = '?', type = int, default = -2, help = 'indice da execucao base (padrao: penultima)')
+	p.add_argument('new', nargs = '?', type = int, default = -1, help = 'indice da execucao comparada (padrao: ultima)')
+	p.add_argument('--history', default = defaultHistory, help = 'arquivo JSON do historico')
+	p.add_argument('--threshold', type = float, default = 0.10, help = 'aumento relativo tolerado de tempo e memoria')
+	p = sub.add_parser('measure', help = 'uma construcao neste interpretador, resultado em JSON (uso interno de run)')
+	p.add_argument('part')
+	opts = parser.parse_args(args)
+	if opts.command is None:
+		parser.error('indique o comando')
+	#csg mede as cadeias booleanas de horus_freecad; as molas so entram em run e measure
+	known = hf.horusParts if opts.command == 'csg' else benchParts
+	names = getattr(opts, 'parts', [opts.part] if opts.command == 'measure' else [])
+	for name in names:
+		if name not in known:
+			parser.error('parte desconhecida: %s (opcoes: %s)' % (name, ', '.join(known)))
+	if getattr(opts, 'repeat', 1) < 1:
+		parser.error('--repeat deve ser pelo menos 1')
+	return opts
+
+def main(args):
+	opts = parseArgs(args)
+	if opts.command == 'csg':
+		csgBenchmark(opts.parts, opts.repeat)
+	elif opts.command == 'run':
+		runBenchmark(opts.parts, opts.repeat, opts.history, opts.label)
+	elif opts.command == 'compare':
+		history = loadHistory(opts.history)
+		if len(history) < 2:
+			sys.exit('historico %s com menos de duas execucoes' % opts.history)
+		regressions = compareRuns(history[opts.base], history[opts.new], opts.threshold)
+		print('%d regressoes acima de %.0f%%' % (len(regressions), 100*opts.threshold))
+		sys.exit(1 if regressions else 0)
+	elif opts.command == 'measure':
+		print(json.dumps(measure(opts.part)))
+
+if __name__ == '__main__':
+	main(scriptArgs(__file__))
@@ -0,0 +1,96 @@
+# coding: utf-8
+
+"""
+Copyright 2021 João T. Carvalho-Neto, Fernando A. Pedersen and Matheus N. S. Silva
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+****************************************
+Stellector Project Horus 3D parts.
+
+Command line build of the Horus parts
+****************************************
+"""
+
+import sys, os, time
+import argparse
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import horus_freecad as hf
+from horus_cache import BrepCache, defaultCacheDir
+
+
+def scriptArgs(script = __file__):
+	"""Argumentos do script, tanto em 'python script.py ...' quanto em 'FreeCADCmd script.py --pass ...'."""
+	args = sys.argv[1:]
+	for i, a in enumerate(sys.argv):
+		if os.path.basename(a) == os.path.basename(script):
+			args = sys.argv[i+1:]
+	return [a for a in args if a != '--pass']
+
+def parseArgs(args):
+	parser = argparse.ArgumentParser(prog = 'horus_build.py', description = 'Constroi as partes do Horus sem a interface grafica.')
+	parser.add_argument('parts', nargs = '*', default = hf.horusParts, help = 'partes a construir (padrao: todas)')
+	parser.add_argument('-j', '--jobs', type = int, default = 1, help = 'numero de processos de construcao em paralelo')
+	parser.add_argument('-o', '--output', default = 'HorusStellector.FCStd', help = 'documento FreeCAD gerado')
+	parser.add_argument('-z', '--compression', type = int, choices = range(10), metavar = '0-9', help = 'nivel de compressao do documento (padrao: preferencia do FreeCAD)')
+	parser.add_argument('--cache', default = defaultCacheDir, help = 'diretorio do cache de formas (BREP)')
+	parser.add_argument('--cache-size', type = float, default = 512, help = 'tamanho maximo do cache [MB]')
+	parser.add_argument('--no-cache', action = 'store_true', help = 'constroi tudo sem consultar o cache')
+	parser.add_argument('--memory', action = 'store_true', help = 'relata o uso de memoria (RSS, pico e formas vivas) apos cada parte')
+	parser.add_argument('--surfaces', action = 'store_true', help = 'relata os tipos de superficie das partes e as faces de forma livre')
+	parser.add_argument('--invalidate', nargs = '*', metavar = 'PARTE', help = 'remove do cache as partes indicadas (todas, se nenhuma) e termina')
+	opts = parser.parse_args(args)
+	for name in opts.parts:
+		if name not in hf.horusParts:
+			parser.error('parte desconhecida: %s (opcoes: %s)' % (name, ', '.join(hf.horusParts)))
+	return opts
+
+def surfaceReport(parts):
+	"""Tipos de superficie de cada parte, com alerta para as que tem faces de forma livre (B-spline)."""
+	lines = []
+	for name, shape in parts.items():
+		types = hf.surfaceTypes(shape)
+		free = hf.freeFormFaces(shape)
+		lines.append('%-20s %s%s' % (name, ', '.join('%s %d' % t for t in sorted(types.items())),
+									'  <- faces de forma livre: %s' % ' '.join('Face%d' % (i+1) for i in free) if free else ''))
+	return '\n'.join(lines)
+
+def main(args):
+	opts = parseArgs(args)
+	cache = BrepCache(opts.cache, opts.cache_size*2**20)
+	if opts.invalidate is not None:
+		n = cache.invalidate(opts.invalidate or None)
+		print('%d entradas removidas de %s' % (n, opts.cache))
+		return
+	if opts.no_cache:
+		cache = None
+	t0 = time.time()
+	rebuilt = {}
+	memory = {} if opts.memory else None
+	parts = hf.buildParallel(opts.parts, opts.jobs, cache, rebuilt = rebuilt, memory = memory)
+	doc = hf.horusDocument(parts)
+	doc.save(opts.output, opts.compression)
+	print('%d partes construidas em %.1f s -> %s' % (len(parts), time.time() - t0, opts.output))
+	if opts.surfaces:
+		print(surfaceReport(parts))
+	if memory is not None:
+		print(hf.memoryReport(memory))
+	if cache is not None:
+		print(hf.rebuildReport(rebuilt, len(parts)))
+		print(cache.report())
+
+if __name__ == '__main__':
+	main(scriptArgs())
@@ -0,0 +1,129 @@
+# coding: utf-8
+
+"""
+Copyright 2021 João T. Carvalho-Neto, Fernando A. Pedersen and Matheus N. S. Silva
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+****************************************
+Stellector Project Horus 3D parts.
+
+On-disk cache of built shapes (binary BREP)
+****************************************
+"""
+
+import os, json
+from FreeCAD import Part
+
+
+defaultCacheDir = os.environ.get('HORUS_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'horus'))
+
+class BrepCache(object):
+	def __init__(self, path = defaultCacheDir, maxBytes = 512*2**20):
+		"""Cache de formas em BREP binario, um arquivo '<parte>-<chave>.brp' por entrada (e das vistas
+		projetadas dos desenhos, em '<parte>-<chave>.hlr.json').
+		As entradas menos usadas recentemente sao removidas quando o total passa de maxBytes."""
+		self.path = path
+		self.maxBytes = maxBytes
+		self.hits = 0
+		self.misses = 0
+	def fileName(self, name, key):
+		return os.path.join(self.path, '%s-%s.brp' % (name, key))
+	def entries(self):
+		if not os.path.isdir(self.path):
+			return []
+		return [os.path.join(self.path, f) for f in os.listdir(self.path) if f.endswith(('.brp', '.hlr.json'))]
+	def load(self, name, key):
+		"""Forma guardada para (name, key), ou None."""
+		fName = self.fileName(name, key)
+		if not os.path.exists(fName):
+			self.misses += 1
+			return None
+		os.utime(fName)   #marca o uso para a politica LRU
+		shape = Part.Shape()
+		shape.importBinary(fName)
+		self.hits += 1
+		return shape
+	def store(self, name, key, shape):
+		if not os.path.isdir(self.path):
+			os.makedirs(self.path)
+		fName = self.fileName(name, key)
+		tmpName = '%s.%d.tmp' % (fName, os.getpid())
+		shape.exportBinary(tmpName)
+		os.replace(tmpName, fName)
+		self.evict()
+	def projectionFileName(self, name, key):
+		return os.path.join(self.path, '%s-%s.hlr.json' % (name, key))
+	def loadProjection(self, name, key):
+		"""Vistas projetadas (linhas visiveis e ocultas, ver horus_drawings.projectViews) guardadas para (name, key), ou None."""
+		fName = self.projectionFileName(name, key)
+		try:
+			with open(fName) as f:
+				data = json.load(f)
+		except (OSError, ValueError):
+			self.misses += 1
+			return None
+		os.utime(fName)
+		self.hits += 1
+		return data
+	def storeProjection(self, name, key, data):
+		if not os.path.isdir(self.path):
+			os.makedirs(self.path)
+		fName = self.projectionFileName(name, key)
+		tmpName = '%s.%d.tmp' % (fName, os.getpid())
+		with open(tmpName, 'w') as f:
+			json.dump(data, f)
+		os.replace(tmpName, fName)
+		self.evict()
+	def readsFileName(self, name):
+		return os.path.join(self.path, '%s.reads.json' % name)
+	def loadReads(self, name):
+		"""Registro da ultima construcao da parte (codigo e parametros lidos, ver horus_freecad.build), ou None."""
+		try:
+			with open(self.readsFileName(name)) as f:
+				return json.load(f)
+		except (OSError, ValueError):
+			return None
+	def storeReads(self, name, record):
+		if not os.path.isdir(self.path):
+			os.makedirs(self.path)
+		fName = self.readsFileName(name)
+		tmpName = '%s.%d.tmp' % (fName, os.getpid())
+		with open(tmpName, 'w') as f:
+			json.dump(record, f, indent = 1)
+		os.replace(tmpName, fName)
+	def evict(self):
+		files = sorted(self.entries(), key = os.path.getmtime)
+		total = sum(os.path.getsize(f) for f in files)
+		while files and total > self.maxBytes:
+			f = files.pop(0)
+			total -= os.path.getsize(f)
+			os.remove(f)
+	def invalidate(self, names = None):
+		"""Remove as entradas das partes em 'names' (todas, se names for None); retorna quantas foram removidas."""
+		removed = 0
+		for f in self.entries():
+			if names is None or os.path.basename(f).rsplit('-', 1)[0] in names:
+				os.remove(f)
+				removed += 1
+		if os.path.isdir(self.path):
+			for f in os.listdir(self.path):
+				if f.endswith('.reads.json') and (names is None or f[:-len('.reads.json')] in names):
+					os.remove(os.path.join(self.path, f))
+		return removed
+	def report(self):
+		files = self.entries()
+		size = sum(os.path.getsize(f) for f in files)
+		return 'cache %s: %d acertos, %d faltas, %d arquivos, %.1f MB' % (self.path, self.hits, self.misses, len(files), size/2.0**20)
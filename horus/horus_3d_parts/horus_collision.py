@@ -0,0 +1,276 @@
+# coding: utf-8
+
+"""
+Copyright 2021 João T. Carvalho-Neto, Fernando A. Pedersen and Matheus N. S. Silva
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+****************************************
+Stellector Project Horus 3D parts.
+
+Collision sweep of the mobile laser group over the stepper angles
+****************************************
+"""
+
+import sys, os, time, json, math
+import argparse
+import numpy
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import horus_freecad as hf
+import horus_params as hp
+import horus_mesh as hm
+from horus_geometry import KDTree, vec
+from horus_build import scriptArgs
+from horus_cache import BrepCache, defaultCacheDir
+
+
+#Partes que giram com o motor fixo (phi) e com os dois motores (phi e theta), e partes paradas
+fixParts = ['StepperMob', 'LaserShaftSupport']
+mobParts = ['LaserCase']
+staticParts = ['TowerBearing', 'TowerStepper', 'OctagonalBase']
+
+def rotations(point, axis, angles):
+	"""Rotacoes de 'angles' graus em torno do eixo (point, axis): matrizes k x 3 x 3 e translacoes k x 3 (x -> R x + t)."""
+	u = numpy.asarray(axis, dtype = numpy.float64)
+	u = u/numpy.linalg.norm(u)
+	K = numpy.array([[0, -u[2], u[1]], [u[2], 0, -u[0]], [-u[1], u[0], 0]])
+	a = numpy.radians(numpy.atleast_1d(angles))[:,None,None]
+	R = numpy.eye(3) + numpy.sin(a)*K + (1 - numpy.cos(a))*K.dot(K)
+	p = numpy.asarray(point, dtype = numpy.float64)
+	return R, p - R.dot(p)
+
+class DistanceField(object):
+	def __init__(self, trees, lo, hi, spacing, limit):
+		"""Distancia com sinal (negativa dentro do material) as partes paradas, numa grade regular de 'lo' a 'hi'.
+		trees: lista de (KDTree das amostras, normais) de cada parte (a hierarquia de caixas de cada parte).
+		Distancias acima de 'limit' sao truncadas: a grade e calculada grossa (4 x spacing) e refinada so
+		na faixa perto das superficies. 'refined' e o numero de nos da grade fina recalculados."""
+		self.lo, self.spacing, self.limit = numpy.asarray(lo, dtype = numpy.float64), spacing, limit
+		self.shape = tuple(numpy.maximum(2, numpy.ceil((numpy.asarray(hi) - self.lo)/spacing).astype(int) + 1))
+		coarse = 4*spacing
+		cshape = tuple(numpy.maximum(2, numpy.ceil((numpy.asarray(hi) - self.lo)/coarse).astype(int) + 1))
+		#A interpolacao da grade grossa erra no maximo a diagonal da celula: truncada em 'reach', um no fino com
+		#valor interpolado igual a 'reach' esta a mais de 'limit' das superficies e nao precisa ser recalculado
+		reach = limit + coarse*math.sqrt(3)
+		cd, cp = self._evaluate(trees, self._nodes(cshape, coarse), reach)
+		self.dist = cd.reshape(cshape)
+		self.part = cp.reshape(cshape)
+		grid = self._nodes(self.shape, spacing)
+		d, p = self.sample(grid, coarse, cshape, reach)
+		band = numpy.abs(d) < reach
+		d[band], p[band] = self._evaluate(trees, grid[band], limit)
+		self.refined = int(band.sum())
+		self.dist = numpy.minimum(d, limit).reshape(self.shape)
+		self.part = p.reshape(self.shape)
+	def _nodes(self, shape, spacing):
+		idx = numpy.indices(shape).reshape(3, -1).T
+		return self.lo + idx*spacing
+	def _evaluate(self, trees, points, cap):
+		dist = numpy.full(len(points), numpy.inf)
+		part = numpy.full(len(points), -1, dtype = numpy.int8)
+		for i, (tree, normals) in enumerate(trees):
+			if not len(tree.points):
+				continue
+			d, j = tree.nearest(points)
+			sign = numpy.where(((points - tree.points[j])*normals[j]).sum(axis = 1) < 0, -1.0, 1.0)
+			closer = d < numpy.abs(dist)
+			dist[closer] = (sign*d)[closer]
+			part[closer] = i
+		return numpy.minimum(dist, cap), part
+	def sample(self, points, spacing = None, shape = None, outside = None):
+		"""Interpolacao trilinear da distancia nos pontos (n x 3) e parte mais proxima; fora da grade vale 'limit'."""
+		spacing = self.spacing if spacing is None else spacing
+		shape = self.shape if shape is None else shape
+		outside = self.limit if outside is None else outside
+		f = (points - self.lo)/spacing
+		i = numpy.floor(f).astype(int)
+		inside = numpy.all((i >= 0) & (i < numpy.array(shape) - 1), axis = 1)
+		i = numpy.clip(i, 0, numpy.array(shape) - 2)
+		t = numpy.clip(f - i, 0.0, 1.0)
+		d = numpy.zeros(len(points))
+		for corner in range(8):
+			o = numpy.array([(corner >> 2) & 1, (corner >> 1) & 1, corner & 1])
+			w = numpy.prod(numpy.where(o, t, 1 - t), axis = 1)
+			d += w*self.dist[i[:,0]+o[0], i[:,1]+o[1], i[:,2]+o[2]]
+		r = numpy.rint(t).astype(int)
+		part = self.part[i[:,0]+r[:,0], i[:,1]+r[:,1], i[:,2]+r[:,2]]
+		return numpy.where(inside, d, outside), numpy.where(inside, part, -1)
+
+def partSamples(parts, names, spacing, deflection):
+	"""Tessela cada parte uma vez e amostra sua superficie; retorna dicionario nome -> (pontos, normais)."""
+	samples = {}
+	for name in names:
+		points, triangles = hm.tessellate(parts[name], *deflection)
+		samples[name] = hm.surfaceSamples(points, triangles, spacing)
+	return samples
+
+def axialRadial(points, point, axis):
+	"""Coordenadas axial e radial dos pontos em relacao ao eixo (point, axis)."""
+	u = numpy.asarray(axis)/numpy.linalg.norm(axis)
+	d = points - point
+	t = d.dot(u)
+	return t, numpy.linalg.norm(d - t[:,None]*u, axis = 1)
+
+def sweep(parts, axes, phi, theta, spacing = 1.0, limit = 5.0, deflection = (0.2, 0.5), stats = None):
+	"""Folga minima entre as partes moveis e as paradas (partes montadas) em cada pose (phi, theta) [graus]
+	dos motores fixo e movel, relativas a posicao da montagem. Retorna (folga len(phi) x len(theta),
+	parte parada mais proxima no ponto de menor folga (indice em staticParts), folga so das partes que giram
+	com o motor fixo, por phi). Folgas negativas indicam interferencia; folgas acima de 'limit' valem 'limit'.
+	Com um dicionario 'stats', registra nele os nos da grade de distancias ('nodes') e os refinados ('refined')."""
+	samples = partSamples(parts, fixParts + mobParts + staticParts, spacing, deflection)
+	fixPoint, fixAxis = [vec(v) for v in axes['fix']]
+	mobPoint, mobAxis = [vec(v) for v in axes['mob']]
+	fixPts = numpy.concatenate([samples[n][0] for n in fixParts])
+	mobPts = numpy.concatenate([samples[n][0] for n in mobParts])
+
+	#Esfera que contem as partes moveis em qualquer pose:
+	u = fixAxis/numpy.linalg.norm(fixAxis)
+	center = fixPoint + (numpy.concatenate([fixPts, mobPts]) - fixPoint).mean(axis = 0).dot(u)*u
+	tm, rm = axialRadial(mobPts, mobPoint, mobAxis)
+	a = mobPoint + tm[:,None]*mobAxis/numpy.linalg.norm(mobAxis)
+	R = max(numpy.linalg.norm(fixPts - center, axis = 1).max(), (numpy.linalg.norm(a - center, axis = 1) + rm).max()) + limit
+	lo, hi = center - R, center + R
+
+	trees = []
+	for n in staticParts:
+		p, nrm = samples[n]
+		near = numpy.all((p > lo - limit) & (p < hi + limit), axis = 1)
+		trees.append((KDTree(p[near]), nrm[near]))
+	field = DistanceField(trees, lo, hi, spacing, limit)
+	if stats is not None:
+		stats.update(nodes = field.dist.size, refined = field.refined)
+
+	#Menor distancia sobre cada circulo (axial, radial) em torno do eixo fixo, para descartar pontos que nunca chegam perto:
+	e1 = numpy.cross(u, [1.0, 0.0, 0.0] if abs(u[0]) < 0.9 else [0.0, 1.0, 0.0])
+	e1 /= numpy.linalg.norm(e1)
+	e2 = numpy.cross(u, e1)
+	tg = numpy.arange(-R, R + spacing, spacing)
+	rg = numpy.arange(0.0, R + spacing, spacing)
+	ang = numpy.linspace(0.0, 2*math.pi, max(8, int(math.ceil(2*math.pi*R/spacing))), endpoint = False)
+	ring = numpy.cos(ang)[:,None]*e1 + numpy.sin(ang)[:,None]*e2
+	envelope = numpy.empty((len(tg), len(rg)))
+	for i, t in enumerate(tg):
+		pts = center + t*u + rg[:,None,None]*ring[None,:,:]
+		envelope[i] = field.sample(pts.reshape(-1, 3))[0].reshape(len(rg), len(ang)).min(axis = 1)
+	def nearPoints(points):
+		t, r = axialRadial(points, center, u)
+		i = numpy.clip(numpy.round((t + R)/spacing).astype(int), 0, len(tg) - 1)
+		j = numpy.clip(numpy.round(r/spacing).astype(int), 0, len(rg) - 1)
+		return points[envelope[i, j] < limit + spacing]
+
+	Rphi, tphi = rotations(fixPoint, fixAxis, phi)
+	def evaluate(points, R0 = numpy.eye(3), t0 = numpy.zeros(3)):
+		clearance = numpy.full(len(phi), float(limit))
+		part = numpy.full(len(phi), -1)
+		points = nearPoints(points.dot(R0.T) + t0)
+		if len(points):
+			chunk = max(1, 2000000//len(points))
+			for s in range(0, len(phi), chunk):
+				moved = numpy.einsum('kij,nj->kni', Rphi[s:s+chunk], points) + tphi[s:s+chunk,None,:]
+				d, p = field.sample(moved.reshape(-1, 3))
+				d, p = d.reshape(len(moved), -1), p.reshape(len(moved), -1)
+				j = d.argmin(axis = 1)
+				clearance[s:s+chunk] = d[numpy.arange(len(moved)), j]
+				part[s:s+chunk] = p[numpy.arange(len(moved)), j]
+		return clearance, part
+
+	fixClearance, fixPart = evaluate(fixPts)
+	clearance = numpy.empty((len(phi), len(theta)))
+	part = numpy.empty((len(phi), len(theta)), dtype = int)
+	Rtheta, ttheta = rotations(mobPoint, mobAxis, theta)
+	for j in range(len(theta)):
+		c, p = evaluate(mobPts, Rtheta[j], ttheta[j])
+		worse = fixClearance < c
+		clearance[:,j] = numpy.where(worse, fixClearance, c)
+		part[:,j] = numpy.where(worse, fixPart, p)
+	return clearance, part, fixClearance
+
+def ranges(angles, blocked):
+	"""Intervalos [inicio, fim] de angulos consecutivos bloqueados. Quando os angulos cobrem uma volta inteira,
+	um intervalo que passa pela emenda (+-180 graus) e dado uma vez so, com inicio maior que o fim."""
+	out = []
+	for a, b in zip(angles, blocked):
+		if b and out and out[-1][2]:
+			out[-1][1] = a
+		elif b:
+			out.append([a, a, True])
+		elif out:
+			out[-1][2] = False
+	out = [(s, e) for s, e, open_ in out]
+	if len(angles) > 1 and len(out) > 1 and out[0][0] == angles[0] and out[-1][1] == angles[-1]:
+		step = angles[1] - angles[0]
+		if abs(angles[-1] + step - angles[0] - 360.0) < 1e-6*abs(step):
+			out = [(out[-1][0], out[0][1])] + out[1:-1]
+	return out
+
+def blockedReport(phi, theta, clearance, part, fixClearance, minClearance):
+	"""Faixas de phi bloqueadas para qualquer theta (partes que giram com o motor fixo) e, agrupando phi
+	consecutivos com as mesmas faixas, as faixas de theta bloqueadas (LaserCase)."""
+	lines = []
+	step = lambda a: int(round(a*hp.mp_passos_volta/360.0))
+	fixBlocked = ranges(phi, fixClearance < minClearance)
+	lines.append('phi bloqueado para qualquer theta: %s' % (', '.join('%.1f..%.1f graus (%+d..%+d passos)' % (s, e, step(s), step(e)) for s, e in fixBlocked) or 'nenhum'))
+	rows = []
+	for i, a in enumerate(phi):
+		r = ranges(theta, clearance[i] < minClearance)
+		if rows and rows[-1][2] == r:
+			rows[-1][1] = a
+		else:
+			rows.append([a, a, r])
+	for s, e, r in rows:
+		if r:
+			lines.append('phi %.1f..%.1f: theta bloqueado %s' % (s, e, ', '.join('%.1f..%.1f' % x for x in r)))
+	i, j = numpy.unravel_index(numpy.argmin(clearance), clearance.shape)
+	lines.append('menor folga %.2f mm em phi = %.1f, theta = %.1f (%s)' % (clearance[i,j], phi[i], theta[j], staticParts[part[i,j]] if part[i,j] >= 0 else '-'))
+	return '\n'.join(lines)
+
+def parseArgs(args):
+	parser = argparse.ArgumentParser(prog = 'horus_collision.py', description = 'Varredura de colisoes do grupo movel do laser sobre os angulos dos motores.')
+	parser.add_argument('--phi', type = float, nargs = 3, default = [-180.0, 180.0, 2.0], metavar = ('INICIO', 'FIM', 'PASSO'), help = 'angulos do motor fixo [graus], relativos a montagem')
+	parser.add_argument('--theta', type = float, nargs = 3, default = [-180.0, 180.0, 2.0], metavar = ('INICIO', 'FIM', 'PASSO'), help = 'angulos do motor movel [graus], relativos a montagem')
+	parser.add_argument('-s', '--spacing', type = float, default = 1.0, help = 'espacamento das amostras e da grade de distancias [mm]')
+	parser.add_argument('--limit', type = float, default = 5.0, help = 'folgas acima deste valor [mm] nao sao calculadas')
+	parser.add_argument('--min-clearance', type = float, default = 0.0, help = 'folga minima [mm] para considerar a pose livre')
+	parser.add_argument('-t', '--tolerance', type = float, default = 0.2, help = 'deflexao linear da tesselagem [mm]')
+	parser.add_argument('-j', '--jobs', type = int, default = 1, help = 'numero de processos de construcao em paralelo')
+	parser.add_argument('--cache', default = defaultCacheDir, help = 'diretorio do cache de formas (BREP)')
+	parser.add_argument('--no-cache', action = 'store_true', help = 'constroi tudo sem consultar o cache')
+	parser.add_argument('-o', '--output', help = 'arquivo JSON com as folgas de todas as poses')
+	return parser.parse_args(args)
+
+def main(args):
+	opts = parseArgs(args)
+	cache = None if opts.no_cache else BrepCache(opts.cache)
+	t0 = time.time()
+	parts = hf.buildParallel(hf.horusParts, opts.jobs, cache)
+	axes = hf.motorAxes(parts)
+	hf.assemble(parts)
+	t1 = time.time()
+	phi = numpy.arange(opts.phi[0], opts.phi[1], opts.phi[2])
+	theta = numpy.arange(opts.theta[0], opts.theta[1], opts.theta[2])
+	stats = {}
+	clearance, part, fixClearance = sweep(parts, axes, phi, theta, opts.spacing, opts.limit, (opts.tolerance, 0.5), stats)
+	print(blockedReport(phi, theta, clearance, part, fixClearance, opts.min_clearance))
+	print('%d poses em %.1f s (construcao %.1f s, %d de %d nos da grade refinados)' % (clearance.size, time.time() - t1, t1 - t0,
+		stats['refined'], stats['nodes']))
+	if opts.output:
+		with open(opts.output, 'w') as f:
+			json.dump({'phi': phi.tolist(), 'theta': theta.tolist(), 'staticParts': staticParts, 'limit': opts.limit,
+					'axes': {k: [vec(v[0]).tolist(), vec(v[1]).tolist()] for k, v in axes.items()},
+					'clearance': numpy.round(clearance, 3).tolist(), 'part': part.tolist()}, f)
+
+if __name__ == '__main__':
+	main(scriptArgs(__file__))
@@ -0,0 +1,209 @@
+# coding: utf-8
+
+"""
+Copyright 2021 João T. Carvalho-Neto, Fernando A. Pedersen and Matheus N. S. Silva
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+****************************************
+Stellector Project Horus 3D parts.
+
+Multi-view drawing sheets (SVG/PDF) of the parts
+****************************************
+"""
+
+import sys, os, time, hashlib
+import argparse
+import numpy
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import horus_freecad as hf
+from horus_build import scriptArgs
+from horus_cache import BrepCache, defaultCacheDir
+from horus_export import buildParts, fileBase, allParts
+from FreeCAD import Base, Part
+
+
+#Direcoes de vista (do objeto para o observador), como no TechDraw
+viewDirections = {	'front': (0.0, -1.0, 0.0),
+					'top': (0.0, 0.0, 1.0),
+					'right': (1.0, 0.0, 0.0),
+					'iso': (1.0, -1.0, 1.0)}
+defaultViews = ['front', 'top', 'right', 'iso']
+
+#Compostos de TechDraw.projectEx usados como linhas visiveis (arestas vivas e contornos) e ocultas
+edgeSets = {'visible': (0, 3), 'hidden': (5, 8)}
+
+#Folhas [mm] e escalas normalizadas, da maior para a menor
+sheetSizes = {'A4': (297.0, 210.0), 'A3': (420.0, 297.0)}
+drawingScales = [5.0, 2.0, 1.0, 0.5, 0.2, 0.1]
+sheetMargin = 10.0
+titleHeight = 15.0
+viewGap = 12.0
+
+def polylines(compounds, deflection):
+	"""Polilinhas 2D (listas de [x, y]) das arestas dos compostos projetados."""
+	lines = []
+	for c in compounds:
+		if c is None or c.isNull():
+			continue
+		for e in c.Edges:
+			lines.append([[round(p.x, 3), round(p.y, 3)] for p in e.discretize(Deflection = deflection)])
+	return lines
+
+def projectViews(shape, views = defaultViews, deflection = 0.05):
+	"""Remocao de linhas ocultas (TechDraw.projectEx) da forma em cada vista: dicionario
+	vista -> {'visible': [...], 'hidden': [...]} com as polilinhas no plano da projecao [mm]."""
+	import TechDraw
+	out = {}
+	for v in views:
+		comp = TechDraw.projectEx(shape, Base.Vector(*viewDirections[v]))
+		out[v] = {k: polylines([comp[i] for i in idx], deflection) for k, idx in edgeSets.items()}
+	return out
+
+def _projectBrep(job):
+	brep, views, deflection = job
+	shape = Part.Shape()
+	shape.importBrepFromString(brep)
+	return projectViews(shape, views, deflection)
+
+def projectionKey(brep, views, deflection):
+	"""Chave do cache das vistas: hash do BREP da forma, das vistas e da deflexao."""
+	h = hashlib.sha256(brep.encode())
+	h.update(repr((list(views), deflection)).encode())
+	return h.hexdigest()[:20]
+
+def projectParts(parts, views = defaultViews, deflection = 0.05, jobs = 1, cache = None):
+	"""Vistas projetadas de cada parte (dicionario nome -> forma). So as formas cujo BREP nao esta no cache
+	sao projetadas, em 'jobs' processos. Retorna (dicionario nome -> vistas, nome -> chave, partes projetadas)."""
+	projections, keys, jobList = {}, {}, []
+	for name, shape in parts.items():
+		brep = shape.exportBrepToString()
+		keys[name] = projectionKey(brep, views, deflection)
+		data = cache.loadProjection(name, keys[name]) if cache is not None else None
+		if data is None:
+			jobList.append((name, (brep, views, deflection)))
+		else:
+			projections[name] = data
+	if jobs == 1:
+		results = [_projectBrep(job) for name, job in jobList]
+	else:
+		import multiprocessing
+		from concurrent.futures import ProcessPoolExecutor
+		with ProcessPoolExecutor(jobs, mp_context = multiprocessing.get_context('fork')) as pool:
+			results = list(pool.map(_projectBrep, [job for name, job in jobList]))
+	for (name, job), data in zip(jobList, results):
+		projections[name] = data
+		if cache is not None:
+			cache.storeProjection(name, keys[name], data)
+	return {name: projections[name] for name in parts}, keys, [name for name, job in jobList]
+
+def viewBounds(view):
+	pts = [p for k in view for line in view[k] for p in line]
+	if not pts:
+		return numpy.zeros(2), numpy.zeros(2)
+	pts = numpy.array(pts)
+	return pts.min(axis = 0), pts.max(axis = 0)
+
+def layout(projections, sheet):
+	"""Escala e posicao (canto inferior esquerdo na folha) de cada vista, no terceiro diedro: vista
+	superior acima da frontal, lateral direita a direita e isometrica no canto superior direito."""
+	W, H = sheetSizes[sheet]
+	size = {v: numpy.subtract(*viewBounds(projections[v])[::-1]) for v in projections}
+	z = numpy.zeros(2)
+	f, t, r, i = [size.get(v, z) for v in ('front', 'top', 'right', 'iso')]
+	width, height = max(f[0], t[0]) + max(r[0], i[0]), max(f[1], r[1]) + max(t[1], i[1])
+	room = (W - 2*sheetMargin - viewGap, H - 2*sheetMargin - titleHeight - viewGap)
+	scale = next((s for s in drawingScales if width*s <= room[0] and height*s <= room[1]), drawingScales[-1])
+	x0, y0 = sheetMargin, sheetMargin + titleHeight
+	x1, y1 = x0 + max(f[0], t[0])*scale + viewGap, y0 + max(f[1], r[1])*scale + viewGap
+	origin = {'front': (x0, y0), 'top': (x0, y1), 'right': (x1, y0), 'iso': (x1, y1)}
+	return scale, {v: origin[v] for v in projections}
+
+def scaleText(scale):
+	return '%g:1' % scale if scale >= 1 else '1:%g' % (1/scale)
+
+def sheetSvg(name, projections, sheet = 'A4', key = ''):
+	"""Folha SVG (unidades em mm) com as vistas da parte, moldura e legenda."""
+	W, H = sheetSizes[sheet]
+	scale, origin = layout(projections, sheet)
+	out = ['<?xml version="1.0" encoding="UTF-8"?>',
+			'<svg xmlns="http://www.w3.org/2000/svg" width="%gmm" height="%gmm" viewBox="0 0 %g %g">' % (W, H, W, H),
+			'<rect x="%g" y="%g" width="%g" height="%g" fill="none" stroke="black" stroke-width="0.5"/>' % (sheetMargin/2, sheetMargin/2, W - sheetMargin, H - sheetMargin)]
+	style = {'visible': 'stroke="black" stroke-width="0.35"', 'hidden': 'stroke="black" stroke-width="0.18" stroke-dasharray="1.5,0.75"'}
+	for v in projections:
+		lo, hi = viewBounds(projections[v])
+		for k in ('hidden', 'visible'):
+			paths = []
+			for line in projections[v][k]:
+				p = (numpy.array(line) - lo)*scale + origin[v]
+				p[:,1] = H - p[:,1]
+				paths.append('M' + ' L'.join('%.3f,%.3f' % tuple(q) for q in p))
+			if paths:
+				out.append('<path id="%s-%s" fill="none" %s d="%s"/>' % (v, k, style[k], ' '.join(paths)))
+	ty = H - sheetMargin - 4.0
+	out.append('<text x="%g" y="%g" font-family="sans-serif" font-size="5">%s</text>' % (sheetMargin + 2, ty, name))
+	out.append('<text x="%g" y="%g" font-family="sans-serif" font-size="3.5" text-anchor="end">escala %s  %s  %s</text>' % (W - sheetMargin - 2, ty, scaleText(scale), sheet, key))
+	out.append('</svg>')
+	return '\n'.join(out) + '\n'
+
+def writePdf(svgFile, pdfFile):
+	"""Converte a folha SVG em PDF (requer o pacote cairosvg)."""
+	try:
+		import cairosvg
+	except ImportError:
+		raise RuntimeError('exportacao em PDF requer o pacote cairosvg (pip install cairosvg)')
+	cairosvg.svg2pdf(url = svgFile, write_to = pdfFile)
+
+def parseArgs(args):
+	parser = argparse.ArgumentParser(prog = 'horus_drawings.py', description = 'Gera folhas de desenho com vistas das partes do Horus e da mola.')
+	parser.add_argument('parts', nargs = '*', default = hf.horusParts, help = 'partes a desenhar (padrao: partes do Horus)')
+	parser.add_argument('-d', '--outdir', default = 'drawings', help = 'diretorio de saida')
+	parser.add_argument('--views', nargs = '+', default = defaultViews, choices = sorted(viewDirections), help = 'vistas da folha')
+	parser.add_argument('--sheet', default = 'A4', choices = sorted(sheetSizes), help = 'tamanho da folha')
+	parser.add_argument('--pdf', action = 'store_true', help = 'grava tambem as folhas em PDF (requer cairosvg)')
+	parser.add_argument('-t', '--tolerance', type = float, default = 0.05, help = 'deflexao da discretizacao das arestas [mm]')
+	parser.add_argument('-j', '--jobs', type = int, default = 1, help = 'numero de processos de construcao e de projecao em paralelo')
+	parser.add_argument('--cache', default = defaultCacheDir, help = 'diretorio do cache de formas e vistas')
+	parser.add_argument('--no-cache', action = 'store_true', help = 'constroi e projeta tudo sem consultar o cache')
+	opts = parser.parse_args(args)
+	for name in opts.parts:
+		if name not in allParts:
+			parser.error('parte desconhecida: %s (opcoes: %s)' % (name, ', '.join(allParts)))
+	return opts
+
+def main(args):
+	opts = parseArgs(args)
+	cache = None if opts.no_cache else BrepCache(opts.cache)
+	if not os.path.isdir(opts.outdir):
+		os.makedirs(opts.outdir)
+	t0 = time.time()
+	parts = buildParts(opts.parts, opts.jobs, cache)
+	t1 = time.time()
+	projections, keys, projected = projectParts(parts, opts.views, opts.tolerance, opts.jobs, cache)
+	t2 = time.time()
+	for name in parts:
+		svgFile = os.path.join(opts.outdir, fileBase(name) + '.svg')
+		with open(svgFile, 'w') as f:
+			f.write(sheetSvg(name, projections[name], opts.sheet, keys[name]))
+		if opts.pdf:
+			writePdf(svgFile, os.path.splitext(svgFile)[0] + '.pdf')
+	print('%d folhas -> %s (construcao %.1f s, projecao de %d partes %.1f s, folhas %.1f s)' % (len(parts), opts.outdir,
+		t1 - t0, len(projected), t2 - t1, time.time() - t2))
+	if cache is not None:
+		print(cache.report())
+
+if __name__ == '__main__':
+	main(scriptArgs(__file__))
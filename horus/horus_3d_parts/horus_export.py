@@ -0,0 +1,137 @@
+# coding: utf-8
+
+"""
+Copyright 2021 João T. Carvalho-Neto, Fernando A. Pedersen and Matheus N. S. Silva
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+****************************************
+Stellector Project Horus 3D parts.
+
+Headless export of the printable parts
+****************************************
+"""
+
+import sys, os, time, json, hashlib
+import argparse
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import horus_freecad as hf
+import spiralCoil_freecad as sc
+from horus_build import scriptArgs
+from horus_cache import BrepCache, defaultCacheDir
+import horus_mesh as hm
+
+
+exportFormats = ['obj', 'stl', 'step']
+allParts = hf.horusParts + sorted(sc.coilParts)
+
+def fileBase(name):
+	"""Nome base dos arquivos da parte, como os arquivos ja versionados (ex.: OctagonalBase -> octagonalBase)."""
+	return name[0].lower() + name[1:]
+
+def sha256(fileName):
+	h = hashlib.sha256()
+	with open(fileName, 'rb') as f:
+		for block in iter(lambda: f.read(2**20), b''):
+			h.update(block)
+	return h.hexdigest()
+
+def buildParts(names, jobs = 1, cache = None, assembled = False, timings = None, rebuilt = None):
+	"""Constroi as partes do Horus e as variantes da mola pedidas; retorna dicionario nome -> forma na ordem pedida."""
+	timings = {} if timings is None else timings
+	horus = [n for n in names if n in hf.horusParts]
+	if assembled and horus:
+		parts = hf.assemble(hf.buildParallel(hf.horusParts, jobs, cache, timings, rebuilt))
+	else:
+		parts = hf.buildParallel(horus, jobs, cache, timings, rebuilt) if horus else {}
+	for name in names:
+		if name in sc.coilParts:
+			t0 = time.perf_counter()
+			parts[name] = sc.molaPart(sc.coilParts[name])
+			timings[name] = time.perf_counter() - t0
+	return {name: parts[name] for name in names}
+
+def exportShape(shape, fileName, linearDeflection = None, angularDeflection = None, name = None):
+	"""Exporta a forma em STEP ou, tesselada com as deflexoes dadas [mm, rad], em OBJ/STL (conforme a extensao).
+	As deflexoes omitidas vem de horus_mesh.partDeflection (pelo nome da parte), como em exportPart."""
+	if os.path.splitext(fileName)[1].lower() in ('.step', '.stp'):
+		shape.exportStep(fileName)
+	else:
+		lin, ang = hm.partDeflection.get(name, hm.defaultDeflection)
+		points, triangles = hm.tessellate(shape, lin if linearDeflection is None else linearDeflection, ang if angularDeflection is None else angularDeflection)
+		hm.writeMesh(fileName, points, triangles, os.path.splitext(os.path.basename(fileName))[0])
+
+def exportPart(name, shape, outdir, formats, deflection):
+	"""Exporta a parte em cada formato (uma unica tesselagem para OBJ e STL); retorna as entradas do manifesto."""
+	files = []
+	mesh = None
+	for fmt in formats:
+		fileName = os.path.join(outdir, fileBase(name) + '.' + fmt)
+		t0 = time.perf_counter()
+		entry = {'file': os.path.basename(fileName), 'format': fmt}
+		if fmt == 'step':
+			shape.exportStep(fileName)
+		else:
+			if mesh is None:
+				mesh = hm.tessellate(shape, *deflection)
+			hm.writeMesh(fileName, mesh[0], mesh[1], name)
+			entry.update(vertices = len(mesh[0]), triangles = len(mesh[1]))
+		entry.update(exportTime = round(time.perf_counter() - t0, 3), bytes = os.path.getsize(fileName), sha256 = sha256(fileName))
+		files.append(entry)
+	return files
+
+def parseArgs(args):
+	parser = argparse.ArgumentParser(prog = 'horus_export.py', description = 'Constroi e exporta as partes do Horus e da mola sem a interface grafica.')
+	parser.add_argument('parts', nargs = '*', default = hf.horusParts + ['Mola4'], help = 'partes a exportar (padrao: partes do Horus e Mola4)')
+	parser.add_argument('-f', '--format', nargs = '+', default = ['obj'], choices = exportFormats, help = 'formatos de saida')
+	parser.add_argument('-d', '--outdir', default = '.', help = 'diretorio de saida')
+	parser.add_argument('-t', '--tolerance', type = float, help = 'deflexao linear da tesselagem [mm] (padrao: horus_mesh.partDeflection)')
+	parser.add_argument('-a', '--angular', type = float, help = 'deflexao angular da tesselagem [rad] (padrao: horus_mesh.partDeflection)')
+	parser.add_argument('--assembled', action = 'store_true', help = 'exporta as partes do Horus na posicao da montagem')
+	parser.add_argument('-j', '--jobs', type = int, default = 1, help = 'numero de processos de construcao em paralelo')
+	parser.add_argument('--cache', default = defaultCacheDir, help = 'diretorio do cache de formas (BREP)')
+	parser.add_argument('--no-cache', action = 'store_true', help = 'constroi tudo sem consultar o cache')
+	parser.add_argument('--manifest', default = 'manifest.json', help = 'manifesto gerado no diretorio de saida')
+	opts = parser.parse_args(args)
+	for name in opts.parts:
+		if name not in allParts:
+			parser.error('parte desconhecida: %s (opcoes: %s)' % (name, ', '.join(allParts)))
+	return opts
+
+def main(args):
+	opts = parseArgs(args)
+	cache = None if opts.no_cache else BrepCache(opts.cache)
+	if not os.path.isdir(opts.outdir):
+		os.makedirs(opts.outdir)
+	timings = {}
+	rebuilt = {}
+	parts = buildParts(opts.parts, opts.jobs, cache, opts.assembled, timings, rebuilt)
+	manifest = {'assembled': opts.assembled, 'parts': []}
+	for name in parts:
+		lin, ang = hm.partDeflection.get(name, hm.defaultDeflection)
+		deflection = (lin if opts.tolerance is None else opts.tolerance, ang if opts.angular is None else opts.angular)
+		files = exportPart(name, parts[name], opts.outdir, opts.format, deflection)
+		manifest['parts'].append({'name': name, 'buildTime': round(timings[name], 3), 'deflection': deflection, 'files': files})
+		for f in files:
+			print('%-20s %7.2f s  %-24s %9d bytes %8s triangulos' % (name, timings[name], f['file'], f['bytes'], f.get('triangles', '-')))
+	with open(os.path.join(opts.outdir, opts.manifest), 'w') as f:
+		json.dump(manifest, f, indent = 2)
+	if cache is not None:
+		print(hf.rebuildReport(rebuilt, len([n for n in parts if n in hf.horusParts])))
+		print(cache.report())
+
+if __name__ == '__main__':
+	main(scriptArgs(__file__))
@@ -25,9 +25,15 @@ FreeCAD Python scripting codes
 """
 
  
-import math
+import sys, os, math, time
+import types, inspect, marshal, hashlib, functools, contextlib, gc
+import numpy
+import FreeCAD
 from FreeCAD import Base
 from FreeCAD import Part
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from horus_geometry import FaceIndex
+from horus_params import *
 
 
 
@@ -63,60 +69,62 @@ def center(part):
 	return Base.Vector(centerX(part).x, centerY(part).y, centerZ(part).z)
 
 def maxX(part):
-	m = part.Edges[0].Vertexes[0].Point
-	for edge in part.Edges:
-		for p in edge.discretize(200):
-			if p.x > m.x:
-				m = p
-	return m
+	return extremes(part)[1]
 def minX(part):
-	m = part.Edges[0].Vertexes[0].Point
-	for edge in part.Edges:
-		for p in edge.discretize(200):
-			if p.x < m.x:
-				m = p
-	return m
+	return extremes(part)[0]
 def maxY(part):
-	m = part.Edges[0].Vertexes[0].Point
-	for edge in part.Edges:
-		for p in edge.discretize(200):
-			if p.y > m.y:
-				m = p
-	return m
+	return extremes(part)[3]
 def minY(part):
-	m = part.Edges[0].Vertexes[0].Point
-	for edge in part.Edges:
-		for p in edge.discretize(200):
-			if p.y < m.y:
-				m = p
-	return m
+	return extremes(part)[2]
 def maxZ(part):
-	m = part.Edges[0].Vertexes[0].Point
-	for edge in part.Edges:
-		for p in edge.discretize(200):
-			if p.z > m.z:
-				m = p
-	return m
+	return extremes(part)[5]
 def minZ(part):
-	m = part.Edges[0].Vertexes[0].Point
+	return extremes(part)[4]
+
+_extremesCache = {}
+
+def extremes(part):
+	"""Pontos extremos (minX, maxX, minY, maxY, minZ, maxZ) da forma, calculados numa unica passagem.
+	Segmentos de reta contribuem com seus vertices (extremos exatos), as demais arestas sao amostradas.
+	O resultado fica memorizado por forma (hashCode conferido com isSame); uma forma
+	transladada ou girada depois de medida muda de hashCode e e medida de novo."""
+	key = part.hashCode()
+	for shape, ext in _extremesCache.get(key, []):
+		if shape.hashCode() == key and shape.isSame(part):
+			return ext
+	pts = []
 	for edge in part.Edges:
-		for p in edge.discretize(200):
-			if p.z < m.z:
-				m = p
-	return m
-
+		if isinstance(edge.Curve, (Part.Line, Part.LineSegment)):
+			pts.extend(v.Point for v in edge.Vertexes)
+		else:
+			pts.extend(edge.discretize(200))
+	P = numpy.array([[p.x, p.y, p.z] for p in pts])
+	imin, imax = P.argmin(axis=0), P.argmax(axis=0)
+	ext = tuple(Base.Vector(*P[i]) for k in range(3) for i in (imin[k], imax[k]))
+	_extremesCache.setdefault(key, []).append((part, ext))
+	return ext
+
+#Reflexoes pelos planos coordenados (mantem planos, cilindros e cones como superficies analiticas)
 def mirrorX(part):
-	M = Base.Matrix()
-	M.A11 = -1.0
-	return part.transformGeometry(M)
+	return part.mirror(V0, VX)
 def mirrorY(part):
-	M = Base.Matrix()
-	M.A22 = -1.0
-	return part.transformGeometry(M)
+	return part.mirror(V0, VY)
 def mirrorZ(part):
-	M = Base.Matrix()
-	M.A33 = -1.0
-	return part.transformGeometry(M)
+	return part.mirror(V0, VZ)
+
+freeFormSurfaces = ('BSplineSurface', 'BezierSurface', 'OffsetSurface')
+
+def surfaceTypes(shape):
+	"""Contagem das faces da forma por tipo de superficie (Plane, Cylinder, BSplineSurface, ...)."""
+	count = {}
+	for f in shape.Faces:
+		t = type(f.Surface).__name__
+		count[t] = count.get(t, 0) + 1
+	return count
+
+def freeFormFaces(shape):
+	"""Indices das faces com superficies de forma livre; as partes do Horus so tem primitivas analiticas."""
+	return [i for i, f in enumerate(shape.Faces) if type(f.Surface).__name__ in freeFormSurfaces]
 
 def ArcAngle(rad, startang, finishang):
 	midang = (startang+finishang)/2.0
@@ -164,6 +172,100 @@ def makeRing(rext, rint, height):
 	c = Part.makeCylinder(rext, height)
 	return c.cut(Part.makeCylinder(rint, height))
 
+#Primitivas ja construidas: (construtora, parametros arredondados) -> forma
+_primitives = {}
+primitiveDigits = 6
+
+def primitive(maker, *args):
+	"""Copia de uma primitiva (makeDrop, makeRing, Part.makeCylinder, ...) construida uma unica vez para cada
+	conjunto de parametros (arredondados a primitiveDigits casas); a copia pode ser posicionada livremente.
+	As primitivas sao liberadas ao fim de cada build() e nao sao compartilhadas entre os processos de buildParallel."""
+	key = (maker, tuple(round(a, primitiveDigits) if isinstance(a, float) else a for a in args))
+	if key not in _primitives:
+		_primitives[key] = maker(*args)
+	return _primitives[key].copy()
+
+#Padroes: um unico composto com as copias posicionadas da ferramenta, para uma so operacao booleana
+#(as copias nao devem se sobrepor)
+def polarPattern(tool, angles, center = V0, axis = VZ):
+	"""Copias giradas em torno do eixo: 'angles' e o numero de copias igualmente espacadas ou a lista de angulos [graus]."""
+	if isinstance(angles, int):
+		angles = [i*360.0/angles for i in range(angles)]
+	copies = []
+	for a in angles:
+		c = tool.copy()
+		c.rotate(center, axis, a)
+		copies.append(c)
+	return Part.makeCompound(copies)
+
+def linearPattern(tool, step, n):
+	"""n copias deslocadas de 'step' (Vector) a partir da posicao da ferramenta."""
+	copies = []
+	for i in range(n):
+		c = tool.copy()
+		c.translate(step*i)
+		copies.append(c)
+	return Part.makeCompound(copies)
+
+def mirrorPattern(tool, normal = VX, base = V0):
+	"""A ferramenta e sua imagem especular pelo plano de normal 'normal' que passa por 'base'."""
+	return Part.makeCompound([tool.copy(), tool.mirror(base, normal)])
+
+#Avaliacao das expressoes csg(): 'batch' agrupa as ferramentas em operacoes multiplas, 'sequential' opera uma a uma
+csgMode = 'batch'
+#Tolerancia das operacoes booleanas agrupadas (0.0: booleana exata, > 0.0: booleana "fuzzy")
+csgFuzzy = 0.0
+
+class csg(object):
+	def __init__(self, shape):
+		"""Expressao CSG registrada sem avaliacao, ex.: csg(base).cut(a, b).fuse(c).cut(d).shape()"""
+		self.base = shape
+		self.ops = []
+	def cut(self, *tools):
+		self.ops.append(('cut', tools))
+		return self
+	def fuse(self, *tools):
+		self.ops.append(('fuse', tools))
+		return self
+	def common(self, *tools):
+		self.ops.append(('common', tools))
+		return self
+	def plan(self):
+		"""Agrupa as ferramentas por operacao. Uma ferramenta volta para o grupo anterior da mesma operacao
+		quando comuta com os grupos intermediarios (caixas envolventes disjuntas de todas as suas ferramentas)."""
+		groups = []
+		for op, tools in self.ops:
+			for t in tools:
+				target = None
+				for g in reversed(groups if op != 'common' else []):
+					if g[0] == op:
+						target = g
+						break
+					if g[0] == 'common' or any(t.BoundBox.intersect(o.BoundBox) for o in g[1]):
+						break
+				if target is None:
+					groups.append((op, [t]))
+				else:
+					target[1].append(t)
+		return groups
+	def shape(self, mode = None, fuzzy = None):
+		mode = csgMode if mode is None else mode
+		fuzzy = csgFuzzy if fuzzy is None else fuzzy
+		s = self.base
+		if mode == 'sequential':
+			for op, tools in self.ops:
+				for t in tools:
+					s = getattr(s, op)(t)
+			return s
+		for op, tools in self.plan():
+			if op == 'common':
+				s = s.common(tools[0])
+			elif fuzzy > 0.0:
+				s = getattr(s, op)(tools, fuzzy)
+			else:
+				s = getattr(s, op)(tools if len(tools) > 1 else tools[0])
+		return s
+
 class group(object):
 	def __init__(self, partsDict = {}):
 		"""Classe para criacao e transformacao de grupos como um todo."""
@@ -176,25 +278,359 @@ class group(object):
 	def rotate(self, bVecOrig, bVecAxis, angle):
 		for p in self.partsDict:
 			self.partsDict[p].rotate(bVecOrig, bVecAxis, angle)
+	def place(self, placement):
+		"""Aplica o placement ao grupo, sobre a posicao atual de cada parte."""
+		for p in self.partsDict:
+			self.partsDict[p].Placement = placement.multiply(self.partsDict[p].Placement)
+
+#Registro das partes: nome -> (funcao construtora, dependencias)
+_builders = {}
+
+def builder(name, deps = ()):
+	"""Registra a funcao construtora da parte 'name', que recebe como argumentos as partes listadas em 'deps'."""
+	def register(func):
+		_builders[name] = (func, tuple(deps))
+		return func
+	return register
+
+def _globalNames(code):
+	"""Nomes globais referenciados pelo codigo, incluindo funcoes internas e compreensoes."""
+	names = set(code.co_names)
+	for c in code.co_consts:
+		if isinstance(c, types.CodeType):
+			names |= _globalNames(c)
+	return names
+
+def _source(func):
+	try:
+		return inspect.getsource(func).encode()
+	except (OSError, TypeError):
+		return marshal.dumps(func.__code__)
+
+def _helperModule(v):
+	"""Modulo do projeto (deste diretorio, ex.: horus_geometry) que define a funcao ou classe 'v', ou None."""
+	m = sys.modules.get(getattr(v, '__module__', None))
+	f = getattr(m, '__file__', None)
+	if m is None or f is None or m.__name__ == __name__:
+		return None
+	return m if os.path.dirname(os.path.abspath(f)) == os.path.dirname(os.path.abspath(__file__)) else None
+
+def _scan(func):
+	"""Hash do codigo da funcao, das funcoes e classes do modulo que ela usa e do codigo inteiro dos modulos
+	auxiliares do projeto de que ela usa funcoes ou classes (ex.: FaceIndex); nomes dos parametros globais lidos."""
+	h = hashlib.sha256(repr(FreeCAD.Version()[:3]).encode())
+	names, pending, seen, helpers = set(), [func], set(), set()
+	while pending:
+		f = pending.pop()
+		if f in seen:
+			continue
+		seen.add(f)
+		h.update(_source(f))
+		for n in sorted(_globalNames(f.__code__)):
+			v = globals().get(n)
+			if inspect.isfunction(v) and v.__globals__ is globals():
+				pending.append(v)
+			elif inspect.isclass(v) and v.__module__ == __name__:
+				pending.extend(m for m in vars(v).values() if inspect.isfunction(m))
+			elif isinstance(v, (int, float, str, list, tuple, dict, Base.Vector)) and not n.startswith('_'):
+				names.add(n)
+			elif (inspect.isfunction(v) or inspect.isclass(v)) and _helperModule(v) is not None:
+				helpers.add(_helperModule(v))
+	for m in sorted(helpers, key = lambda m: m.__name__):
+		with open(m.__file__, 'rb') as f:
+			h.update(f.read())
+	return h.hexdigest(), names
+
+class _ReadTracker(dict):
+	"""Dicionario de parametros que anota em 'log' as chaves lidas ('*' quando e percorrido inteiro)."""
+	def __init__(self, name, d, log):
+		dict.__init__(self, d)
+		self.name = name
+		self.log = log
+	def __getitem__(self, key):
+		self.log.add((self.name, key))
+		return dict.__getitem__(self, key)
+	def get(self, key, default = None):
+		self.log.add((self.name, key))
+		return dict.get(self, key, default)
+	def __contains__(self, key):
+		self.log.add((self.name, key))
+		return dict.__contains__(self, key)
+	def __iter__(self):
+		self.log.add((self.name, '*'))
+		return dict.__iter__(self)
+	def keys(self):
+		self.log.add((self.name, '*'))
+		return dict.keys(self)
+	def values(self):
+		self.log.add((self.name, '*'))
+		return dict.values(self)
+	def items(self):
+		self.log.add((self.name, '*'))
+		return dict.items(self)
+
+def _trackedCall(func, args):
+	"""Executa a construtora registrando os parametros lidos: (nome, None) para constantes do modulo
+	(analise estatica) e (nome, chave) para cada chave lida dos dicionarios de parametros."""
+	code, names = _scan(func)
+	g = globals()
+	log = set((n, None) for n in names if not isinstance(g[n], dict))
+	saved = {n: v for n, v in g.items() if type(v) is dict and not n.startswith('_')}
+	g.update((n, _ReadTracker(n, v, log)) for n, v in saved.items())
+	try:
+		shape = func(*args)
+	finally:
+		g.update(saved)
+	return shape, code, sorted(log, key = repr)
+
+def _value(name, key):
+	v = globals().get(name)
+	if key is not None and key != '*':
+		if not isinstance(v, dict) or key not in v:
+			return '<ausente>'
+		v = v[key]
+	return repr(v)
+
+def readName(name, key):
+	if key is None:
+		return name
+	return '%s[*]' % name if key == '*' else '%s[%r]' % (name, key)
+
+def fingerprint(name, cache = None):
+	"""Impressao digital da parte 'name': codigo da construtora e das funcoes auxiliares que ela chama,
+	valores dos parametros que ela le e impressoes digitais das dependencias. Com um BrepCache que tenha
+	o registro de leituras da ultima construcao, so contam as constantes e chaves de dicionario realmente
+	lidas; sem ele, contam todos os parametros referenciados (dicionarios inteiros)."""
+	func, deps = _builders[name]
+	code, names = _scan(func)
+	rec = cache.loadReads(name) if cache is not None else None
+	if rec is not None and rec['code'] == code:
+		reads = [(n, k) for n, k, v in rec['reads']]
+	else:
+		reads = [(n, '*' if isinstance(globals()[n], dict) else None) for n in sorted(names)]
+	h = hashlib.sha256(code.encode())
+	for n, k in reads:
+		h.update(('%s=%s;' % (readName(n, k), _value(n, k))).encode())
+	for d in deps:
+		h.update(fingerprint(d, cache).encode())
+	return h.hexdigest()[:20]
+
+def changedReads(name, cache):
+	"""Por que a parte precisa ser reconstruida: parametros lidos cujo valor mudou, dependencias alteradas,
+	codigo alterado ou ausencia de registro da construcao anterior."""
+	func, deps = _builders[name]
+	rec = cache.loadReads(name)
+	if rec is None:
+		return ['primeira construcao']
+	if rec['code'] != _scan(func)[0]:
+		return ['codigo']
+	changed = [readName(n, k) for n, k, v in rec['reads'] if _value(n, k) != v]
+	changed += [d for d in deps if rec['deps'].get(d) != fingerprint(d, cache)]
+	return changed or ['fora do cache']
+
+def _consumers(names):
+	"""Quantas partes do fecho das dependencias de 'names' usam cada parte."""
+	count, seen, pending = {}, set(), list(names)
+	while pending:
+		n = pending.pop()
+		if n in seen:
+			continue
+		seen.add(n)
+		for d in _builders[n][1]:
+			count[d] = count.get(d, 0) + 1
+			pending.append(d)
+	return count
+
+class partScope(object):
+	"""Escopo da construcao de uma parte: ao sair, as formas medidas por extremes() durante a construcao
+	(intermediarios que o cache de medidas manteria vivos) sao liberadas. E uma classe, e nao um
+	gerador com decorador, para continuar valendo na copia do modulo de horus_trace (sem decoradores)."""
+	def __enter__(self):
+		return self
+	def __exit__(self, *exc):
+		_extremesCache.clear()
+		return False
+
+def memoryUsage():
+	"""(RSS atual, pico de RSS) do processo [MB]."""
+	import resource
+	peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss/1024.0   #kB no Linux
+	try:
+		with open('/proc/self/statm') as f:
+			rss = int(f.read().split()[1])*os.sysconf('SC_PAGE_SIZE')/2.0**20
+	except (OSError, ValueError):
+		rss = peak
+	return rss, peak
+
+def liveShapes():
+	"""Numero de formas (Part.Shape) ainda referenciadas por objetos do Python. Percorre todo o heap:
+	so e chamada quando o uso de memoria e pedido (build com 'memory')."""
+	gc.collect()
+	return len({id(o) for o in gc.get_referents(*gc.get_objects()) if isinstance(o, Part.Shape)})
+
+def build(names, built = None, cache = None, timings = None, rebuilt = None, memory = None, _release = None):
+	"""Constroi sob demanda as partes pedidas e suas dependencias (cada uma uma unica vez).
+	Com um BrepCache, partes cuja impressao digital ja esta no cache sao apenas carregadas e as
+	construidas tem registrados os parametros que leram (ver fingerprint).
+	Com um dicionario 'timings', registra nele o tempo [s] de construcao (ou carga) de cada parte;
+	com um dicionario 'rebuilt', registra para cada parte reconstruida os motivos (ver changedReads);
+	com um dicionario 'memory', registra o uso de memoria apos cada parte (ver memoryReport).
+	Cada parte e construida num partScope e as dependencias que nao foram pedidas sao liberadas assim
+	que a ultima parte que as usa fica pronta; as primitivas (ver primitive) valem so durante a chamada.
+	Retorna um dicionario nome -> forma com as partes pedidas, na ordem pedida."""
+	if built is None:
+		try:
+			return build(names, {}, cache, timings, rebuilt, memory, (_consumers(names), set(names)))
+		finally:
+			_primitives.clear()
+	for name in names:
+		if name not in built:
+			func, deps = _builders[name]
+			t0 = time.perf_counter()
+			peak0 = memoryUsage()[1] if memory is not None else None
+			shape = None
+			if cache is not None:
+				shape = cache.load(name, fingerprint(name, cache))
+				if shape is None and rebuilt is not None:
+					rebuilt[name] = changedReads(name, cache)
+			if shape is None:
+				build(deps, built, cache, timings, rebuilt, memory, _release)
+				t0 = time.perf_counter()
+				with partScope():
+					shape, code, reads = _trackedCall(func, [built[d] for d in deps])
+				if cache is not None:
+					cache.storeReads(name, {'code': code, 'reads': [(n, k, _value(n, k)) for n, k in reads],
+											'deps': {d: fingerprint(d, cache) for d in deps}})
+					cache.store(name, fingerprint(name, cache), shape)
+			if timings is not None:
+				timings[name] = time.perf_counter() - t0
+			built[name] = shape
+			if _release is not None:
+				count, keep = _release
+				for d in deps:
+					count[d] -= 1
+					if count[d] == 0 and d not in keep:
+						built.pop(d, None)
+			if memory is not None:
+				rss, peak = memoryUsage()
+				memory[name] = {'rss': rss, 'peak': peak, 'peakGrowth': peak - peak0, 'shapes': liveShapes()}
+	return {name: built[name] for name in names}
+
+def _buildBrep(name, cache = None, memory = False):
+	"""Constroi a parte num processo; retorna (BREP, tempo, uso de memoria, acertos e faltas do cache no processo)."""
+	timings = {}
+	usage = {} if memory else None
+	counts = (cache.hits, cache.misses) if cache is not None else (0, 0)
+	shape = build([name], cache = cache, timings = timings, memory = usage)[name]
+	if cache is not None:
+		counts = (cache.hits - counts[0], cache.misses - counts[1])
+	return shape.exportBrepToString(), timings[name], usage, counts
+
+def memoryReport(memory):
+	"""Tabela do uso de memoria apos cada parte (dicionario de build()): RSS, pico de RSS do processo,
+	crescimento do pico durante a parte e formas ainda vivas."""
+	lines = ['%-20s %10s %10s %10s %7s' % ('parte', 'RSS', 'pico', '+pico', 'formas')]
+	for name, m in memory.items():
+		lines.append('%-20s %7.1f MB %7.1f MB %7.1f MB %7d' % (name, m['rss'], m['peak'], m['peakGrowth'], m['shapes']))
+	return '\n'.join(lines)
+
+def rebuildReport(rebuilt, total):
+	"""'reconstruidas N de M partes porque X mudou', a partir do dicionario parte -> motivos de build()."""
+	if not rebuilt:
+		return 'reconstruidas 0 de %d partes' % total
+	reasons = {}
+	for name, why in rebuilt.items():
+		for r in why:
+			reasons.setdefault(r, []).append(name)
+	return 'reconstruidas %d de %d partes porque mudou: %s' % (len(rebuilt), total,
+		'; '.join('%s (%s)' % (r, ', '.join(n)) for r, n in sorted(reasons.items())))
+
+def buildParallel(names, jobs = None, cache = None, timings = None, rebuilt = None, memory = None):
+	"""Constroi cada parte pedida num processo separado (no maximo 'jobs' simultaneos).
+	Os processos devolvem as formas em BREP; o resultado segue a ordem de 'names'.
+	Com um dicionario 'memory', registra o uso de memoria de cada processo (ver build).
+	Os acertos e faltas do cache nos processos sao somados aos do cache do processo principal."""
+	if jobs == 1:
+		return build(names, cache = cache, timings = timings, rebuilt = rebuilt, memory = memory)
+	import multiprocessing
+	from concurrent.futures import ProcessPoolExecutor
+	timings = {} if timings is None else timings
+	parts = {}
+	if cache is not None:
+		for name in names:
+			t0 = time.perf_counter()
+			shape = cache.load(name, fingerprint(name, cache))
+			if shape is not None:
+				parts[name] = shape
+				timings[name] = time.perf_counter() - t0
+			elif rebuilt is not None:
+				rebuilt[name] = changedReads(name, cache)
+	todo = [name for name in names if name not in parts]
+	with ProcessPoolExecutor(jobs, mp_context = multiprocessing.get_context('fork')) as pool:
+		results = list(pool.map(functools.partial(_buildBrep, cache = cache, memory = memory is not None), todo))
+	for name, (brep, dt, usage, (hits, misses)) in zip(todo, results):
+		parts[name] = Part.Shape()
+		parts[name].importBrepFromString(brep)
+		timings[name] = dt
+		if cache is not None:
+			#A falta da propria parte ja foi contada aqui, antes de mandar a parte ao processo
+			cache.hits += hits
+			cache.misses += misses - 1
+		if memory is not None:
+			memory.update(usage)
+	return {name: parts[name] for name in names}
 
 class document(object):
 	def __init__(self, name = 'Document'):
 		"""Classe para criacao de documentos gerais no FreeCAD."""
 		self.doc = FreeCAD.newDocument(name)
 		self.featuresDict = {}
+		self.colorsDict = {}
+		self.batching = False
+	@contextlib.contextmanager
+	def batch(self, name = 'Incluir partes'):
+		"""Agrupa as inclusoes numa unica transacao, com o recalculo do documento suspenso e as cores
+		aplicadas de uma vez no fim; ao sair, o documento e recalculado uma unica vez. Em caso de erro
+		a transacao e desfeita. Blocos aninhados fazem parte do bloco externo."""
+		if self.batching:
+			yield self
+			return
+		frozen = self.doc.RecomputesFrozen
+		self.doc.openTransaction(name)
+		self.doc.RecomputesFrozen = True
+		self.batching = True
+		try:
+			yield self
+		except BaseException:
+			self.doc.abortTransaction()
+			raise
+		else:
+			self.applyColors()
+			self.doc.commitTransaction()
+		finally:
+			self.batching = False
+			self.doc.RecomputesFrozen = frozen
+		self.doc.recompute()
 	def includeFeature(self, feature, featureName):
 		x = self.doc.addObject("Part::Feature",featureName)
 		x.Shape = feature
 		self.featuresDict[featureName] = x
+	def includeFeatures(self, partsDict):
+		"""Inclui as formas de um dicionario nome -> forma num unico bloco (ver batch)."""
+		with self.batch():
+			for pName in partsDict:
+				self.includeFeature(partsDict[pName], pName)
+	def includeParts(self, names):
+		self.includeFeatures(build(names))
 	def includeGroup(self, partsDict, groupName):
-		group = self.doc.addObject('App::DocumentObjectGroup', groupName)
-		for pName in partsDict:
-			self.includeFeature(partsDict[pName], pName)
-			group.addObject(self.doc.getObject(pName))
+		with self.batch():
+			group = self.doc.addObject('App::DocumentObjectGroup', groupName)
+			self.includeFeatures(partsDict)
+			group.addObjects([self.featuresDict[pName] for pName in partsDict])
 	def addTechDraw(self, featuresList = 'allFeatures', direction = (1.0, 1.0, 1.0), scale = 0.05, pageName = 'Page', templateName = 'Template', viewName = 'View'):
 		page = self.doc.addObject('TechDraw::DrawPage', pageName)
 		template = self.doc.addObject('TechDraw::DrawSVGTemplate', templateName)
-		template.Template = '/tmp/.mount_FreeCA3rQBHp/usr/data/Mod/TechDraw/Templates/A4_LandscapeTD.svg'
+		template.Template = os.path.join(FreeCAD.getResourceDir(), 'Mod', 'TechDraw', 'Templates', 'A4_LandscapeTD.svg')
 		page.Template = template
 		view = self.doc.addObject('TechDraw::DrawViewPart', viewName)
 		page.addView(view)
@@ -205,7 +641,24 @@ class document(object):
 		view.Direction = direction
 		view.Scale = scale
 	def setColor(self, featureName, r, g, b):
-		self.featuresDict[featureName].ViewObject.ShapeColor = (r,g,b)
+		self.colorsDict[featureName] = (r,g,b)
+		if FreeCAD.GuiUp and not self.batching:
+			self.featuresDict[featureName].ViewObject.ShapeColor = (r,g,b)
+	def applyColors(self):
+		if FreeCAD.GuiUp:
+			for featureName, color in self.colorsDict.items():
+				self.featuresDict[featureName].ViewObject.ShapeColor = color
+	def save(self, fileName, compression = None):
+		"""Grava o documento (FCStd) com o nivel de compressao do zip dado (0 = sem compressao, 9 = maxima;
+		None usa a preferencia do FreeCAD), sem alterar a preferencia."""
+		param = FreeCAD.ParamGet('User parameter:BaseApp/Preferences/Document')
+		previous = param.GetInt('CompressionLevel', 3)
+		if compression is not None:
+			param.SetInt('CompressionLevel', compression)
+		try:
+			self.doc.saveAs(os.path.abspath(fileName))
+		finally:
+			param.SetInt('CompressionLevel', previous)
 
 
 
@@ -214,365 +667,193 @@ class document(object):
 # Horus design for the Stellector Project
 #****************************************
 
-#Unidades: milimetros
-
-#Tolerancia da impressora 3D:
-tol = 0.25
-
-#Motor de passo 28BYJ-48:
-mp_rad = 14.0+tol/2
-mp_par_centro = 17.5
-mp_par_rad_ext = 3.5
-mp_par_rad_int = 2.1+tol/2
-mp_prof = 19.0
-mp_eixo_chanfro_comp = 6.0
-mp_basecabo_alt = 17.0
-mp_basecabo_lar = 14.6
-mp_basecabo_prof = 5.9
-mp_basecabo_rad = math.sqrt((mp_basecabo_lar/2)**2+mp_basecabo_alt**2)
-mp_conector_lar = 15.0
-mp_conector_alt = 6.0
-mp_rad_eixo = 2.5+tol/2
-mp_sep_eixo = 4.0+tol
-mp_comp_eixo = 6.0
-mp_acha_eixo = 3.0+tol - 0.2   #largura da parte achatada do eixo  (0.2 é o fator de correção obtido após impressão da peça)
-mp_desl_eixo = 8.0   #deslocamento do eixo em relacao ao centro do motor
-
-#Rolamento:
-rol_rad_int = 4.55/2 + 0.45/2  #0.45 é o fator de correção obtido após impressão da peça
-rol_rad_ext = 9.45/2 + tol/2
-rol_rad_a_ext = 6.0/2 + tol/2
-rol_lar = 3.05 + tol/2
-
-#Parafuso do laser (M4):
-diam_par = 2.5
-passo_par = 0.7
-comp_par = 5.0
-
-#Pés de nivelamento:
-diam_nivel = 11.0
-
-#Sensor de distancia ultrassonico:
-sep_ultra_par_suporte = 80.0 #distancia minima entre o sensor ultrassonico e o parafuso do suporte de forma a não haver obstrução em direção ao solo.
-
-#Rosca e pino do tripe:
-diam_pino = 4.0  #diâmetro do pino retrátil
-diam_porca_sextavada = 12.4
-alt_porca_sextavada = 5.5
-passo_par_suporte = 1.25
-comp_par_suporte = 6.0
-sep_pino_par = 14.0 #separação do pino retrátil ao parafuso do suporte
-diam_par_suporte = 6.1 #diâmetro externo do parafuso do suporte (contando com a rosca)
-
-#Suporte movel:
-sm_cB_rad_int = mp_rad
-sm_cB_prof = 15.0
-sm_cB_rad_ext = 6.0 + mp_par_centro + mp_par_rad_ext
-sm_cB_ressalto_ang = 120.0
-sm_cB_basecabo_lar = mp_conector_lar + 1.0
-
-#Protetor do cabo:
-sm_prot_cabo_lar = sm_cB_basecabo_lar
-sm_prot_cabo_esp = 3.0
-sm_prot_cabo_prof = 2.0
-sm_prot_cabo_comp = mp_conector_alt + 1.0
-
-#Laser:
-laser_rad = 6.0 + tol/2
-laser_comp_circuito = 19.0
-laser_comp_metal_liso = 24.5
-laser_comp_metal_rosca = 10.5
-laser_comp = laser_comp_circuito+laser_comp_metal_liso+laser_comp_metal_rosca
-
-#Suporte laser:
-sl_rad_int = laser_rad
-sl_rad_ext = laser_rad + 2.0
-sl_sep_suporte = 5.0
-sl_eixo_comp = 2*sl_rad_ext + 2*sl_sep_suporte
-sl_eixo_rad = 2*mp_rad_eixo
-sl_rol_esp = 2.0
-
-#Suporte eixo laser:
-sel_alt = 2*sl_eixo_rad
-sel_esp = 4.0
-sel_comp = laser_comp + 2*6.0
-sel_lar = sl_eixo_comp + mp_sep_eixo
-
-#Bateria Power Bank 10000 mAh:
-Batt = {	'com': 155.5,	#comprimento
-			'lar': 77.2,	#largura
-			'alt': 12.15,	#altura
-			'fendaSaidaLar': 10.0,	#largura da fenda do cabo de saída de energia
-			'fendaSaidaCom': 4.0,	#comprimento da fenda do cabo de saída de energia
-			'fendaEntLar': 15.0,	#largura da fenda do cabo de entrada de energia
-			'fendaCentCom': 17.0,	#centro da fenda do cabo de entrada de energia em relação à borda longitudinal da bateria
-			'fendaCentAlt': 5.0,	#centro da fenda do cabo de entrada de energia em relação à base da bateria
-			'fendaExt': 30.0}		#extensão da fenda do cabo de entrada de energia em relação à base da bateria
-
-#ESP32:
-ESP32 = {	'com': 65.0,		#comprimento
-			'lar': 30.0,		#largura
-			'sepCom': 51.0,		#separacao dos parafusos no comprimento
-			'sepLar': 23.0,		#separacao dos parafusos na largura
-			'par': 2.75}		#diametro dos furos dos parafusos
-
-#Sensor ultrassonico HC-SR04:
-Ultra = {	'com': 45.0,		#comprimento
-			'lar': 20.0,		#largura
-			'erDiam': 16.0,		#diametro do emissor e receptor
-			'erSep': 26.0,		#separacao entre o centro do emissor e receptor
-			'sepCom': 41.0,		#separacao dos parafusos no comprimento
-			'sepLar': 16.5,		#separacao dos parafusos na largura
-			'par': 2.0}			#diametro dos furos dos parafusos
-
-#Magnetometro GY-282:
-#Magnet = {	'com': 18.0,		#comprimento
-#			'lar': 14.0,		#largura
-#			'sepCom': 13.0,		#separacao dos parafusos no comprimento
-#			'sepLar': 9.0,		#separacao dos parafusos na largura
-#			'par': 3.0}			#diametro dos furos dos parafusos
-
-#Magnetometro-Acelerômetro GY-511:
-Magnet = {	'com': 20.5,		#comprimento
-			'lar': 14.5,		#largura
-			'sepCom': 15.1,		#separacao dos parafusos no comprimento
-			'dlar': 9.0,		#distancia do centro dos parafusos a borda no sentido da largura
-			'par': 3.0}			#diametro dos furos dos parafusos
-
-#Acelerometro MPU6050:
-Aceler = {	'com': 20.3,		#comprimento
-			'lar': 15.6,		#largura
-			'dcom': 2.5,		#distancia do centro dos parafusos a borda no sentido do comprimento
-			'dlar': 2.5,		#distancia do centro dos parafusos a borda no sentido da largura
-			'par': 3.0}			#diametro dos furos dos parafusos
-
-#Driver motor de passo:
-Driver = {	'sepLar': 27.0,	#separacao dos parafusos na largura
-			'par': 2.75}	#diametro dos furos dos parafusos
-
-#Display oled 0.96'':
-Display = {	'com': 30.0,		#comprimento da placa
-			'lar': 27.0,		#largura da placa
-			'dispCom': 21.7,	#comprimento do display
-			'dispLar': 10.9,	#largura do display
-			'dispAlt': 1.65,	#altura do display
-			'dispBase': 7.2,	#altura do início do display em relação ao início da placa
-			'sepCom': 22.0,	#separacao dos parafusos no comprimento
-			'sepLar': 22.0,	#separacao dos parafusos na largura
-			'par': 2.0}		#diametro dos furos dos parafusos
-
-#Interruptor de energia:
-Interr = {	'lar': 19.0,	#largura por trás da moldura
-			'alt': 12.8}		#altura por trás da moldura}
-
-Torre = {	'l1': 15.0,			#comprimento do pé da Torre
-			'l2':  Batt['lar'],	#comprimento da base interna da Torre
-			'h1': 48.0,
-			'h2': 7.0,
-			'h3': 75.0,
-			'r1': 10.0,			#raio do disco de suporte do rolamento
-			'e': 4.0,			#espessura
-			'lar': sm_cB_prof,		#largura
-			'com': Batt['lar'],
-			'par': 3.5}			#diâmetro dos furos da base
-
-#Base octagonal da montagem:
-BaseM = {	'N': 8,							#numero de lados da base
-			'larInt': Batt['com'] + 40.0,	#largura interna do octogono
-			'larExt': Batt['com'] + 60.0,	#largura externa do octogono (borda)
-			'espes': 18.0,					#espessura da baseOctagonal
-			'profBat': Batt['alt'] + 1.0,	#profundidade do vale da bateria
-			'sepTorres': 84.0 + mp_sep_eixo}				#separação entre as faces internas das torres de sustentação dos motores de passo
-
-
-#Parafuso auto atarrachante 2.2 curto:
-Par2p2 = {	'diam': 1.6,	#diâmetro da raiz do parafuso
-			'com': 6.5}			#comprimento}
-#Parafuso auto atarrachante 2.9 curto:
-Par2p9c = {	'diam': 2.2,	#diâmetro da raiz do parafuso
-			'com': 6.5}		#comprimento}
-#Parafuso auto atarrachante 2.9 longo:
-Par2p9l = {	'diam': 2.2,	#diâmetro da raiz do parafuso
-			'com': 9.5}		#comprimento}
+#Parametros do projeto: ver horus_params.py
 
 #Pino eixo macho:
-inc = 30.0*math.pi/180 #Angulo de inclinacao para evitar uso de suporte
-x = mp_acha_eixo/2
-r = mp_rad_eixo
-y1 = math.sqrt(r**2-x**2)
-y2 = x*math.tan(inc)
-pol = makePoly([[x,-y1,0.0],[x,y1,0.0],[0.0,y1+y2,0.0],[-x,y1,0.0],[-x,-y1,0.0]])
-a = math.asin(y1/r)*180/math.pi
-arc = ArcAngle(r,a+180.0,360.0-a).toShape()
-e_macho = Part.Face(Part.Wire([pol,arc])).extrude(VZ*mp_comp_eixo)
+@builder('e_macho')
+def eixoMachoPart():
+	inc = 30.0*math.pi/180 #Angulo de inclinacao para evitar uso de suporte
+	x = mp_acha_eixo/2
+	r = mp_rad_eixo
+	y1 = math.sqrt(r**2-x**2)
+	y2 = x*math.tan(inc)
+	pol = makePoly([[x,-y1,0.0],[x,y1,0.0],[0.0,y1+y2,0.0],[-x,y1,0.0],[-x,-y1,0.0]])
+	a = math.asin(y1/r)*180/math.pi
+	arc = ArcAngle(r,a+180.0,360.0-a).toShape()
+	return Part.Face(Part.Wire([pol,arc])).extrude(VZ*mp_comp_eixo)
 
 #Suporte motor móvel:
-SM_cB_ext = Part.makeCylinder(sm_cB_rad_ext, sm_cB_prof)
-SM_cB_int = Part.makeCylinder(sm_cB_rad_int, sm_cB_prof)
-SM_cB = SM_cB_ext.cut(SM_cB_int)
-
-##Furos dos parafusos
-F1 = Part.makeCylinder(mp_par_rad_int,sm_cB_prof)
-F1.translate(vecX(mp_par_centro))
-F2 = Part.makeCylinder(mp_par_rad_int,sm_cB_prof)
-F2.translate(vecX(-mp_par_centro))
-
-##Abertura de espaco para encaixe do motor no eixo
-C1 = ArcAngle(mp_rad, -90-sm_cB_ressalto_ang/2, -90+sm_cB_ressalto_ang/2).toShape()
-C2 = ArcAngle(mp_par_centro+mp_par_rad_ext+1.0+tol, -90-sm_cB_ressalto_ang/2, -90+sm_cB_ressalto_ang/2).toShape()
-L1 = Part.LineSegment(C1.Vertexes[0].Point,C2.Vertexes[0].Point).toShape()
-L2 = Part.LineSegment(C1.Vertexes[1].Point,C2.Vertexes[1].Point).toShape()
-F3 = Part.Face(Part.Wire([C1,L2,C2,L1])).extrude(vecZ(sm_cB_prof))
-F4 = F3.copy()
-F4.rotate(V0, vecZ(1),180)
-
-##Espaco para o cabo
-B1 = Part.makeBox(sm_cB_basecabo_lar,sm_cB_rad_ext-mp_basecabo_alt,mp_basecabo_prof)
-B1.translate(Base.Vector(-sm_cB_basecabo_lar/2,-sm_cB_rad_ext,sm_cB_prof-mp_basecabo_prof))
-
-##Apoio para o cabo
-dy = (sm_cB_rad_ext-sm_cB_rad_int)/2
-p1 = [0,0,0]
-p2 = [-sm_prot_cabo_esp,0,0]
-p3 = [-sm_prot_cabo_esp,-sm_prot_cabo_comp-dy-sm_prot_cabo_esp,0]
-p4 = [sm_prot_cabo_lar+sm_prot_cabo_esp,-sm_prot_cabo_comp-dy-sm_prot_cabo_esp,0]
-p5 = [sm_prot_cabo_lar+sm_prot_cabo_esp,0,0]
-p6 = [sm_prot_cabo_lar,0,0]
-p7 = [sm_prot_cabo_lar,-sm_prot_cabo_comp-dy,0]
-p8 = [0,-sm_prot_cabo_comp-dy,0]
-A1 = Part.Face(makePoly([p1,p2,p3,p4,p5,p6,p7,p8,p1])).extrude(vecZ(-sm_prot_cabo_prof))
-A1.translate(Base.Vector(-sm_prot_cabo_lar/2,-(sm_cB_rad_ext+sm_cB_rad_int)/2,sm_cB_prof))
-
-SM_cB0 = SM_cB.cut(F1).cut(F2).cut(F3).cut(F4)
-SM_cB = SM_cB0.cut(B1).fuse(A1)
-
-##Apoio para o eixo
-larg_engate = 3.0
-B1 = Part.makeBox(sel_comp+2*sel_esp,sel_lar+2*sel_esp,sel_alt)
-B2 = Part.makeBox(sel_comp,sel_lar,sel_alt)
-B2.translate(Base.Vector(sel_esp,sel_esp,0))
-B3 = Part.makeBox(sel_comp-sm_cB_prof-larg_engate,sel_esp,sel_alt)
-B3.translate(vecX(((sel_comp+2*sel_esp)-(sel_comp-sm_cB_prof-larg_engate))/2))
-B1 = B1.cut(B2).cut(B3)
-B1.rotate(V0, vecX(1), 90)
-B1.translate(Base.Vector(-sel_comp/2-sel_esp,sel_alt/2,sm_cB_prof-sel_esp))
-
-C1 = makeDrop(rol_rad_ext, rol_lar, 30.0)
-C1.translate(Base.Vector(0,mp_desl_eixo,sm_cB_prof+sel_lar))
-sobra_rol = Part.makeBox(3*rol_rad_ext,sel_alt/2+mp_desl_eixo,sel_esp+2.0)
-sobra_rol.translate(Base.Vector(-3*rol_rad_ext/2,-sel_alt/2,sm_cB_prof+sel_lar))
-sobra_circ = Part.makeCylinder(3*rol_rad_ext/2,sel_esp+2.0)
-sobra_circ.translate(Base.Vector(0,mp_desl_eixo,sm_cB_prof+sel_lar))
-
-B4 = Part.makeBox(larg_engate,sel_alt,sm_cB_prof*0.75)
-B4.translate(Base.Vector(-sm_cB_rad_ext,-sel_alt/2,sm_cB_prof-sm_cB_prof*0.75))
-B4 = B4.common(Part.makeCylinder(sm_cB_rad_ext,sm_cB_prof))
-B5 = B4.copy()
-B5.rotate(V0,vecZ(1),180)
-B1 = B1.fuse(sobra_rol).fuse(sobra_circ).cut(C1).fuse(B4).fuse(B5)
-
-#Procedimento para incluir a tolerância da impressora no recorte do suporte do motor
-B4l = Part.makeBox(larg_engate+tol,sel_alt+tol,sm_cB_prof*0.75+tol)
-B4l.translate(Base.Vector(-sm_cB_rad_ext-tol/2,-sel_alt/2-tol/2,sm_cB_prof-sm_cB_prof*0.75-tol/2))
-B5l = B4l.copy()
-B5l.rotate(V0,vecZ(1),180)
-B1l = B4l.fuse(B5l)
-
-furoParSEL1a = makeDrop(Par2p2['diam']/2+tol/2,4*larg_engate,30)
-furoParSEL1a.rotate(V0,VY,90)
-furoParSEL1a.translate(VX*mp_par_centro + VZ*(sm_cB_prof*0.5))
-furoParSEL2a = mirrorX(furoParSEL1a)
-
-SupEixoLaser = B1.cut(furoParSEL1a).cut(furoParSEL2a).removeSplitter()
-
-furoParSEL1b = makeDrop(Par2p2['diam']/2+tol/2,4*larg_engate,30)
-furoParSEL1b.rotate(V0,VZ,90)
-furoParSEL1b.rotate(V0,VY,90)
-furoParSEL1b.translate(VX*mp_par_centro + VZ*(sm_cB_prof*0.5))
-furoParSEL2b = mirrorX(furoParSEL1b)
-
-SM_cB = SM_cB.cut(B1l).cut(furoParSEL1b).cut(furoParSEL2b).removeSplitter()
+@builder('StepperMob')
+def suporteMotorPart():
+	SM_cB_ext = Part.makeCylinder(sm_cB_rad_ext, sm_cB_prof)
+	SM_cB_int = Part.makeCylinder(sm_cB_rad_int, sm_cB_prof)
+	SM_cB = SM_cB_ext.cut(SM_cB_int)
+
+	##Furos dos parafusos
+	F1 = Part.makeCylinder(mp_par_rad_int,sm_cB_prof)
+	F1.translate(vecX(mp_par_centro))
+	F2 = Part.makeCylinder(mp_par_rad_int,sm_cB_prof)
+	F2.translate(vecX(-mp_par_centro))
+
+	##Abertura de espaco para encaixe do motor no eixo
+	C1 = ArcAngle(mp_rad, -90-sm_cB_ressalto_ang/2, -90+sm_cB_ressalto_ang/2).toShape()
+	C2 = ArcAngle(mp_par_centro+mp_par_rad_ext+1.0+tol, -90-sm_cB_ressalto_ang/2, -90+sm_cB_ressalto_ang/2).toShape()
+	L1 = Part.LineSegment(C1.Vertexes[0].Point,C2.Vertexes[0].Point).toShape()
+	L2 = Part.LineSegment(C1.Vertexes[1].Point,C2.Vertexes[1].Point).toShape()
+	F3 = Part.Face(Part.Wire([C1,L2,C2,L1])).extrude(vecZ(sm_cB_prof))
+	F4 = F3.copy()
+	F4.rotate(V0, vecZ(1),180)
+
+	##Espaco para o cabo
+	B1 = Part.makeBox(sm_cB_basecabo_lar,sm_cB_rad_ext-mp_basecabo_alt,mp_basecabo_prof)
+	B1.translate(Base.Vector(-sm_cB_basecabo_lar/2,-sm_cB_rad_ext,sm_cB_prof-mp_basecabo_prof))
+
+	##Apoio para o cabo
+	dy = (sm_cB_rad_ext-sm_cB_rad_int)/2
+	p1 = [0,0,0]
+	p2 = [-sm_prot_cabo_esp,0,0]
+	p3 = [-sm_prot_cabo_esp,-sm_prot_cabo_comp-dy-sm_prot_cabo_esp,0]
+	p4 = [sm_prot_cabo_lar+sm_prot_cabo_esp,-sm_prot_cabo_comp-dy-sm_prot_cabo_esp,0]
+	p5 = [sm_prot_cabo_lar+sm_prot_cabo_esp,0,0]
+	p6 = [sm_prot_cabo_lar,0,0]
+	p7 = [sm_prot_cabo_lar,-sm_prot_cabo_comp-dy,0]
+	p8 = [0,-sm_prot_cabo_comp-dy,0]
+	A1 = Part.Face(makePoly([p1,p2,p3,p4,p5,p6,p7,p8,p1])).extrude(vecZ(-sm_prot_cabo_prof))
+	A1.translate(Base.Vector(-sm_prot_cabo_lar/2,-(sm_cB_rad_ext+sm_cB_rad_int)/2,sm_cB_prof))
+
+	SM_cB = csg(SM_cB).cut(F1, F2, F3, F4, B1).fuse(A1).shape()
+
+	#Procedimento para incluir a tolerância da impressora no recorte do suporte do motor
+	B4l = Part.makeBox(larg_engate+tol,sel_alt+tol,sm_cB_prof*0.75+tol)
+	B4l.translate(Base.Vector(-sm_cB_rad_ext-tol/2,-sel_alt/2-tol/2,sm_cB_prof-sm_cB_prof*0.75-tol/2))
+	B5l = B4l.copy()
+	B5l.rotate(V0,vecZ(1),180)
+	B1l = B4l.fuse(B5l)
+
+	furoParSEL1b = primitive(makeDrop, Par2p2['diam']/2+tol/2,4*larg_engate,30)
+	furoParSEL1b.rotate(V0,VZ,90)
+	furoParSEL1b.rotate(V0,VY,90)
+	furoParSEL1b.translate(VX*mp_par_centro + VZ*(sm_cB_prof*0.5))
+	furosParSELb = mirrorPattern(furoParSEL1b, VX)
+
+	return csg(SM_cB).cut(B1l, furosParSELb).shape().removeSplitter()
 
+#Suporte eixo laser:
+@builder('LaserShaftSupport', deps = ['e_macho'])
+def suporteEixoLaserPart(e_macho):
+	##Apoio para o eixo
+	B1 = Part.makeBox(sel_comp+2*sel_esp,sel_lar+2*sel_esp,sel_alt)
+	B2 = Part.makeBox(sel_comp,sel_lar,sel_alt)
+	B2.translate(Base.Vector(sel_esp,sel_esp,0))
+	B3 = Part.makeBox(sel_comp-sm_cB_prof-larg_engate,sel_esp,sel_alt)
+	B3.translate(vecX(((sel_comp+2*sel_esp)-(sel_comp-sm_cB_prof-larg_engate))/2))
+	B1 = csg(B1).cut(B2, B3).shape()
+	B1.rotate(V0, vecX(1), 90)
+	B1.translate(Base.Vector(-sel_comp/2-sel_esp,sel_alt/2,sm_cB_prof-sel_esp))
+
+	C1 = makeDrop(rol_rad_ext, rol_lar, 30.0)
+	C1.translate(Base.Vector(0,mp_desl_eixo,sm_cB_prof+sel_lar))
+	sobra_rol = Part.makeBox(3*rol_rad_ext,sel_alt/2+mp_desl_eixo,sel_esp+2.0)
+	sobra_rol.translate(Base.Vector(-3*rol_rad_ext/2,-sel_alt/2,sm_cB_prof+sel_lar))
+	sobra_circ = Part.makeCylinder(3*rol_rad_ext/2,sel_esp+2.0)
+	sobra_circ.translate(Base.Vector(0,mp_desl_eixo,sm_cB_prof+sel_lar))
+
+	B4 = Part.makeBox(larg_engate,sel_alt,sm_cB_prof*0.75)
+	B4.translate(Base.Vector(-sm_cB_rad_ext,-sel_alt/2,sm_cB_prof-sm_cB_prof*0.75))
+	B4 = B4.common(Part.makeCylinder(sm_cB_rad_ext,sm_cB_prof))
+	B1 = csg(B1).fuse(sobra_rol, sobra_circ).cut(C1).fuse(polarPattern(B4, 2)).shape()
+
+	furoParSEL1a = primitive(makeDrop, Par2p2['diam']/2+tol/2,4*larg_engate,30)
+	furoParSEL1a.rotate(V0,VY,90)
+	furoParSEL1a.translate(VX*mp_par_centro + VZ*(sm_cB_prof*0.5))
+	furosParSELa = mirrorPattern(furoParSEL1a, VX)
+
+	SupEixoLaser = csg(B1).cut(furosParSELa).shape().removeSplitter()
+
+	#Faces externas das extremidades do apoio, onde ficam os eixos fixos (femea em +X, macho em -X):
+	faces = FaceIndex(SupEixoLaser)
+	face = faces.nearest(Base.Vector(sel_comp/2+sel_esp, 0, sm_cB_prof+sel_lar/2), surface = 'Plane', normal = VX)
+	centro = Base.Vector(*face.center) - vecZ(0.35*face.size[2])
+	eixo_fixo_femea = Part.makeCylinder(face.size[1]/2, mp_comp_eixo-2.0) # -2.0 é o fator de correção obtido após impressão da peça
+	eixo_fixo_femea = eixo_fixo_femea.cut(e_macho)
+	eixo_fixo_femea.rotate(V0, vecY(1), -90)
+	eixo_fixo_femea.translate(centro + vecX(mp_comp_eixo - 2.0))  # -2.0 é o fator de correção obtido após impressão da peça
+
+	# e_machoC é fator de correção obtido após impressão da peça:
+	e_machoC = e_macho.copy()
+	e_machoC.rotate(V0, vecY(1), -90)
+	e_machoC.translate(centro + vecX(mp_comp_eixo - 2.0))  # -2.0 é o fator de correção obtido após impressão da peça
+
+	eixo_fixo_macho = Part.makeCone(face.size[1]/2,rol_rad_a_ext,mp_comp_eixo)
+	eixo_fixo_macho1 = Part.makeCylinder(rol_rad_int-tol/2,rol_lar-tol)
+	eixo_fixo_macho1.translate(vecZ(lenZ(eixo_fixo_macho)))
+	eixo_fixo_macho = eixo_fixo_macho.fuse(eixo_fixo_macho1)
+	eixo_fixo_macho.rotate(V0, vecY(1), -90)
+	face = faces.nearest(Base.Vector(-sel_comp/2-sel_esp, 0, sm_cB_prof+sel_lar/2), surface = 'Plane', normal = -VX)
+	eixo_fixo_macho.translate(Base.Vector(*face.center) - vecZ(0.35*face.size[2]))
+
+	return csg(SupEixoLaser).fuse(eixo_fixo_femea, eixo_fixo_macho).cut(e_machoC).shape()
 
 #Suporte Laser
-
-## Prendedor do laser
-f = 0.85
-SL_cB = Part.makeCylinder(sl_rad_ext,f*laser_comp)
-SL_base = Part.makeCylinder(sl_rad_ext,sl_rad_ext-sl_rad_int)
-SL_base = SL_base.cut(Part.makeCylinder(3.5,sl_rad_ext-sl_rad_int))
-SL_cB = SL_cB.cut(Part.makeCylinder(sl_rad_int,0.85*laser_comp)).fuse(SL_base)
-
-espesAcel = 2.0
-sobra = 2.0
-scom = 3.0
-acom = Aceler['com']+scom
-dcom = Aceler['dcom']+scom/2
-larAcel = Aceler['dlar']+Aceler['par']/2 + sobra + 2.5
-encaixeAcel = Part.makeBox(larAcel,acom,espesAcel)
-furoAcel1 = makeDrop(Aceler['par']/2+tol/2, espesAcel, 30)
-furoAcel2 = furoAcel1.copy()
-furoAcel1.translate(VX*(Aceler['dlar']+sobra)+VY*dcom)
-furoAcel2.translate(VX*(Aceler['dlar']+sobra)+VY*(acom-dcom))
-encaixeAcel = encaixeAcel.cut(furoAcel1).cut(furoAcel2)
-encaixeAcel.rotate(V0,VX,90)
-encaixeAcel.translate(VX*(sl_rad_ext-1.0)+VY*2.5+VZ*(f*laser_comp-acom)/2)
-encaixeAcel.rotate(V0,VZ,-90)
-SL_cB = SL_cB.fuse(encaixeAcel)
-
-SL_cB.rotate(vecZ(laser_comp/2), vecY(1), 90)
-borda_parafuso = Part.makeCylinder(2.0+Par2p2['diam']/2+tol/2,laser_rad+Par2p2['com']/2)
-furo_parafuso = makeDrop(Par2p2['diam']/2+tol/2,laser_rad+Par2p2['com']/2,30)
-furo_parafuso.rotate(V0,VZ,-90)
-furo_parafuso.rotate(V0,vecX(1),-90)
-furo_parafuso.translate(vecZ(laser_comp/2))
-borda_parafuso.rotate(V0,vecX(1),-90)
-borda_parafuso.translate(vecZ(laser_comp/2))
-
-SL_cB = SL_cB.fuse(borda_parafuso).cut(furo_parafuso)
-SL_cB.translate(vecZ(sm_cB_prof+sel_lar/2-laser_comp/2+2.5))
-
-
-## Eixo de rotacao do laser
-SL_cE = Part.makeCylinder(sl_eixo_rad,sl_eixo_comp-sl_rol_esp)
-SL_cEr = Part.makeCylinder(rol_rad_a_ext,sl_rol_esp)
-SL_cEr.translate(vecZ(sl_eixo_comp-sl_rol_esp))
-SL_cEe = Part.makeCylinder(rol_rad_int-tol/2,rol_lar-tol)
-SL_cEe.translate(vecZ(sl_eixo_comp))
-SL_cE = SL_cE.fuse(SL_cEr).fuse(SL_cEe)
-SL_cE.translate(vecZ(sm_cB_prof+mp_sep_eixo))
-miolo = Part.makeCylinder(sl_rad_int+0.05,0.75*laser_comp)
-miolo.rotate(vecZ(laser_comp/4), vecY(1), 90)
-miolo.translate(vecZ(sm_cB_prof+sel_lar/2-laser_comp/4+2.5))
-furo_eixo = e_macho.copy()
-furo_eixo.rotate(V0, VZ, -90)
-furo_eixo.translate(Base.Vector(0,0,sm_cB_prof+mp_sep_eixo))
-#SL = SL_cB.fuse(SL_cE).cut(miolo).cut(furo_eixo).removeSplitter()
-SL = SL_cB.fuse(SL_cE).cut(furo_eixo)
-#SL = Part.makeSolid(SL)
-SL = SL.cut(miolo).removeSplitter()
-SL.translate(vecY(mp_desl_eixo))
-
-face = SupEixoLaser.Faces[7]
-eixo_fixo_femea = Part.makeCylinder(lenY(face)/2, mp_comp_eixo-2.0) # -2.0 é o fator de correção obtido após impressão da peça
-eixo_fixo_femea = eixo_fixo_femea.cut(e_macho)
-eixo_fixo_femea.rotate(V0, vecY(1), -90)
-eixo_fixo_femea.translate(center(face) - vecZ(0.35 * lenZ(face)) + vecX(mp_comp_eixo - 2.0))  # -2.0 é o fator de correção obtido após impressão da peça
-
-# e_machoC é fator de correção obtido após impressão da peça:
-e_machoC = e_macho.copy()
-e_machoC.rotate(V0, vecY(1), -90)
-e_machoC.translate(center(face) - vecZ(0.35 * lenZ(face)) + vecX(mp_comp_eixo - 2.0))  # -2.0 é o fator de correção obtido após impressão da peça
-
-eixo_fixo_macho = Part.makeCone(lenY(face)/2,rol_rad_a_ext,mp_comp_eixo)
-eixo_fixo_macho1 = Part.makeCylinder(rol_rad_int-tol/2,rol_lar-tol)
-eixo_fixo_macho1.translate(vecZ(lenZ(eixo_fixo_macho)))
-eixo_fixo_macho = eixo_fixo_macho.fuse(eixo_fixo_macho1)
-eixo_fixo_macho.rotate(V0, vecY(1), -90)
-face = SupEixoLaser.Faces[1]
-eixo_fixo_macho.translate(center(face)-vecZ(0.35*lenZ(face)))
-
-SupEixoLaser = SupEixoLaser.fuse(eixo_fixo_femea).fuse(eixo_fixo_macho).cut(e_machoC)
+@builder('LaserCase', deps = ['e_macho'])
+def suporteLaserPart(e_macho):
+	## Prendedor do laser
+	f = 0.85
+	SL_cB = Part.makeCylinder(sl_rad_ext,f*laser_comp)
+	SL_base = Part.makeCylinder(sl_rad_ext,sl_rad_ext-sl_rad_int)
+	SL_base = SL_base.cut(Part.makeCylinder(3.5,sl_rad_ext-sl_rad_int))
+	SL_cB = SL_cB.cut(Part.makeCylinder(sl_rad_int,0.85*laser_comp)).fuse(SL_base)
+
+	espesAcel = 2.0
+	sobra = 2.0
+	scom = 3.0
+	acom = Aceler['com']+scom
+	dcom = Aceler['dcom']+scom/2
+	larAcel = Aceler['dlar']+Aceler['par']/2 + sobra + 2.5
+	encaixeAcel = Part.makeBox(larAcel,acom,espesAcel)
+	furoAcel1 = makeDrop(Aceler['par']/2+tol/2, espesAcel, 30)
+	furoAcel2 = furoAcel1.copy()
+	furoAcel1.translate(VX*(Aceler['dlar']+sobra)+VY*dcom)
+	furoAcel2.translate(VX*(Aceler['dlar']+sobra)+VY*(acom-dcom))
+	encaixeAcel = csg(encaixeAcel).cut(furoAcel1, furoAcel2).shape()
+	encaixeAcel.rotate(V0,VX,90)
+	encaixeAcel.translate(VX*(sl_rad_ext-1.0)+VY*2.5+VZ*(f*laser_comp-acom)/2)
+	encaixeAcel.rotate(V0,VZ,-90)
+	SL_cB = SL_cB.fuse(encaixeAcel)
+
+	SL_cB.rotate(vecZ(laser_comp/2), vecY(1), 90)
+	borda_parafuso = Part.makeCylinder(2.0+Par2p2['diam']/2+tol/2,laser_rad+Par2p2['com']/2)
+	furo_parafuso = makeDrop(Par2p2['diam']/2+tol/2,laser_rad+Par2p2['com']/2,30)
+	furo_parafuso.rotate(V0,VZ,-90)
+	furo_parafuso.rotate(V0,vecX(1),-90)
+	furo_parafuso.translate(vecZ(laser_comp/2))
+	borda_parafuso.rotate(V0,vecX(1),-90)
+	borda_parafuso.translate(vecZ(laser_comp/2))
+
+	SL_cB = SL_cB.fuse(borda_parafuso).cut(furo_parafuso)
+	SL_cB.translate(vecZ(sm_cB_prof+sel_lar/2-laser_comp/2+2.5))
+
+
+	## Eixo de rotacao do laser
+	SL_cE = Part.makeCylinder(sl_eixo_rad,sl_eixo_comp-sl_rol_esp)
+	SL_cEr = Part.makeCylinder(rol_rad_a_ext,sl_rol_esp)
+	SL_cEr.translate(vecZ(sl_eixo_comp-sl_rol_esp))
+	SL_cEe = Part.makeCylinder(rol_rad_int-tol/2,rol_lar-tol)
+	SL_cEe.translate(vecZ(sl_eixo_comp))
+	SL_cE = csg(SL_cE).fuse(SL_cEr, SL_cEe).shape()
+	SL_cE.translate(vecZ(sm_cB_prof+mp_sep_eixo))
+	miolo = Part.makeCylinder(sl_rad_int+0.05,0.75*laser_comp)
+	miolo.rotate(vecZ(laser_comp/4), vecY(1), 90)
+	miolo.translate(vecZ(sm_cB_prof+sel_lar/2-laser_comp/4+2.5))
+	furo_eixo = e_macho.copy()
+	furo_eixo.rotate(V0, VZ, -90)
+	furo_eixo.translate(Base.Vector(0,0,sm_cB_prof+mp_sep_eixo))
+	#SL = SL_cB.fuse(SL_cE).cut(miolo).cut(furo_eixo).removeSplitter()
+	SL = SL_cB.fuse(SL_cE).cut(furo_eixo)
+	#SL = Part.makeSolid(SL)
+	SL = SL.cut(miolo).removeSplitter()
+	SL.translate(vecY(mp_desl_eixo))
+	return SL
 
 def encaixePar(rext, rint, hfora, hdentro):
 	'''Encaixe de parafuso saliente'''
@@ -584,6 +865,7 @@ def encaixePar(rext, rint, hfora, hdentro):
 	c.translate(-VZ*(hdentro+eps))
 	return c
 
+@builder('OctagonalBase')
 def basePart():
 	#Base octagonal
 	r = BaseM['larExt']/(2*math.cos(math.pi/BaseM['N']))
@@ -622,7 +904,8 @@ def basePart():
 	apoioLateral1 = Part.Face(Part.Wire(polLateral)).extrude(VZ*(espes+Interr['alt']+tol))
 	apoioLateral1.translate(-VY*larBase/2)
 	apoioLateral2 = mirrorY(apoioLateral1)
-	apoioInterr = apoioBase.fuse(apoioLateral1).fuse(apoioLateral2)
+	apoioInterr = csg(apoioBase).fuse(apoioLateral1, apoioLateral2).shape()
+	del apoioBase, apoioLateral1, apoioLateral2
 	apoioInterr.translate(-VX*BaseM['larInt']/2 + VZ*BaseM['espes'])
 
 	#Apoio do display:
@@ -641,9 +924,9 @@ def basePart():
 	furo2 = furo1.copy()
 	furo1.translate(Base.Vector(-Display['sepCom']/2,0,altIni+(Display['lar']-Display['sepLar'])/2))
 	furo2.translate(Base.Vector(-Display['sepCom']/2,0,altIni+(Display['lar']+Display['sepLar'])/2))
-	haste1 = haste.cut(furo1).cut(furo2)
-	haste2 = mirrorX(haste1)
-	apoioDisp = haste1.fuse(haste2)
+	haste1 = csg(haste).cut(furo1, furo2).shape()
+	apoioDisp = mirrorPattern(haste1, VX)
+	del haste, suporte, furo1, furo2, haste1
 	rd = BaseM['larInt']/2 - recuo
 	apoioDisp.translate(-VY*rd + VZ*BaseM['espes'])
 	apoioDisp.rotate(V0,VZ,360.0/BaseM['N'])
@@ -654,17 +937,14 @@ def basePart():
 	centroY = BaseM['larInt']/2-Ultra['lar']/2 - 5.0
 	rint = Par2p2['diam']/2 + tol/2
 	rext = rint + epesAnelPar
-	par1 = makeRing(rext, rint, altAnelParFora)
+	par1 = primitive(makeRing, rext, rint, altAnelParFora)
 	par1.translate(VX*Ultra['sepCom']/2 - VY*Ultra['sepLar']/2)
-	par2 = par1.copy()
-	par2.rotate(V0,VZ,180)
-	parUltra = par1.fuse(par2)
+	parUltra = polarPattern(par1, 2)
 	parUltra.translate(VY*centroY+VZ*BaseM['espes'])
 	furo = Ultra['erDiam']/2 + tol + 0.35
 	furoEmRe1 = Part.makeCone(furo+0.75*BaseM['espes'], furo, BaseM['espes'])
 	furoEmRe1.translate(VX*Ultra['erSep']/2 + VY*centroY)
-	furoEmRe2 = mirrorX(furoEmRe1)
-	furoEmRe = furoEmRe1.fuse(furoEmRe2)
+	furoEmRe2 = mirrorX(furoEmRe1)   #os dois cones se sobrepoem: ferramentas separadas, nao um padrao
 
 	#Encaixe ESP32:
 	epesAnelPar = 1.5
@@ -672,13 +952,9 @@ def basePart():
 	centroY = -BaseM['larInt']/2 + ESP32['lar']/2 + 5.0
 	rint = Par2p9c['diam']/2 + tol/2
 	rext = rint + epesAnelPar
-	par1 = makeRing(rext, rint, altAnelParFora)
-	par2 = par1.copy()
+	par1 = primitive(makeRing, rext, rint, altAnelParFora)
 	par1.translate(VX*ESP32['sepCom']/2 - VY*ESP32['sepLar']/2)
-	par2.translate(VX*ESP32['sepCom']/2 + VY*ESP32['sepLar']/2)
-	par3 = par1.fuse(par2)
-	par4 = mirrorX(par3)
-	parESP32 = par4.fuse(par3)
+	parESP32 = mirrorPattern(linearPattern(par1, VY*ESP32['sepLar'], 2), VX)
 	parESP32.translate(VY*centroY+VZ*BaseM['espes'])
 
 	#Encaixe Magnetômetro-Acelerômetro:
@@ -687,10 +963,9 @@ def basePart():
 	centroY = BaseM['larInt']/2-Magnet['lar']/2 - 20.0
 	rint = Par2p9c['diam']/2 + tol/2
 	rext = rint + epesAnelPar
-	par1 = makeRing(rext, rint, altAnelParFora)
+	par1 = primitive(makeRing, rext, rint, altAnelParFora)
 	par1.translate(VX*Magnet['sepCom']/2 - VY*Magnet['dlar'])
-	par2 = mirrorX(par1)
-	parMagnet = par1.fuse(par2)	
+	parMagnet = mirrorPattern(par1, VX)
 	parMagnet.translate(VY*centroY+VZ*BaseM['espes'])
 
 	#Furo Torres:
@@ -699,15 +974,12 @@ def basePart():
 	tan = h/(l2/2)
 	eh = e/math.sin(math.atan(tan))
 	furot1 = Part.makeCylinder(Torre['par']/2+tol/2,Torre['e']+BaseM['espes'])
-	furot2 = furot1.copy()
 	furot1.translate(-VX*(BaseM['sepTorres']/2+Torre['lar']/2) - VY*(l2/2+eh+l1/2))
-	furot2.translate(VX*(BaseM['sepTorres']/2+Torre['lar']/2) - VY*(l2/2+eh+l1/2))
-	furota = furot1.fuse(furot2)
-	furotb = mirrorY(furota)
+	furota = linearPattern(furot1, VX*(BaseM['sepTorres']+Torre['lar']), 2)
 	furoDeslocado = Part.makeCylinder(Torre['par']/2+tol/2,BaseM['espes'])
 	furoDeslocado.translate(-VX*(BaseM['sepTorres']/2+Torre['lar']/2) - VY*(l2/2+eh+l1/2))
 	furoDeslocado.translate(VX*1.0*Torre['lar'] + 0*VY*l1/2)
-	furotb = furotb.fuse(furoDeslocado)
+	furosTorre = Part.makeCompound([mirrorPattern(furota, VY), furoDeslocado])
 
 	#Furos parafusos do Tripé:
 	alt_furo_porca = BaseM['espes']-2.0
@@ -721,7 +993,7 @@ def basePart():
 	p = [[r*math.cos(i*da), r*math.sin(i*da), 0.0] for i in range(N)]
 	porca = makePlate(p, VZ*alt_furo_porca, autoClose = True)
 	porca.translate(VZ*(BaseM['espes']-alt_furo_porca))
-	furosTripe = furoParTripe.fuse(furoPinoTripe).fuse(porca)
+	furosTripe = csg(furoParTripe).fuse(furoPinoTripe, porca).shape()
 	furosTripe.translate(-VY*cX)
 
 	#Furos parafusos de nivelamento:
@@ -729,26 +1001,21 @@ def basePart():
 	furoNivel3 = furoNivel1.copy()
 	furoNivel1.translate(VX*(BaseM['larInt']/2-diam_nivel/2-2.0))
 	furoNivel3.translate(-VX*(BaseM['larInt']/2-diam_nivel/2-12.0))
-	furoNivel2 = furoNivel1.copy()
-	furoNivel1.rotate(V0,VZ,-63)
-	furoNivel2.rotate(V0,VZ,55)
-	furosNivel = furoNivel1.fuse(furoNivel2).fuse(furoNivel3)
+	furosNivel = Part.makeCompound([polarPattern(furoNivel1, [-63, 55]), furoNivel3])
 
 	#Furos de fixação do envólucro:
-	furoEnvo1 = Part.makeCylinder(Par2p9l['diam']/2+tol/2,BaseM['espes'])
+	furoEnvo1 = primitive(Part.makeCylinder, Par2p9l['diam']/2+tol/2,BaseM['espes'])
 	furoEnvo1.translate(VX*(BaseM['larExt']/2-(BaseM['larExt']-BaseM['larInt'])/4))
-	furoEnvo2 = furoEnvo1.copy()
-	furoEnvo3 = furoEnvo1.copy()
-	furoEnvo4 = furoEnvo1.copy()
-	furoEnvo2.rotate(V0,VZ,90)
-	furoEnvo3.rotate(V0,VZ,180)
-	furoEnvo4.rotate(V0,VZ,270)
-	furosEnvo = furoEnvo1.fuse(furoEnvo2).fuse(furoEnvo3).fuse(furoEnvo4)
-
-	base = base.cut(batCase).cut(fendaSaida).cut(fendaEntrada).fuse(apoioInterr).fuse(apoioDisp).fuse(parUltra).fuse(parESP32).fuse(parMagnet).cut(furoEmRe)
-	base = base.cut(furota).cut(furotb).cut(furosTripe).cut(furosNivel).cut(furosEnvo)
+	furosEnvo = polarPattern(furoEnvo1, 4)
+
+	base = csg(base).cut(batCase, fendaSaida, fendaEntrada).fuse(apoioInterr, apoioDisp, parUltra, parESP32, parMagnet)
+	base = base.cut(furoEmRe1, furoEmRe2, furosTorre, furosTripe, furosNivel, furosEnvo).shape()
+	#So depois de shape() as ferramentas deixam de ser referenciadas pela cadeia e podem ser liberadas
+	del batCase, fendaSaida, fendaEntrada, apoioInterr, apoioDisp, parUltra, parESP32, parMagnet
+	del furoEmRe1, furoEmRe2, furosTorre, furosTripe, furosNivel, furosEnvo
 	return base.removeSplitter()
 
+@builder('TowerBearing')
 def torreRolPart():
 	l1, l2, h1, h2, h3, e = Torre['l1'], Torre['l2'], Torre['h1'], Torre['h2'], Torre['h3'], Torre['e']
 	h = h1 + h2 + h3
@@ -762,7 +1029,7 @@ def torreRolPart():
 	poli1 = makePlate(pi1, VX*Torre['lar'], autoClose=True)
 	pi2 = [[0,l1+eh+y2,e+h1+h2],[0,l/2,h+e],[0,l-l1-eh-y2,e+h1+h2]]
 	poli2 = makePlate(pi2, VX*Torre['lar'], autoClose=True)
-	torre = pole.cut(poli1).cut(poli2)
+	torre = csg(pole).cut(poli1, poli2).shape()
 
 	discoi = Part.makeCylinder(rol_rad_ext, rol_lar)
 	espes = Torre['lar']#rol_lar + 4.0
@@ -774,24 +1041,23 @@ def torreRolPart():
 	discoe.rotate(V0,VY,90)
 	discoe.translate(VY*(l/2)+VZ*h)
 
-	furoBase1 = makeDrop(Torre['par']/2+tol/2,e,30)
+	furoBase1 = primitive(makeDrop, Torre['par']/2+tol/2,e,30)
 	furoBase1.rotate(V0,VZ,-90)
-	furoBase2 = furoBase1.copy()
 	furoBase1.translate(VX*Torre['lar']/2 + VY*l1/2)
-	furoBase2.translate(VX*Torre['lar']/2 + VY*(l-l1/2))
+	furosBase = linearPattern(furoBase1, VY*(l-l1), 2)
 
 	#Encaixe Driver:
 	epesAnelPar = 1.0
 	altAnelParFora = Par2p9c['com'] - 1.5
 	rint = Par2p9c['diam']/2 + tol/2
 	rext = rint + epesAnelPar
-	par1 = makeRing(rext, rint, altAnelParFora)
+	par1 = primitive(makeRing, rext, rint, altAnelParFora)
 	par1.rotate(V0,VY,90)
-	par2 = par1.copy()
 	par1.translate(VX*Torre['lar'] + VY*(l/2-Driver['sepLar']/2) + VZ*(e+h1+h2/2))
-	par2.translate(VX*Torre['lar'] + VY*(l/2+Driver['sepLar']/2) + VZ*(e+h1+h2/2))
+	parDriver = linearPattern(par1, VY*Driver['sepLar'], 2)
 
-	torre = torre.cut(discoe).fuse(disco).cut(furoBase1).cut(furoBase2).fuse(par1).fuse(par2)
+	torre = csg(torre).cut(discoe).fuse(disco).cut(furosBase).fuse(parDriver).shape()
+	del pole, poli1, poli2, discoi, discoe, disco, furosBase, parDriver
 	torre.translate(VX*(-BaseM['sepTorres']/2-Torre['lar']) - VY*l/2 + VZ*BaseM['espes'])
 
 	#Amarra com a outra Torre:
@@ -806,10 +1072,11 @@ def torreRolPart():
 	amarra1.rotate(V0,VX,180*math.atan(tan)/math.pi)
 	amarra1.translate(-VX*x/2 + VY*(-l2/2+y2-eh) + VZ*(h1+h2+e+BaseM['espes']))
 	amarra2 = mirrorY(amarra1)
-	torre = torre.fuse(amarra2).fuse(amarra1)
+	torre = csg(torre).fuse(amarra2, amarra1).shape()
 
 	return torre.removeSplitter()
 
+@builder('TowerStepper')
 def torreMotorPart():
 	l1, l2, h1, h2, h3, e = Torre['l1'], Torre['l2'], Torre['h1'], Torre['h2'], Torre['h3'], Torre['e']
 	h = h1 + h2 + h3
@@ -826,7 +1093,7 @@ def torreMotorPart():
 	peBat1 = Part.makeBox(2*Torre['lar'],l1,e)
 	peBat2 = Part.makeBox(1.3*Torre['lar'],1.4*l1,e)
 	peBat2.translate(-VY*1.4*l1)
-	torre = pole.cut(poli1).cut(poli2).fuse(peBat1).fuse(peBat2)
+	torre = csg(pole).cut(poli1, poli2).fuse(peBat1, peBat2).shape()
 
 	#Anel do motor:
 	anelEspes = 5.0
@@ -851,7 +1118,8 @@ def torreMotorPart():
 	caixaInt.translate(-VX*lxi/2-VY*lyi)
 	rebaixo = Part.makeBox(lxi,lye,altRebaixo)
 	rebaixo.translate(-VX*lxi/2-VY*lye+VZ*(lzi-altRebaixo))
-	anelMotor = anelExt.fuse(caixaExt).fuse(orelhae).cut(anelInt).cut(caixaInt).cut(orelhai).cut(rebaixo).removeSplitter()
+	anelMotor = csg(anelExt).fuse(caixaExt, orelhae).cut(anelInt, caixaInt, orelhai, rebaixo).shape().removeSplitter()
+	del anelExt, orelha1e, orelha1i, orelha2e, orelha2i, orelhae, orelhai, caixaInt, rebaixo
 
 	anelMotor.rotate(V0,VZ,90)
 	anelMotor.rotate(V0,VY,90)
@@ -863,24 +1131,23 @@ def torreMotorPart():
 	caixaExt.rotate(V0,VY,90)
 	caixaExt.translate(VY*(l/2)+VZ*(h-mp_desl_eixo))
 
-	furoBase1 = makeDrop(Torre['par']/2+tol/2,e,30)
+	furoBase1 = primitive(makeDrop, Torre['par']/2+tol/2,e,30)
 	furoBase1.rotate(V0,VZ,-90)
-	furoBase2 = furoBase1.copy()
 	furoBase1.translate(VX*1.5*Torre['lar'] + VY*l1/2)
-	furoBase2.translate(VX*Torre['lar']/2 + VY*(l-l1/2))
+	furosBase = linearPattern(furoBase1, VY*(l-l1) - VX*Torre['lar'], 2)
 
 	#Encaixe Driver:
 	epesAnelPar = 1.0
 	altAnelParFora = Par2p9c['com'] - 1.5
 	rint = Par2p9c['diam']/2 + tol/2
 	rext = rint + epesAnelPar
-	par1 = makeRing(rext, rint, altAnelParFora)
+	par1 = primitive(makeRing, rext, rint, altAnelParFora)
 	par1.rotate(V0,VY,90)
-	par2 = par1.copy()
 	par1.translate(VX*Torre['lar'] + VY*(l/2-Driver['sepLar']/2) + VZ*(e+h1+h2/2))
-	par2.translate(VX*Torre['lar'] + VY*(l/2+Driver['sepLar']/2) + VZ*(e+h1+h2/2))
+	parDriver = linearPattern(par1, VY*Driver['sepLar'], 2)
 
-	torre = torre.cut(caixaExt).fuse(anelMotor).cut(anelInt).cut(furoBase1).cut(furoBase2).fuse(par1).fuse(par2)
+	torre = csg(torre).cut(caixaExt).fuse(anelMotor).cut(anelInt, furosBase).fuse(parDriver).shape()
+	del pole, poli1, poli2, peBat1, peBat2, caixaExt, anelMotor, anelInt, furosBase, parDriver
 	torre.translate(-VY*l/2)
 	torre.rotate(V0,VZ,180)
 	torre.translate(VX*(BaseM['sepTorres']/2+Torre['lar']) + VZ*BaseM['espes'])
@@ -892,36 +1159,56 @@ def torreMotorPart():
 	furoama1.translate(VX*(x-Torre['lar']/2)+VY*y/2-VZ*e)
 	furoama1.rotate(V0,VX,180*math.atan(tan)/math.pi)
 	furoama1.translate(-VX*x/2 + VY*(-l2/2+y2-eh) + VZ*(h1+h2+e+BaseM['espes']))
-	furoama2 = mirrorY(furoama1)
-
-	return torre.cut(furoama1).cut(furoama2).removeSplitter()
-
-#Criacao do documento:
-doc = document('HorusStellector')
-
-#grupo = group({'SuporteMotorPasso': SM_cB, 'SuporteEixoLaser': SupEixoLaser, 'SuporteLaser': SL})
-
-torre1 = torreRolPart()
-torre1.rotate(V0, VZ, 180)
-torre2 = torreMotorPart()
-torre2.rotate(V0, VZ, 180)
-
-grupoTorres = group({'TowerBearing': torre1, 'TowerStepper': torre2})
-doc.includeGroup(grupoTorres.partsDict, 'Towers')
-
-grupoSM = group({'StepperMob': SM_cB, 'LaserCase': SL, 'LaserShaftSupport': SupEixoLaser})
-grupoSM.rotate(V0,VZ,180)
-cSL = center(SupEixoLaser.Face47)
-cT1 = center(torre1.Face44)
-grupoSM.rotate(cSL,VX,-90)  #rotação azimutal
-grupoSM.translate(VZ*(cT1[2]-cSL[2]))
-doc.includeGroup(grupoSM.partsDict, 'MobSupport')
-
-doc.includeFeature(basePart(), 'OctagonalBase')
-
-doc.setColor('TowerStepper', 0.8,0.8,0.0)
-doc.setColor('TowerBearing', 0.0,0.8,0.8)
-doc.setColor('OctagonalBase', 0.8,0.0,0.8)
-doc.setColor('StepperMob', 0.8,0.0,0.0)
-doc.setColor('LaserShaftSupport', 0.0,0.8,0.0)
-doc.setColor('LaserCase', 0.0,0.0,0.8)
+	furosama = mirrorPattern(furoama1, VY)
+
+	return csg(torre).cut(furosama).shape().removeSplitter()
+
+def mobPlacement(parts):
+	"""Posicao do grupo movel (MobSupport) na montagem, calculada com as partes ainda na posicao de construcao:
+	giro de 180 graus em Z, rotacao azimutal de -90 graus em torno do eixo do pino do suporte do eixo (paralelo
+	a X) e ajuste da altura ao assento do rolamento da torre. Retorna (placement, ponto do eixo do pino)."""
+	SupEixoLaser, torre1 = parts['LaserShaftSupport'], parts['TowerBearing']
+	pino = FaceIndex(SupEixoLaser).nearest(SupEixoLaser.BoundBox.Center, surface = 'Cylinder', axis = VX, radius = rol_rad_int-tol/2)
+	assento = FaceIndex(torre1).nearest(torre1.BoundBox.Center, surface = 'Cylinder', axis = VX, radius = rol_rad_ext)
+	giro = Base.Placement(V0, Base.Rotation(VZ, 180))
+	cSL = giro.multVec(Base.Vector(*pino.axisPoint))
+	azimute = Base.Placement(V0, Base.Rotation(VX, -90), cSL)  #rotação azimutal
+	altura = Base.Placement(VZ*(assento.axisPoint[2]-cSL.z), Base.Rotation())
+	return altura.multiply(azimute).multiply(giro), Base.Vector(*pino.axisPoint)
+
+def motorAxes(parts):
+	"""Eixos dos motores na montagem, como (ponto, direcao), calculados com as partes na posicao de construcao:
+	'fix' gira todo o grupo movel (eixo do pino do suporte do eixo) e 'mob' gira o LaserCase (eixo do motor
+	do StepperMob, deslocado de mp_desl_eixo do centro do motor)."""
+	pl, pino = mobPlacement(parts)
+	return {'fix': (pl.multVec(pino), pl.Rotation.multVec(VX)),
+			'mob': (pl.multVec(vecY(mp_desl_eixo)), pl.Rotation.multVec(VZ))}
+
+def assemble(parts):
+	"""Posiciona as partes do Horus (dicionario nome -> forma, alterado no lugar) na montagem final."""
+	pl, pino = mobPlacement(parts)
+	parts['TowerBearing'].rotate(V0, VZ, 180)
+	parts['TowerStepper'].rotate(V0, VZ, 180)
+	grupoSM = group({p: parts[p] for p in horusGroups['MobSupport']})
+	grupoSM.place(pl)
+	return parts
+
+def horusDocument(parts, name = 'HorusStellector'):
+	"""Cria o documento com as partes ja construidas, montadas quando todas estao presentes."""
+	if all(p in parts for p in horusParts):
+		assemble(parts)
+	doc = document(name)
+	with doc.batch('Montagem do Horus'):
+		for gName in horusGroups:
+			members = {p: parts[p] for p in horusGroups[gName] if p in parts}
+			if members:
+				doc.includeGroup(members, gName)
+		if 'OctagonalBase' in parts:
+			doc.includeFeature(parts['OctagonalBase'], 'OctagonalBase')
+		for pName in parts:
+			doc.setColor(pName, *partColors[pName])
+	return doc
+
+if __name__ == '__main__':
+	#Criacao do documento:
+	doc = horusDocument(build(horusParts))
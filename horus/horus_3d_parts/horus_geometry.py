@@ -0,0 +1,175 @@
+# coding: utf-8
+
+"""
+Copyright 2021 João T. Carvalho-Neto, Fernando A. Pedersen and Matheus N. S. Silva
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+****************************************
+Stellector Project Horus 3D parts.
+
+Spatial indexes: KD-tree and geometric face selection
+****************************************
+"""
+
+import heapq
+import numpy
+
+
+class KDTree(object):
+	def __init__(self, points, leafSize = 64):
+		"""KD-tree de pontos (array n x 3) com folhas de ate leafSize pontos.
+		Cada no guarda a caixa envolvente dos seus pontos (lo, hi), usada para podar as buscas."""
+		self.points = numpy.asarray(points, dtype = numpy.float64).reshape(-1, 3)
+		self.leafSize = leafSize
+		self.index = numpy.arange(len(self.points))
+		self.lo, self.hi, self.children, self.ranges = [], [], [], []
+		if len(self.points):
+			self._build(0, len(self.points))
+		self.lo, self.hi = numpy.array(self.lo), numpy.array(self.hi)
+	def _build(self, start, end):
+		node = len(self.lo)
+		p = self.points[self.index[start:end]]
+		self.lo.append(p.min(axis = 0))
+		self.hi.append(p.max(axis = 0))
+		self.ranges.append((start, end))
+		self.children.append(None)
+		if end - start > self.leafSize:
+			axis = int(numpy.argmax(self.hi[node] - self.lo[node]))
+			order = numpy.argsort(p[:,axis], kind = 'stable')
+			self.index[start:end] = self.index[start:end][order]
+			mid = (start + end)//2
+			self.children[node] = (self._build(start, mid), self._build(mid, end))
+		return node
+	def _boxDist2(self, node, q):
+		d = numpy.maximum(0.0, numpy.maximum(self.lo[node] - q, q - self.hi[node]))
+		return float(d.dot(d))
+	def query(self, point, k = 1, predicate = None):
+		"""Os k pontos mais proximos de 'point' que satisfazem predicate(indice); lista de (distancia, indice)."""
+		q = numpy.asarray(point, dtype = numpy.float64)
+		best = []   #heap de maximo (-d2, indice)
+		if not len(self.points):
+			return []
+		nodes = [(self._boxDist2(0, q), 0)]
+		while nodes:
+			d2, node = heapq.heappop(nodes)
+			if len(best) == k and d2 > -best[0][0]:
+				break
+			if self.children[node] is None:
+				start, end = self.ranges[node]
+				idx = self.index[start:end]
+				dist2 = ((self.points[idx] - q)**2).sum(axis = 1)
+				for j in numpy.argsort(dist2):
+					if len(best) == k and dist2[j] >= -best[0][0]:
+						break
+					i = int(idx[j])
+					if predicate is None or predicate(i):
+						if len(best) == k:
+							heapq.heapreplace(best, (-dist2[j], i))
+						else:
+							heapq.heappush(best, (-dist2[j], i))
+			else:
+				for c in self.children[node]:
+					heapq.heappush(nodes, (self._boxDist2(c, q), c))
+		return sorted((float(numpy.sqrt(-d2)), i) for d2, i in best)
+	def nearest(self, points):
+		"""Vizinho mais proximo de cada ponto de um array m x 3: (distancias, indices), processando os pontos em lote."""
+		q = numpy.asarray(points, dtype = numpy.float64).reshape(-1, 3)
+		best = numpy.full(len(q), numpy.inf)
+		arg = numpy.zeros(len(q), dtype = numpy.int64)
+		if len(self.points):
+			self._nearest(0, q, numpy.arange(len(q)), best, arg)
+		return numpy.sqrt(best), arg
+	def _nearest(self, node, q, sel, best, arg):
+		d = numpy.maximum(0.0, numpy.maximum(self.lo[node] - q[sel], q[sel] - self.hi[node]))
+		sel = sel[(d*d).sum(axis = 1) < best[sel]]
+		if not len(sel):
+			return
+		if self.children[node] is None:
+			start, end = self.ranges[node]
+			idx = self.index[start:end]
+			dist2 = ((q[sel,None,:] - self.points[idx][None,:,:])**2).sum(axis = 2)
+			j = dist2.argmin(axis = 1)
+			m = dist2[numpy.arange(len(sel)), j]
+			better = m < best[sel]
+			best[sel[better]] = m[better]
+			arg[sel[better]] = idx[j[better]]
+			return
+		left, right = self.children[node]
+		nearLeft = numpy.linalg.norm(q[sel] - (self.lo[left] + self.hi[left])/2, axis = 1) <= numpy.linalg.norm(q[sel] - (self.lo[right] + self.hi[right])/2, axis = 1)
+		self._nearest(left, q, sel[nearLeft], best, arg)
+		self._nearest(right, q, sel[~nearLeft], best, arg)
+		self._nearest(right, q, sel[nearLeft], best, arg)
+		self._nearest(left, q, sel[~nearLeft], best, arg)
+
+def vec(v):
+	return numpy.array([v[0], v[1], v[2]], dtype = numpy.float64)
+
+class FaceInfo(object):
+	def __init__(self, index, face):
+		"""Dados geometricos de uma face: tipo de superficie, normal (planos), eixo e raio (cilindros, esferas e,
+		nos toros, o raio maior; cones so tem eixo), area, centroide e caixa envolvente (center e size)."""
+		self.index = index
+		self.face = face
+		s = face.Surface
+		self.surface = type(s).__name__
+		self.area = face.Area
+		self.centroid = vec(face.CenterOfMass)
+		bb = face.BoundBox
+		self.center = vec(bb.Center)
+		self.size = numpy.array([bb.XLength, bb.YLength, bb.ZLength])
+		self.normal = self.axis = self.axisPoint = self.radius = None
+		if self.surface == 'Plane':
+			u0, u1, v0, v1 = face.ParameterRange
+			self.normal = vec(face.normalAt((u0+u1)/2, (v0+v1)/2))
+		elif self.surface in ('Cylinder', 'Cone', 'Sphere', 'Toroid'):
+			self.axis = vec(s.Axis)
+			self.axisPoint = vec(s.Center)
+			if self.surface == 'Toroid':
+				self.radius = s.MajorRadius
+			elif self.surface != 'Cone':
+				self.radius = s.Radius
+	def name(self):
+		return 'Face%d' % (self.index + 1)
+
+class FaceIndex(object):
+	def __init__(self, shape):
+		"""Indice das faces da forma pelos centroides (KD-tree), para selecionar faces por propriedades
+		geometricas em vez do numero da face, que muda quando as operacoes booleanas mudam."""
+		self.faces = [FaceInfo(i, f) for i, f in enumerate(shape.Faces)]
+		self.tree = KDTree([f.centroid for f in self.faces])
+	def predicate(self, surface = None, normal = None, axis = None, radius = None, tolerance = 1e-6):
+		"""Filtro por tipo de superficie, normal (planos, com sentido), direcao do eixo (sem sentido) e raio."""
+		def test(i):
+			f = self.faces[i]
+			if surface is not None and f.surface != surface:
+				return False
+			if normal is not None and (f.normal is None or f.normal.dot(vec(normal)/numpy.linalg.norm(vec(normal))) < 1 - tolerance):
+				return False
+			if axis is not None and (f.axis is None or abs(f.axis.dot(vec(axis)/numpy.linalg.norm(vec(axis)))) < 1 - tolerance):
+				return False
+			if radius is not None and (f.radius is None or abs(f.radius - radius) > tolerance):
+				return False
+			return True
+		return test
+	def query(self, point, k = 1, **conditions):
+		"""As k faces (FaceInfo) de centroide mais proximo de 'point' que satisfazem as condicoes (ver predicate)."""
+		return [self.faces[i] for d, i in self.tree.query(vec(point), k, self.predicate(**conditions))]
+	def nearest(self, point, **conditions):
+		"""A face de centroide mais proximo de 'point' que satisfaz as condicoes; LookupError se nenhuma satisfaz."""
+		found = self.query(point, 1, **conditions)
+		if not found:
+			raise LookupError('nenhuma face com %s' % ', '.join('%s=%s' % c for c in sorted(conditions.items())))
+		return found[0]
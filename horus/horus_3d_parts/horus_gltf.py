@@ -0,0 +1,273 @@
+# coding: utf-8
+
+"""
+Copyright 2021 João T. Carvalho-Neto, Fernando A. Pedersen and Matheus N. S. Silva
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+****************************************
+Stellector Project Horus 3D parts.
+
+Quantized binary glTF (GLB) export of the assembled model
+****************************************
+"""
+
+import sys, os, time, json, math, struct
+import argparse
+import numpy
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import horus_freecad as hf
+import horus_params as hp
+import horus_mesh as hm
+from horus_geometry import vec
+from horus_build import scriptArgs
+from horus_cache import BrepCache, defaultCacheDir
+from horus_export import fileBase
+
+
+#Angulo [graus] acima do qual a aresta entre dois triangulos e viva (normais separadas nos vertices)
+creaseAngle = 30.0
+
+#Tipos de componente do glTF
+componentTypes = {5120: numpy.int8, 5121: numpy.uint8, 5122: numpy.int16, 5123: numpy.uint16, 5125: numpy.uint32, 5126: numpy.float32}
+typeSizes = {'SCALAR': 1, 'VEC2': 2, 'VEC3': 3, 'VEC4': 4, 'MAT4': 16}
+
+#No raiz: Z para cima (FreeCAD) -> Y para cima (glTF) e milimetros -> metros
+rootRotation = [-math.sqrt(0.5), 0.0, 0.0, math.sqrt(0.5)]
+rootScale = 0.001
+
+def creaseNormals(points, triangles, crease = creaseAngle):
+	"""Normais por vertice que preservam as arestas vivas: a normal de cada canto de triangulo e a media
+	(ponderada pela area) dos triangulos do mesmo vertice cuja normal difere da sua menos que 'crease' graus;
+	vertices com normais diferentes sao separados. Retorna (pontos, normais, triangulos) reindexados."""
+	fn = numpy.cross(points[triangles[:,1]] - points[triangles[:,0]], points[triangles[:,2]] - points[triangles[:,0]])
+	unit = fn/numpy.maximum(numpy.linalg.norm(fn, axis = 1), 1e-30)[:,None]
+	vert = triangles.ravel()
+	face = numpy.repeat(numpy.arange(len(triangles)), 3)
+	order = numpy.argsort(vert, kind = 'stable')
+	deg = numpy.bincount(vert, minlength = len(points))
+	start = numpy.cumsum(deg) - deg
+	cdeg = deg[vert]
+	corner = numpy.repeat(numpy.arange(len(vert)), cdeg)
+	k = numpy.arange(cdeg.sum()) - numpy.repeat(numpy.cumsum(cdeg) - cdeg, cdeg)
+	other = order[start[vert[corner]] + k]
+	ok = (unit[face[corner]]*unit[face[other]]).sum(axis = 1) >= math.cos(math.radians(crease))
+	acc = numpy.zeros((len(vert), 3))
+	numpy.add.at(acc, corner[ok], fn[face[other[ok]]])
+	cn = acc/numpy.maximum(numpy.linalg.norm(acc, axis = 1), 1e-30)[:,None]
+	key = numpy.column_stack([vert, numpy.round(cn*1e6).astype(numpy.int64)])
+	key, first, inverse = numpy.unique(key, axis = 0, return_index = True, return_inverse = True)
+	return points[vert[first]], cn[first], inverse.reshape(-1, 3)
+
+def quantize(points, normals):
+	"""Posicoes em inteiros de 16 bits sem sinal com passo uniforme (a transformacao do no as recupera) e
+	normais em bytes normalizados. Retorna (posicoes, normais, origem, passo)."""
+	lo = points.min(axis = 0)
+	step = max((points.max(axis = 0) - lo).max()/65535.0, 1e-9)
+	q = numpy.round((points - lo)/step).astype(numpy.uint16)
+	n = numpy.clip(numpy.round(normals*127.0), -127, 127).astype(numpy.int8)
+	return q, n, lo, step
+
+class GlbWriter(object):
+	def __init__(self):
+		"""Montagem do JSON e do buffer binario de um arquivo GLB."""
+		self.gltf = {'asset': {'version': '2.0', 'generator': 'horus_gltf.py'}, 'scenes': [{'nodes': []}], 'scene': 0,
+					'nodes': [], 'meshes': [], 'materials': [], 'accessors': [], 'bufferViews': [], 'buffers': [],
+					'extensionsUsed': ['KHR_mesh_quantization'], 'extensionsRequired': ['KHR_mesh_quantization']}
+		self.data = bytearray()
+	def bufferView(self, array, target, stride = None):
+		while len(self.data) % 4:
+			self.data.append(0)
+		view = {'buffer': 0, 'byteOffset': len(self.data), 'byteLength': array.nbytes, 'target': target}
+		if stride:
+			view['byteStride'] = stride
+		self.data.extend(numpy.ascontiguousarray(array).tobytes())
+		self.gltf['bufferViews'].append(view)
+		return len(self.gltf['bufferViews']) - 1
+	def accessor(self, view, componentType, count, type_, normalized = False, lo = None, hi = None):
+		acc = {'bufferView': view, 'componentType': componentType, 'count': int(count), 'type': type_}
+		if normalized:
+			acc['normalized'] = True
+		if lo is not None:
+			acc['min'], acc['max'] = [int(x) for x in lo], [int(x) for x in hi]
+		self.gltf['accessors'].append(acc)
+		return len(self.gltf['accessors']) - 1
+	def node(self, node, parent = None):
+		self.gltf['nodes'].append(node)
+		i = len(self.gltf['nodes']) - 1
+		if parent is None:
+			self.gltf['scenes'][0]['nodes'].append(i)
+		else:
+			self.gltf['nodes'][parent].setdefault('children', []).append(i)
+		return i
+	def material(self, name, color):
+		self.gltf['materials'].append({'name': name, 'pbrMetallicRoughness': {'baseColorFactor': list(color) + [1.0], 'metallicFactor': 0.0, 'roughnessFactor': 0.6}})
+		return len(self.gltf['materials']) - 1
+	def mesh(self, name, points, triangles, material):
+		"""Malha indexada e quantizada; retorna (indice da malha, translacao e escala do no que a dequantiza, extras)."""
+		p, nrm, tris = creaseNormals(points, triangles)
+		q, n, lo, step = quantize(p, nrm)
+		pos = numpy.zeros((len(q), 4), dtype = numpy.uint16)
+		pos[:,:3] = q
+		norm = numpy.zeros((len(n), 4), dtype = numpy.int8)
+		norm[:,:3] = n
+		indexType = (5123, numpy.uint16) if len(q) < 65536 else (5125, numpy.uint32)
+		attributes = {'POSITION': self.accessor(self.bufferView(pos, 34962, 8), 5123, len(q), 'VEC3', lo = q.min(axis = 0), hi = q.max(axis = 0)),
+					'NORMAL': self.accessor(self.bufferView(norm, 34962, 4), 5120, len(n), 'VEC3', normalized = True)}
+		indices = self.accessor(self.bufferView(tris.astype(indexType[1]).ravel(), 34963), indexType[0], tris.size, 'SCALAR')
+		self.gltf['meshes'].append({'name': name, 'primitives': [{'attributes': attributes, 'indices': indices, 'material': material}]})
+		error = float(numpy.abs(lo + q.astype(numpy.float64)*step - p).max())
+		extras = {'vertices': len(q), 'triangles': len(tris), 'step': step, 'maxError': error,
+				'min': p.min(axis = 0).tolist(), 'max': p.max(axis = 0).tolist()}
+		return len(self.gltf['meshes']) - 1, lo.tolist(), step, extras
+	def write(self, fileName):
+		while len(self.data) % 4:
+			self.data.append(0)
+		self.gltf['buffers'] = [{'byteLength': len(self.data)}]
+		js = json.dumps(self.gltf, separators = (',', ':')).encode()
+		js += b' '*(-len(js) % 4)
+		with open(fileName, 'wb') as f:
+			f.write(struct.pack('<III', 0x46546C67, 2, 12 + 8 + len(js) + 8 + len(self.data)))
+			f.write(struct.pack('<II', len(js), 0x4E4F534A) + js)
+			f.write(struct.pack('<II', len(self.data), 0x004E4942) + bytes(self.data))
+
+def axisExtras(axis):
+	point, direction = axis
+	return {'point': vec(point).tolist(), 'direction': vec(direction).tolist(), 'stepsPerTurn': hp.mp_passos_volta, 'units': 'mm'}
+
+def horusGlb(meshes, fileName, axes = None):
+	"""Grava o modelo montado (dicionario nome -> (pontos, triangulos) em mm, na posicao da montagem) em GLB:
+	um no por grupo (horusGroups) e por parte, com a cor de partColors e a malha num no filho que a dequantiza.
+	Os eixos dos motores (motorAxes) vao nos extras do no raiz, do grupo MobSupport ('fix') e do LaserCase ('mob'),
+	que fica dentro do MobSupport para girar com ele. Retorna os extras de cada malha."""
+	w = GlbWriter()
+	root = w.node({'name': 'Horus', 'rotation': rootRotation, 'scale': [rootScale]*3,
+					'extras': {'axes': {k: axisExtras(a) for k, a in (axes or {}).items()}, 'units': 'mm'}})
+	parents = {}
+	for gName, members in hp.horusGroups.items():
+		node = {'name': gName}
+		if gName == 'MobSupport' and axes:
+			node['extras'] = {'rotationAxis': axisExtras(axes['fix'])}
+		g = w.node(node, root)
+		for p in members:
+			parents[p] = g
+	info = {}
+	for name, (points, triangles) in meshes.items():
+		node = {'name': name}
+		parent = parents.get(name, root)
+		if name == 'LaserCase' and axes:
+			node['extras'] = {'rotationAxis': axisExtras(axes['mob'])}
+		partNode = w.node(node, parent)
+		mesh, lo, step, extras = w.mesh(name, points, triangles, w.material(name, hp.partColors.get(name, (0.8, 0.8, 0.8))))
+		w.node({'name': name + 'Mesh', 'mesh': mesh, 'translation': lo, 'scale': [step]*3, 'extras': extras}, partNode)
+		info[name] = extras
+	w.write(fileName)
+	return info
+
+def readGlb(fileName):
+	"""(JSON, buffer binario) de um arquivo GLB."""
+	with open(fileName, 'rb') as f:
+		data = f.read()
+	magic, version, length = struct.unpack_from('<III', data, 0)
+	if magic != 0x46546C67 or version != 2 or length != len(data):
+		raise ValueError('%s: cabecalho GLB invalido' % fileName)
+	jsLen, jsType = struct.unpack_from('<II', data, 12)
+	gltf = json.loads(data[20:20+jsLen].decode())
+	binLen, binType = struct.unpack_from('<II', data, 20 + jsLen)
+	return gltf, data[28+jsLen:28+jsLen+binLen]
+
+def accessorArray(gltf, binary, index):
+	"""Dados do accessor como array (count x componentes), convertidos para float se normalizados."""
+	acc = gltf['accessors'][index]
+	view = gltf['bufferViews'][acc['bufferView']]
+	dtype = numpy.dtype(componentTypes[acc['componentType']])
+	n = typeSizes[acc['type']]
+	stride = view.get('byteStride', dtype.itemsize*n)
+	offset = view.get('byteOffset', 0) + acc.get('byteOffset', 0)
+	raw = numpy.frombuffer(binary, dtype = numpy.uint8, count = stride*(acc['count'] - 1) + dtype.itemsize*n, offset = offset)
+	rows = numpy.lib.stride_tricks.as_strided(raw, (acc['count'], dtype.itemsize*n), (stride, 1))
+	a = numpy.ascontiguousarray(rows).view(dtype).reshape(acc['count'], n)
+	if acc.get('normalized'):
+		a = numpy.maximum(a/float(numpy.iinfo(dtype).max), -1.0)
+	return a
+
+def verifyGlb(fileName, expected = None):
+	"""Rele o GLB e confere cada malha: contagens de vertices e triangulos (dos extras ou de 'expected',
+	dicionario nome -> extras de horusGlb), indices validos, normais unitarias (erro de quantizacao) e
+	posicoes dequantizadas dentro da caixa registrada a menos de meio passo. Retorna (linhas do relatorio, erros)."""
+	gltf, binary = readGlb(fileName)
+	lines, errors = [], []
+	for node in gltf['nodes']:
+		if 'mesh' not in node:
+			continue
+		prim = gltf['meshes'][node['mesh']]['primitives'][0]
+		name = gltf['meshes'][node['mesh']]['name']
+		ref = (expected or {}).get(name, node.get('extras', {}))
+		q = accessorArray(gltf, binary, prim['attributes']['POSITION']).astype(numpy.float64)
+		points = numpy.array(node['translation']) + q*numpy.array(node['scale'])
+		normals = accessorArray(gltf, binary, prim['attributes']['NORMAL'])
+		tris = accessorArray(gltf, binary, prim['indices']).reshape(-1, 3)
+		step = node['scale'][0]
+		bboxError = max(numpy.abs(points.min(axis = 0) - ref['min']).max(), numpy.abs(points.max(axis = 0) - ref['max']).max())
+		normalError = numpy.abs(numpy.linalg.norm(normals, axis = 1) - 1).max()
+		checks = [(len(points) == ref['vertices'], 'vertices %d != %d' % (len(points), ref['vertices'])),
+				(len(tris) == ref['triangles'], 'triangulos %d != %d' % (len(tris), ref['triangles'])),
+				(tris.max() < len(points), 'indice fora da malha'),
+				(bboxError <= step/2 + 1e-9, 'caixa envolvente desviada de %.4g mm (passo %.4g mm)' % (bboxError, step)),
+				(ref.get('maxError', 0.0) <= step/2 + 1e-9, 'erro de quantizacao %.4g mm acima de meio passo' % ref.get('maxError', 0.0)),
+				(normalError < 2.0/127, 'normais nao unitarias (erro %.3f)' % normalError)]
+		errors.extend('%s: %s' % (name, msg) for ok, msg in checks if not ok)
+		lines.append('%-20s %7d vertices %7d triangulos  passo %.4f mm  erro maximo %.4f mm' % (name, len(points), len(tris), step, ref.get('maxError', float('nan'))))
+	return lines, errors
+
+def parseArgs(args):
+	parser = argparse.ArgumentParser(prog = 'horus_gltf.py', description = 'Exporta o Horus montado e colorido em glTF binario quantizado.')
+	parser.add_argument('-o', '--output', default = 'horus.glb', help = 'arquivo GLB')
+	parser.add_argument('--verify', metavar = 'GLB', help = 'so rele e confere um arquivo GLB')
+	parser.add_argument('--obj', metavar = 'DIR', help = 'usa as malhas OBJ da montagem deste diretorio em vez de construir as partes (sem eixos dos motores)')
+	parser.add_argument('-t', '--tolerance', type = float, help = 'deflexao linear da tesselagem [mm] (padrao: horus_mesh.partDeflection)')
+	parser.add_argument('-j', '--jobs', type = int, default = 1, help = 'numero de processos de construcao em paralelo')
+	parser.add_argument('--cache', default = defaultCacheDir, help = 'diretorio do cache de formas (BREP)')
+	parser.add_argument('--no-cache', action = 'store_true', help = 'constroi tudo sem consultar o cache')
+	return parser.parse_args(args)
+
+def main(args):
+	opts = parseArgs(args)
+	if opts.verify:
+		lines, errors = verifyGlb(opts.verify)
+		print('\n'.join(lines + errors))
+		return 1 if errors else 0
+	t0 = time.time()
+	axes = None
+	if opts.obj:
+		meshes = {name: hm.readObj(os.path.join(opts.obj, fileBase(name) + '.obj')) for name in hp.horusParts}
+	else:
+		cache = None if opts.no_cache else BrepCache(opts.cache)
+		parts = hf.buildParallel(hp.horusParts, opts.jobs, cache)
+		axes = hf.motorAxes(parts)
+		hf.assemble(parts)
+		meshes = {}
+		for name in hp.horusParts:
+			lin, ang = hm.partDeflection.get(name, hm.defaultDeflection)
+			meshes[name] = hm.tessellate(parts[name], lin if opts.tolerance is None else opts.tolerance, ang)
+	info = horusGlb(meshes, opts.output, axes)
+	lines, errors = verifyGlb(opts.output, info)
+	print('\n'.join(lines + errors))
+	print('%s: %d bytes em %.1f s' % (opts.output, os.path.getsize(opts.output), time.time() - t0))
+	return 1 if errors else 0
+
+if __name__ == '__main__':
+	sys.exit(main(scriptArgs(__file__)))
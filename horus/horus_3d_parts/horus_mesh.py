@@ -0,0 +1,162 @@
+# coding: utf-8
+
+"""
+Copyright 2021 João T. Carvalho-Neto, Fernando A. Pedersen and Matheus N. S. Silva
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+****************************************
+Stellector Project Horus 3D parts.
+
+Indexed meshes: tessellation and compact writers
+****************************************
+"""
+
+import numpy
+
+
+#Deflexoes da tesselagem por parte: (linear [mm], angular [rad])
+defaultDeflection = (0.05, 0.35)
+partDeflection = {	'OctagonalBase': (0.1, 0.5),
+					'TowerBearing': (0.05, 0.35),
+					'TowerStepper': (0.05, 0.35),
+					'StepperMob': (0.03, 0.25),
+					'LaserCase': (0.03, 0.25),
+					'LaserShaftSupport': (0.03, 0.25)}
+
+def tessellate(shape, linearDeflection, angularDeflection):
+	"""Tesselagem da forma com deflexoes explicitas; retorna (pontos n x 3, triangulos m x 3) ja soldados."""
+	import MeshPart
+	mesh = MeshPart.meshFromShape(Shape = shape, LinearDeflection = linearDeflection, AngularDeflection = angularDeflection, Relative = False)
+	pts, tris = mesh.Topology
+	points = numpy.array([(p.x, p.y, p.z) for p in pts], dtype = numpy.float64).reshape(-1, 3)
+	return weld(points, numpy.array(tris, dtype = numpy.int64).reshape(-1, 3))
+
+def weld(points, triangles, quantum = 1e-6):
+	"""Une vertices coincidentes (grade de 'quantum' mm), remove triangulos degenerados e ordena
+	vertices e triangulos de forma deterministica (a orientacao dos triangulos e preservada)."""
+	q = numpy.round(points/quantum).astype(numpy.int64)
+	q, first, inverse = numpy.unique(q, axis = 0, return_index = True, return_inverse = True)
+	points = points[first]
+	tris = inverse.reshape(-1)[triangles]
+	ok = (tris[:,0] != tris[:,1]) & (tris[:,1] != tris[:,2]) & (tris[:,2] != tris[:,0])
+	tris = tris[ok]
+	shift = numpy.argmin(tris, axis = 1)   #rotaciona cada triangulo para comecar pelo menor indice
+	idx = (shift[:,None] + numpy.arange(3)[None,:]) % 3
+	tris = numpy.take_along_axis(tris, idx, axis = 1)
+	tris = tris[numpy.lexsort(tris.T[::-1])]
+	return points, tris
+
+def normals(points, triangles):
+	n = numpy.cross(points[triangles[:,1]] - points[triangles[:,0]], points[triangles[:,2]] - points[triangles[:,0]])
+	norm = numpy.linalg.norm(n, axis = 1)
+	return n/numpy.where(norm > 0, norm, 1.0)[:,None]
+
+def meshVolume(points, triangles):
+	"""Volume fechado pela malha (teorema da divergencia; triangulos orientados para fora)."""
+	v = points[triangles]
+	return numpy.einsum('ij,ij->i', v[:,0], numpy.cross(v[:,1], v[:,2])).sum()/6.0
+
+def surfaceSamples(points, triangles, spacing, withTriangles = False):
+	"""Amostras da superficie da malha com espacamento de ate 'spacing' (cerca de 2*area/spacing^2 por
+	triangulo, tambem nos triangulos longos e finos): cada triangulo e percorrido em nv faixas paralelas a
+	sua maior aresta, com nu amostras por faixa. Retorna (pontos, normais) ou, com withTriangles,
+	(pontos, normais, indice do triangulo de cada amostra)."""
+	v = points[triangles]
+	edges = numpy.linalg.norm(v[:,[1,2,0]] - v, axis = 2)
+	first = edges.argmax(axis = 1)   #maior aresta: v[first] -> v[first+1]
+	r = numpy.arange(len(v))
+	p0, p1, p2 = v[r, first], v[r, (first + 1) % 3], v[r, (first + 2) % 3]
+	L = edges[r, first]
+	h = numpy.linalg.norm(numpy.cross(p1 - p0, p2 - p0), axis = 1)/numpy.where(L > 0, L, 1.0)
+	nu = numpy.maximum(1, numpy.ceil(L/spacing)).astype(numpy.int64)
+	nv = numpy.maximum(1, numpy.ceil(h/spacing)).astype(numpy.int64)
+	count = nu*nv
+	tri = numpy.repeat(r, count)
+	k = numpy.arange(count.sum()) - numpy.repeat(numpy.cumsum(count) - count, count)
+	s = ((k % nu[tri]) + 0.5)/nu[tri]
+	t = ((k // nu[tri]) + 0.5)/nv[tri]
+	pts = (1 - t)[:,None]*(p0[tri] + s[:,None]*(p1 - p0)[tri]) + t[:,None]*p2[tri]
+	if withTriangles:
+		return pts, normals(points, triangles)[tri], tri
+	return pts, normals(points, triangles)[tri]
+
+def segmentDistance(p, a, b):
+	"""Distancia de cada ponto p ao segmento ab (arrays n x 3)."""
+	ab = b - a
+	L2 = (ab*ab).sum(axis = 1)
+	t = numpy.clip(((p - a)*ab).sum(axis = 1)/numpy.where(L2 > 0, L2, 1.0), 0.0, 1.0)
+	return numpy.linalg.norm(p - a - t[:,None]*ab, axis = 1)
+
+def triangleDistance(p, a, b, c):
+	"""Distancia exata de cada ponto p ao triangulo abc (arrays n x 3): ao plano quando a projecao cai
+	dentro do triangulo, senao a aresta mais proxima (tambem nos triangulos degenerados)."""
+	n = numpy.cross(b - a, c - a)
+	n2 = (n*n).sum(axis = 1)
+	ok = n2 > 0
+	n2 = numpy.where(ok, n2, 1.0)
+	h = ((p - a)*n).sum(axis = 1)/n2
+	q = p - h[:,None]*n
+	inside = ok & ((numpy.cross(b - a, q - a)*n).sum(axis = 1) >= 0) & ((numpy.cross(c - b, q - b)*n).sum(axis = 1) >= 0) & ((numpy.cross(a - c, q - c)*n).sum(axis = 1) >= 0)
+	edge = numpy.minimum(numpy.minimum(segmentDistance(p, a, b), segmentDistance(p, b, c)), segmentDistance(p, c, a))
+	return numpy.where(inside, numpy.abs(h)*numpy.sqrt(n2), edge)
+
+def vertexTriangles(points, triangles):
+	"""Triangulos incidentes a cada vertice em formato compacto: (inicio, grau, triangulos), com os
+	triangulos do vertice v em triangulos[inicio[v]:inicio[v]+grau[v]]."""
+	vert = triangles.ravel()
+	order = numpy.argsort(vert, kind = 'stable')
+	degree = numpy.bincount(vert, minlength = len(points))
+	return numpy.cumsum(degree) - degree, degree, order//3
+
+stlRecord = numpy.dtype([('normal', '<f4', 3), ('vertices', '<f4', (3, 3)), ('attr', '<u2')])
+
+def writeStl(fileName, points, triangles, name = 'Horus'):
+	"""STL binario, escrito diretamente de um array estruturado."""
+	rec = numpy.zeros(len(triangles), dtype = stlRecord)
+	rec['normal'] = normals(points, triangles)
+	rec['vertices'] = points[triangles]
+	with open(fileName, 'wb') as f:
+		f.write(name.encode()[:80].ljust(80, b' '))
+		f.write(numpy.uint32(len(triangles)).tobytes())
+		rec.tofile(f)
+
+def writeObj(fileName, points, triangles, name = 'Horus'):
+	"""OBJ indexado (vertices compartilhados)."""
+	with open(fileName, 'w') as f:
+		f.write('# %d vertices, %d triangles\no %s\n' % (len(points), len(triangles), name))
+		numpy.savetxt(f, points, fmt = 'v %.4f %.4f %.4f')
+		numpy.savetxt(f, triangles + 1, fmt = 'f %d %d %d')
+
+def writeMesh(fileName, points, triangles, name = 'Horus'):
+	"""Escreve em STL ou OBJ conforme a extensao."""
+	if fileName.lower().endswith('.stl'):
+		writeStl(fileName, points, triangles, name)
+	else:
+		writeObj(fileName, points, triangles, name)
+
+def readObj(fileName):
+	"""Le um OBJ (vertices 'v' e faces 'f', com ou sem indices de textura/normal; poligonos em leque);
+	retorna (pontos, triangulos) soldados."""
+	points, triangles = [], []
+	with open(fileName) as f:
+		for line in f:
+			if line.startswith('v '):
+				points.append([float(x) for x in line.split()[1:4]])
+			elif line.startswith('f '):
+				idx = [int(x.split('/')[0]) for x in line.split()[1:]]
+				idx = [i - 1 if i > 0 else len(points) + i for i in idx]
+				triangles.extend([idx[0], idx[k], idx[k+1]] for k in range(1, len(idx) - 1))
+	return weld(numpy.array(points, dtype = numpy.float64).reshape(-1, 3), numpy.array(triangles, dtype = numpy.int64).reshape(-1, 3))
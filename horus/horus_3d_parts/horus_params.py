@@ -0,0 +1,225 @@
+# coding: utf-8
+
+"""
+Copyright 2021 João T. Carvalho-Neto, Fernando A. Pedersen and Matheus N. S. Silva
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+****************************************
+Stellector Project Horus 3D parts.
+
+Design parameters (pure Python, no FreeCAD)
+****************************************
+"""
+
+import math
+
+
+#****************************************
+# Horus design for the Stellector Project
+#****************************************
+
+#Unidades: milimetros
+
+#Tolerancia da impressora 3D:
+tol = 0.25
+
+#Motor de passo 28BYJ-48:
+mp_rad = 14.0+tol/2
+mp_par_centro = 17.5
+mp_par_rad_ext = 3.5
+mp_par_rad_int = 2.1+tol/2
+mp_prof = 19.0
+mp_eixo_chanfro_comp = 6.0
+mp_basecabo_alt = 17.0
+mp_basecabo_lar = 14.6
+mp_basecabo_prof = 5.9
+mp_basecabo_rad = math.sqrt((mp_basecabo_lar/2)**2+mp_basecabo_alt**2)
+mp_conector_lar = 15.0
+mp_conector_alt = 6.0
+mp_rad_eixo = 2.5+tol/2
+mp_sep_eixo = 4.0+tol
+mp_comp_eixo = 6.0
+mp_acha_eixo = 3.0+tol - 0.2   #largura da parte achatada do eixo  (0.2 é o fator de correção obtido após impressão da peça)
+mp_desl_eixo = 8.0   #deslocamento do eixo em relacao ao centro do motor
+mp_passos_volta = 2038   #passos por volta (STPS360 em horus32.ino)
+
+#Rolamento:
+rol_rad_int = 4.55/2 + 0.45/2  #0.45 é o fator de correção obtido após impressão da peça
+rol_rad_ext = 9.45/2 + tol/2
+rol_rad_a_ext = 6.0/2 + tol/2
+rol_lar = 3.05 + tol/2
+
+#Parafuso do laser (M4):
+diam_par = 2.5
+passo_par = 0.7
+comp_par = 5.0
+
+#Pés de nivelamento:
+diam_nivel = 11.0
+
+#Sensor de distancia ultrassonico:
+sep_ultra_par_suporte = 80.0 #distancia minima entre o sensor ultrassonico e o parafuso do suporte de forma a não haver obstrução em direção ao solo.
+
+#Rosca e pino do tripe:
+diam_pino = 4.0  #diâmetro do pino retrátil
+diam_porca_sextavada = 12.4
+alt_porca_sextavada = 5.5
+passo_par_suporte = 1.25
+comp_par_suporte = 6.0
+sep_pino_par = 14.0 #separação do pino retrátil ao parafuso do suporte
+diam_par_suporte = 6.1 #diâmetro externo do parafuso do suporte (contando com a rosca)
+
+#Suporte movel:
+sm_cB_rad_int = mp_rad
+sm_cB_prof = 15.0
+sm_cB_rad_ext = 6.0 + mp_par_centro + mp_par_rad_ext
+sm_cB_ressalto_ang = 120.0
+sm_cB_basecabo_lar = mp_conector_lar + 1.0
+
+#Protetor do cabo:
+sm_prot_cabo_lar = sm_cB_basecabo_lar
+sm_prot_cabo_esp = 3.0
+sm_prot_cabo_prof = 2.0
+sm_prot_cabo_comp = mp_conector_alt + 1.0
+
+#Laser:
+laser_rad = 6.0 + tol/2
+laser_comp_circuito = 19.0
+laser_comp_metal_liso = 24.5
+laser_comp_metal_rosca = 10.5
+laser_comp = laser_comp_circuito+laser_comp_metal_liso+laser_comp_metal_rosca
+
+#Suporte laser:
+sl_rad_int = laser_rad
+sl_rad_ext = laser_rad + 2.0
+sl_sep_suporte = 5.0
+sl_eixo_comp = 2*sl_rad_ext + 2*sl_sep_suporte
+sl_eixo_rad = 2*mp_rad_eixo
+sl_rol_esp = 2.0
+
+#Suporte eixo laser:
+sel_alt = 2*sl_eixo_rad
+sel_esp = 4.0
+sel_comp = laser_comp + 2*6.0
+sel_lar = sl_eixo_comp + mp_sep_eixo
+larg_engate = 3.0	#largura do engate entre o suporte do eixo e o suporte do motor
+
+#Bateria Power Bank 10000 mAh:
+Batt = {	'com': 155.5,	#comprimento
+			'lar': 77.2,	#largura
+			'alt': 12.15,	#altura
+			'fendaSaidaLar': 10.0,	#largura da fenda do cabo de saída de energia
+			'fendaSaidaCom': 4.0,	#comprimento da fenda do cabo de saída de energia
+			'fendaEntLar': 15.0,	#largura da fenda do cabo de entrada de energia
+			'fendaCentCom': 17.0,	#centro da fenda do cabo de entrada de energia em relação à borda longitudinal da bateria
+			'fendaCentAlt': 5.0,	#centro da fenda do cabo de entrada de energia em relação à base da bateria
+			'fendaExt': 30.0}		#extensão da fenda do cabo de entrada de energia em relação à base da bateria
+
+#ESP32:
+ESP32 = {	'com': 65.0,		#comprimento
+			'lar': 30.0,		#largura
+			'sepCom': 51.0,		#separacao dos parafusos no comprimento
+			'sepLar': 23.0,		#separacao dos parafusos na largura
+			'par': 2.75}		#diametro dos furos dos parafusos
+
+#Sensor ultrassonico HC-SR04:
+Ultra = {	'com': 45.0,		#comprimento
+			'lar': 20.0,		#largura
+			'erDiam': 16.0,		#diametro do emissor e receptor
+			'erSep': 26.0,		#separacao entre o centro do emissor e receptor
+			'sepCom': 41.0,		#separacao dos parafusos no comprimento
+			'sepLar': 16.5,		#separacao dos parafusos na largura
+			'par': 2.0}			#diametro dos furos dos parafusos
+
+#Magnetometro GY-282:
+#Magnet = {	'com': 18.0,		#comprimento
+#			'lar': 14.0,		#largura
+#			'sepCom': 13.0,		#separacao dos parafusos no comprimento
+#			'sepLar': 9.0,		#separacao dos parafusos na largura
+#			'par': 3.0}			#diametro dos furos dos parafusos
+
+#Magnetometro-Acelerômetro GY-511:
+Magnet = {	'com': 20.5,		#comprimento
+			'lar': 14.5,		#largura
+			'sepCom': 15.1,		#separacao dos parafusos no comprimento
+			'dlar': 9.0,		#distancia do centro dos parafusos a borda no sentido da largura
+			'par': 3.0}			#diametro dos furos dos parafusos
+
+#Acelerometro MPU6050:
+Aceler = {	'com': 20.3,		#comprimento
+			'lar': 15.6,		#largura
+			'dcom': 2.5,		#distancia do centro dos parafusos a borda no sentido do comprimento
+			'dlar': 2.5,		#distancia do centro dos parafusos a borda no sentido da largura
+			'par': 3.0}			#diametro dos furos dos parafusos
+
+#Driver motor de passo:
+Driver = {	'sepLar': 27.0,	#separacao dos parafusos na largura
+			'par': 2.75}	#diametro dos furos dos parafusos
+
+#Display oled 0.96'':
+Display = {	'com': 30.0,		#comprimento da placa
+			'lar': 27.0,		#largura da placa
+			'dispCom': 21.7,	#comprimento do display
+			'dispLar': 10.9,	#largura do display
+			'dispAlt': 1.65,	#altura do display
+			'dispBase': 7.2,	#altura do início do display em relação ao início da placa
+			'sepCom': 22.0,	#separacao dos parafusos no comprimento
+			'sepLar': 22.0,	#separacao dos parafusos na largura
+			'par': 2.0}		#diametro dos furos dos parafusos
+
+#Interruptor de energia:
+Interr = {	'lar': 19.0,	#largura por trás da moldura
+			'alt': 12.8}		#altura por trás da moldura}
+
+Torre = {	'l1': 15.0,			#comprimento do pé da Torre
+			'l2':  Batt['lar'],	#comprimento da base interna da Torre
+			'h1': 48.0,
+			'h2': 7.0,
+			'h3': 75.0,
+			'r1': 10.0,			#raio do disco de suporte do rolamento
+			'e': 4.0,			#espessura
+			'lar': sm_cB_prof,		#largura
+			'com': Batt['lar'],
+			'par': 3.5}			#diâmetro dos furos da base
+
+#Base octagonal da montagem:
+BaseM = {	'N': 8,							#numero de lados da base
+			'larInt': Batt['com'] + 40.0,	#largura interna do octogono
+			'larExt': Batt['com'] + 60.0,	#largura externa do octogono (borda)
+			'espes': 18.0,					#espessura da baseOctagonal
+			'profBat': Batt['alt'] + 1.0,	#profundidade do vale da bateria
+			'sepTorres': 84.0 + mp_sep_eixo}				#separação entre as faces internas das torres de sustentação dos motores de passo
+
+
+#Parafuso auto atarrachante 2.2 curto:
+Par2p2 = {	'diam': 1.6,	#diâmetro da raiz do parafuso
+			'com': 6.5}			#comprimento}
+#Parafuso auto atarrachante 2.9 curto:
+Par2p9c = {	'diam': 2.2,	#diâmetro da raiz do parafuso
+			'com': 6.5}		#comprimento}
+#Parafuso auto atarrachante 2.9 longo:
+Par2p9l = {	'diam': 2.2,	#diâmetro da raiz do parafuso
+			'com': 9.5}		#comprimento}
+
+#Partes do Horus e grupos da montagem:
+horusParts = ['TowerBearing', 'TowerStepper', 'StepperMob', 'LaserCase', 'LaserShaftSupport', 'OctagonalBase']
+horusGroups = {'Towers': ['TowerBearing', 'TowerStepper'], 'MobSupport': ['StepperMob', 'LaserCase', 'LaserShaftSupport']}
+partColors = {	'TowerStepper': (0.8,0.8,0.0),
+				'TowerBearing': (0.0,0.8,0.8),
+				'OctagonalBase': (0.8,0.0,0.8),
+				'StepperMob': (0.8,0.0,0.0),
+				'LaserShaftSupport': (0.0,0.8,0.0),
+				'LaserCase': (0.0,0.0,0.8)}
@@ -0,0 +1,203 @@
+# coding: utf-8
+
+"""
+Copyright 2021 João T. Carvalho-Neto, Fernando A. Pedersen and Matheus N. S. Silva
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+****************************************
+Stellector Project Horus 3D parts.
+
+Print estimate (filament, mass and time) from sliced meshes
+****************************************
+"""
+
+import sys, os, time, json, math
+import argparse
+import numpy
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import horus_params as hp
+import horus_mesh as hm
+
+
+#Parametros de impressao (PLA, bico de 0.4 mm); distancias em mm, velocidades em mm/s, tempos em s
+printSettings = {	'layerHeight': 0.2,
+					'lineWidth': 0.45,
+					'walls': 3,
+					'solidLayers': 4,		#camadas solidas de fundo e topo
+					'infill': 0.2,
+					'filamentDiameter': 1.75,
+					'density': 1.24,		#g/cm3
+					'wallSpeed': 40.0,
+					'infillSpeed': 60.0,
+					'layerTime': 2.0}		#tempo fixo por camada (deslocamentos e troca de camada)
+
+#Pontos de corte por bloco de camadas enviado aos processos
+layersPerChunk = 32
+
+def sectionSegments(points, triangles, z):
+	"""Segmentos da secao da malha pelo plano de altura z, orientados com o material a esquerda
+	(contornos externos anti-horarios, furos horarios): arrays (inicios, fins) k x 2."""
+	v = points[triangles]
+	above = v[:,:,2] > z
+	n = above.sum(axis = 1)
+	cut = (n == 1) | (n == 2)
+	v, above = v[cut], above[cut]
+	lone = numpy.where(above.sum(axis = 1) == 1, numpy.argmax(above, axis = 1), numpy.argmin(above, axis = 1))
+	r = numpy.arange(len(v))
+	a, b, c = v[r, lone], v[r, (lone + 1) % 3], v[r, (lone + 2) % 3]
+	p = a + (b - a)*((z - a[:,2])/(b[:,2] - a[:,2]))[:,None]
+	q = a + (c - a)*((z - a[:,2])/(c[:,2] - a[:,2]))[:,None]
+	normal = numpy.cross(b - a, c - a)
+	flip = ((q - p)[:,0]*(-normal[:,1]) + (q - p)[:,1]*normal[:,0]) < 0
+	p[flip], q[flip] = q[flip], p[flip].copy()
+	return p[:,:2], q[:,:2]
+
+def sectionStats(points, triangles, heights):
+	"""Area (formula do laco sobre os segmentos orientados, sem montar os contornos) e perimetro da secao em cada altura."""
+	zmin, zmax = points[triangles][:,:,2].min(axis = 1), points[triangles][:,:,2].max(axis = 1)
+	near = triangles[(zmax > heights.min()) & (zmin <= heights.max())]
+	area, perimeter = numpy.zeros(len(heights)), numpy.zeros(len(heights))
+	for i, z in enumerate(heights):
+		p, q = sectionSegments(points, near, z)
+		area[i] = 0.5*(p[:,0]*q[:,1] - q[:,0]*p[:,1]).sum()
+		perimeter[i] = numpy.linalg.norm(q - p, axis = 1).sum()
+	return area, perimeter
+
+def layerHeights(points, layerHeight):
+	"""Blocos de alturas de corte (meio de cada camada), gerados sob demanda."""
+	z0, z1 = points[:,2].min(), points[:,2].max()
+	n = int(math.ceil((z1 - z0)/layerHeight - 1e-9))
+	for start in range(0, n, layersPerChunk):
+		yield z0 + (numpy.arange(start, min(n, start + layersPerChunk)) + 0.5)*layerHeight
+
+_mesh = None
+
+def _setMesh(points, triangles):
+	global _mesh
+	_mesh = (points, triangles)
+
+def _chunkStats(heights):
+	return heights, sectionStats(_mesh[0], _mesh[1], heights)
+
+def layers(points, triangles, layerHeight, jobs = 1):
+	"""Gerador de (z, area, perimetro) de cada camada, em ordem. Os blocos de camadas sao cortados em 'jobs'
+	processos; so as secoes do bloco em processamento existem de cada vez."""
+	if jobs == 1:
+		_setMesh(points, triangles)
+		results = map(_chunkStats, layerHeights(points, layerHeight))
+		for heights, (area, perimeter) in results:
+			for row in zip(heights, area, perimeter):
+				yield row
+		return
+	import multiprocessing
+	from concurrent.futures import ProcessPoolExecutor
+	with ProcessPoolExecutor(jobs, mp_context = multiprocessing.get_context('fork'), initializer = _setMesh, initargs = (points, triangles)) as pool:
+		for heights, (area, perimeter) in pool.map(_chunkStats, layerHeights(points, layerHeight)):
+			for row in zip(heights, area, perimeter):
+				yield row
+
+def estimate(stats, settings = printSettings):
+	"""Filamento [m], massa [g], tempo [s] e volume extrudado [mm3] a partir de (z, area, perimetro) das camadas.
+	Cada camada tem 'walls' paredes ao longo do perimetro; a area nao coberta pelas 'solidLayers' camadas de
+	cima e de baixo (fundo, topo e degraus) e preenchida solida, o resto com a densidade 'infill'."""
+	s = settings
+	stats = numpy.array(list(stats)).reshape(-1, 3)
+	area, perimeter = numpy.maximum(stats[:,1], 0.0), stats[:,2]
+	k = s['solidLayers']
+	padded = numpy.concatenate([numpy.zeros(k), area, numpy.zeros(k)])
+	window = numpy.min([padded[i:i+len(area)] for i in range(2*k + 1)], axis = 0)
+	wall = numpy.minimum(area, perimeter*s['walls']*s['lineWidth'])
+	solid = numpy.minimum(area - wall, area - window)
+	inner = area - wall - solid
+	extruded = wall + solid + s['infill']*inner
+	volume = extruded.sum()*s['layerHeight']
+	path = (wall/s['lineWidth'], (solid + s['infill']*inner)/s['lineWidth'])
+	seconds = (path[0]/s['wallSpeed'] + path[1]/s['infillSpeed']).sum() + s['layerTime']*len(area)
+	return {'layers': len(area), 'volume': volume,
+			'filament': volume/(math.pi*s['filamentDiameter']**2/4)/1000.0,
+			'mass': volume*s['density']/1000.0,
+			'time': seconds}
+
+def printEstimate(points, triangles, settings = printSettings, jobs = 1):
+	"""Estimativa de impressao da malha (na orientacao em que foi construida, camadas ao longo de Z)."""
+	return estimate(layers(points, triangles, settings['layerHeight'], jobs), settings)
+
+def kitTotal(estimates):
+	"""Soma das estimativas das partes (dicionario nome -> estimativa)."""
+	return {k: sum(e[k] for e in estimates.values()) for k in ('layers', 'volume', 'filament', 'mass', 'time')}
+
+def hms(seconds):
+	return '%d:%02d:%02d' % (seconds//3600, seconds % 3600//60, seconds % 60)
+
+def report(estimates):
+	lines = ['%-20s %7s %10s %8s %10s' % ('parte', 'camadas', 'filamento', 'massa', 'tempo')]
+	for name, e in list(estimates.items()) + [('kit', kitTotal(estimates))]:
+		lines.append('%-20s %7d %8.2f m %6.1f g %10s' % (name, e['layers'], e['filament'], e['mass'], hms(e['time'])))
+	return '\n'.join(lines)
+
+def parseArgs(args):
+	parser = argparse.ArgumentParser(prog = 'horus_print.py', description = 'Estima filamento, massa e tempo de impressao das partes do Horus.')
+	parser.add_argument('parts', nargs = '*', default = hp.horusParts, help = 'partes a construir e estimar (padrao: todas)')
+	parser.add_argument('--obj', nargs = '+', help = 'estima a partir de arquivos OBJ em vez de construir as partes')
+	parser.add_argument('-l', '--layer-height', type = float, default = printSettings['layerHeight'], help = 'altura de camada [mm]')
+	parser.add_argument('--infill', type = float, default = printSettings['infill'], help = 'densidade do preenchimento (0 a 1)')
+	parser.add_argument('-t', '--tolerance', type = float, help = 'deflexao linear da tesselagem [mm] (padrao: horus_mesh.partDeflection)')
+	parser.add_argument('-j', '--jobs', type = int, default = 1, help = 'numero de processos de construcao e de corte em paralelo')
+	parser.add_argument('--cache', help = 'diretorio do cache de formas (BREP; padrao: $HORUS_CACHE ou ~/.cache/horus)')
+	parser.add_argument('--no-cache', action = 'store_true', help = 'constroi tudo sem consultar o cache')
+	parser.add_argument('-o', '--output', help = 'arquivo JSON com as estimativas')
+	opts = parser.parse_args(args)
+	for name in opts.parts:
+		if name not in hp.horusParts:
+			parser.error('parte desconhecida: %s (opcoes: %s)' % (name, ', '.join(hp.horusParts)))
+	return opts
+
+def meshes(opts):
+	"""Gerador de (nome, pontos, triangulos): dos arquivos OBJ ou das partes construidas, uma de cada vez.
+	So a construcao das partes precisa do FreeCAD."""
+	if opts.obj:
+		for fileName in opts.obj:
+			yield (os.path.splitext(os.path.basename(fileName))[0],) + hm.readObj(fileName)
+		return
+	import horus_freecad as hf
+	from horus_cache import BrepCache, defaultCacheDir
+	cache = None if opts.no_cache else BrepCache(opts.cache or defaultCacheDir)
+	parts = hf.buildParallel(opts.parts, opts.jobs, cache)
+	for name in opts.parts:
+		lin, ang = hm.partDeflection.get(name, hm.defaultDeflection)
+		yield (name,) + hm.tessellate(parts.pop(name), lin if opts.tolerance is None else opts.tolerance, ang)
+
+def main(args):
+	opts = parseArgs(args)
+	settings = dict(printSettings, layerHeight = opts.layer_height, infill = opts.infill)
+	estimates = {}
+	t0 = time.time()
+	for name, points, triangles in meshes(opts):
+		estimates[name] = printEstimate(points, triangles, settings, opts.jobs)
+	print(report(estimates))
+	print('%.1f s' % (time.time() - t0))
+	if opts.output:
+		with open(opts.output, 'w') as f:
+			json.dump({'settings': settings, 'parts': estimates, 'kit': kitTotal(estimates)}, f, indent = 2)
+
+if __name__ == '__main__':
+	try:
+		from horus_build import scriptArgs
+		args = scriptArgs(__file__)
+	except ImportError:   #sem FreeCAD: so --obj
+		args = sys.argv[1:]
+	main(args)
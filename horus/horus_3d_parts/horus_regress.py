@@ -0,0 +1,153 @@
+# coding: utf-8
+
+"""
+Copyright 2021 João T. Carvalho-Neto, Fernando A. Pedersen and Matheus N. S. Silva
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+****************************************
+Stellector Project Horus 3D parts.
+
+Geometric regression of the built parts against the reference meshes
+****************************************
+"""
+
+import sys, os, time, json
+import argparse
+import numpy
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import horus_freecad as hf
+import horus_mesh as hm
+from horus_geometry import KDTree
+from horus_build import scriptArgs
+from horus_cache import BrepCache, defaultCacheDir
+from horus_export import fileBase
+
+
+#Diretorio dos arquivos OBJ de referencia (os versionados com as partes na posicao da montagem)
+referenceDir = os.path.dirname(os.path.abspath(__file__))
+
+def surfaceDistance(points, mesh, samples, sampleTriangles, chunk = 20000):
+	"""Distancia exata de cada ponto a malha 'mesh' = (pontos, triangulos), amostrada em 'samples': o
+	triangulo da amostra mais proxima e os triangulos vizinhos (que compartilham um vertice com ele) sao os
+	candidatos, e vale a menor distancia ponto-triangulo entre eles (nunca maior que a distancia a amostra).
+	Retorna (distancias, indices das amostras mais proximas)."""
+	vertices, triangles = mesh
+	start, degree, incident = hm.vertexTriangles(vertices, triangles)
+	d, j = KDTree(samples).nearest(points)
+	dist = numpy.array(d, dtype = float)
+	for i0 in range(0, len(points), chunk):
+		corners = triangles[sampleTriangles[j[i0:i0+chunk]]]   #n x 3 vertices do triangulo da amostra
+		count = degree[corners].ravel()
+		owner = numpy.repeat(numpy.arange(len(corners)).repeat(3), count)
+		offset = numpy.arange(count.sum()) - numpy.repeat(numpy.cumsum(count) - count, count)
+		cand = incident[numpy.repeat(start[corners].ravel(), count) + offset]
+		v = vertices[triangles[cand]]
+		numpy.minimum.at(dist, i0 + owner, hm.triangleDistance(points[i0 + owner], v[:,0], v[:,1], v[:,2]))
+	return dist, j
+
+def deviationClusters(points, dist, tolerance, cell, top = 5):
+	"""Regioes (celulas de 'cell' mm) com pontos a mais de 'tolerance' da outra superficie, das de maior
+	desvio para as de menor: lista de (ponto de maior desvio, desvio, numero de pontos)."""
+	far = dist > tolerance
+	if not far.any():
+		return []
+	p, d = points[far], dist[far]
+	keys, inverse = numpy.unique(numpy.floor(p/cell).astype(numpy.int64), axis = 0, return_inverse = True)
+	inverse = inverse.reshape(-1)
+	order = numpy.lexsort((-d, inverse))
+	first = order[numpy.concatenate([[True], numpy.diff(inverse[order]) != 0])]
+	counts = numpy.bincount(inverse)
+	clusters = sorted(((p[i].round(2).tolist(), float(d[i]), int(counts[inverse[i]])) for i in first), key = lambda c: -c[1])
+	return clusters[:top]
+
+def compareMeshes(mesh, reference, spacing = 1.0, tolerance = 0.2, cell = 5.0):
+	"""Compara a malha da parte reconstruida com a de referencia: volume, caixa envolvente e distancia de
+	Hausdorff amostrada nos dois sentidos, com as regioes de maior desvio de cada lado."""
+	result = {}
+	for key, (points, triangles) in (('new', mesh), ('reference', reference)):
+		result[key] = {'volume': hm.meshVolume(points, triangles), 'min': points.min(axis = 0).tolist(), 'max': points.max(axis = 0).tolist()}
+	samples = [hm.surfaceSamples(points, triangles, spacing, withTriangles = True) for points, triangles in (mesh, reference)]
+	dNew, j = surfaceDistance(samples[0][0], reference, samples[1][0], samples[1][2])
+	dRef, j = surfaceDistance(samples[1][0], mesh, samples[0][0], samples[0][2])
+	result['volumeChange'] = result['new']['volume']/result['reference']['volume'] - 1
+	result['bboxChange'] = float(numpy.abs(numpy.subtract(result['new']['min'] + result['new']['max'], result['reference']['min'] + result['reference']['max'])).max())
+	result['hausdorff'] = float(max(dNew.max(), dRef.max()))
+	result['mean'] = float((dNew.sum() + dRef.sum())/(len(dNew) + len(dRef)))
+	result['samples'] = len(dNew) + len(dRef)
+	#Pontos da parte nova longe da referencia: material a mais ou deslocado; pontos da referencia longe da nova: material a menos
+	result['extra'] = deviationClusters(samples[0][0], dNew, tolerance, cell)
+	result['missing'] = deviationClusters(samples[1][0], dRef, tolerance, cell)
+	return result
+
+def passed(result, tolerance, volumeTolerance):
+	return abs(result['volumeChange']) <= volumeTolerance and result['bboxChange'] <= tolerance and result['hausdorff'] <= tolerance
+
+def report(name, result, tolerance, volumeTolerance):
+	lines = ['%-20s %-5s volume %+8.4f%%  caixa %7.3f mm  Hausdorff %7.3f mm  media %6.3f mm  (%d amostras, %.1f s)' % (name,
+			'ok' if passed(result, tolerance, volumeTolerance) else 'FALHA', 100*result['volumeChange'], result['bboxChange'],
+			result['hausdorff'], result['mean'], result['samples'], result['time'])]
+	for key, label in (('extra', 'a mais'), ('missing', 'a menos')):
+		for p, d, n in result[key]:
+			lines.append('    %-8s %7.3f mm em (%.2f, %.2f, %.2f), %d amostras' % (label, d, p[0], p[1], p[2], n))
+	return '\n'.join(lines)
+
+def parseArgs(args):
+	parser = argparse.ArgumentParser(prog = 'horus_regress.py', description = 'Compara as partes reconstruidas com as malhas OBJ de referencia.')
+	parser.add_argument('parts', nargs = '*', default = hf.horusParts, help = 'partes a comparar (padrao: todas)')
+	parser.add_argument('--refdir', default = referenceDir, help = 'diretorio das malhas de referencia (<parte>.obj)')
+	parser.add_argument('--build-frame', action = 'store_true', help = 'compara as partes na posicao de construcao (referencias exportadas sem --assembled)')
+	parser.add_argument('-s', '--spacing', type = float, default = 1.0, help = 'espacamento das amostras das superficies [mm]')
+	parser.add_argument('--tolerance', type = float, default = 0.2, help = 'desvio maximo aceito (Hausdorff e caixa envolvente) [mm]')
+	parser.add_argument('--volume-tolerance', type = float, default = 2e-3, help = 'variacao relativa maxima aceita do volume')
+	parser.add_argument('--cell', type = float, default = 5.0, help = 'tamanho das regioes do relatorio de desvios [mm]')
+	parser.add_argument('-t', '--deflection', type = float, help = 'deflexao linear da tesselagem [mm] (padrao: horus_mesh.partDeflection)')
+	parser.add_argument('-j', '--jobs', type = int, default = 1, help = 'numero de processos de construcao em paralelo')
+	parser.add_argument('--cache', default = defaultCacheDir, help = 'diretorio do cache de formas (BREP)')
+	parser.add_argument('--no-cache', action = 'store_true', help = 'constroi tudo sem consultar o cache')
+	parser.add_argument('-o', '--output', help = 'arquivo JSON com os resultados')
+	opts = parser.parse_args(args)
+	for name in opts.parts:
+		if name not in hf.horusParts:
+			parser.error('parte desconhecida: %s (opcoes: %s)' % (name, ', '.join(hf.horusParts)))
+	return opts
+
+def main(args):
+	opts = parseArgs(args)
+	cache = None if opts.no_cache else BrepCache(opts.cache)
+	if opts.build_frame:
+		parts = hf.buildParallel(opts.parts, opts.jobs, cache)
+	else:
+		parts = hf.assemble(hf.buildParallel(hf.horusParts, opts.jobs, cache))
+	results, failed = {}, []
+	for name in opts.parts:
+		t0 = time.perf_counter()
+		lin, ang = hm.partDeflection.get(name, hm.defaultDeflection)
+		mesh = hm.tessellate(parts[name], lin if opts.deflection is None else opts.deflection, ang)
+		reference = hm.readObj(os.path.join(opts.refdir, fileBase(name) + '.obj'))
+		results[name] = compareMeshes(mesh, reference, opts.spacing, opts.tolerance, opts.cell)
+		results[name]['time'] = time.perf_counter() - t0
+		print(report(name, results[name], opts.tolerance, opts.volume_tolerance))
+		if not passed(results[name], opts.tolerance, opts.volume_tolerance):
+			failed.append(name)
+	if opts.output:
+		with open(opts.output, 'w') as f:
+			json.dump(results, f, indent = 2)
+	print('%d de %d partes iguais as referencias%s' % (len(results) - len(failed), len(results), ' (falharam: %s)' % ', '.join(failed) if failed else ''))
+	return 1 if failed else 0
+
+if __name__ == '__main__':
+	sys.exit(main(scriptArgs(__file__)))
@@ -0,0 +1,154 @@
+# coding: utf-8
+
+"""
+Copyright 2021 João T. Carvalho-Neto, Fernando A. Pedersen and Matheus N. S. Silva
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+****************************************
+Stellector Project Horus 3D parts.
+
+Tracing of the shape operations of the builders
+****************************************
+"""
+
+import sys, os, time, json, ast, inspect
+import argparse
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import horus_freecad as hf
+from horus_build import scriptArgs
+from FreeCAD import Part
+
+
+#Metodos das formas registrados em cada chamada e funcoes auxiliares registradas como um todo
+tracedOps = ['cut', 'fuse', 'common', 'removeSplitter']
+tracedHelpers = ['makePoly', 'makePlate', 'makeDrop', 'makeRing', 'mirrorX', 'mirrorY', 'mirrorZ', 'encaixePar']
+
+def faceCount(x):
+	if isinstance(x, Part.Shape):
+		return len(x.Faces)
+	if isinstance(x, (list, tuple)):
+		return sum(faceCount(s) for s in x)
+	return 0
+
+class _OpRewriter(ast.NodeTransformer):
+	"""Troca 'x.cut(...)' e 'getattr(x, op)(...)' por '_traceOp(op, x, linha, ...)'."""
+	def visit_Call(self, node):
+		self.generic_visit(node)
+		f = node.func
+		if isinstance(f, ast.Attribute) and f.attr in tracedOps:
+			op, obj = ast.Constant(f.attr), f.value
+		elif isinstance(f, ast.Call) and isinstance(f.func, ast.Name) and f.func.id == 'getattr' and len(f.args) == 2:
+			op, obj = f.args[1], f.args[0]
+		else:
+			return node
+		new = ast.Call(func = ast.Name('_traceOp', ast.Load()), args = [op, obj, ast.Constant(node.lineno)] + node.args, keywords = node.keywords)
+		return ast.fix_missing_locations(ast.copy_location(new, node))
+
+class Tracer(object):
+	def __init__(self):
+		"""Registro das operacoes (eventos 'X' do formato Chrome/Perfetto, tempos em microssegundos)."""
+		self.events = []
+		self.t0 = time.perf_counter()
+	def now(self):
+		return (time.perf_counter() - self.t0)*1e6
+	def record(self, name, cat, t0, t1, **args):
+		self.events.append({'name': name, 'cat': cat, 'ph': 'X', 'ts': t0, 'dur': t1 - t0, 'pid': os.getpid(), 'tid': 0, 'args': args})
+	def op(self, op, obj, line, *args, **kw):
+		if not isinstance(obj, Part.Shape):
+			return getattr(obj, op)(*args, **kw)
+		facesIn = [faceCount(obj)] + [faceCount(a) for a in args if faceCount(a)]
+		t0 = self.now()
+		result = getattr(obj, op)(*args, **kw)
+		t1 = self.now()
+		self.record(op, 'boolean', t0, t1, line = '%s:%d' % (os.path.basename(hf.__file__), line),
+					function = sys._getframe(1).f_code.co_name, facesIn = facesIn, facesOut = faceCount(result))
+		return result
+	def wrap(self, func, cat, name = None):
+		name = name or func.__name__
+		line = func.__code__.co_firstlineno
+		def traced(*args, **kw):
+			t0 = self.now()
+			result = func(*args, **kw)
+			self.record(name, cat, t0, self.now(), line = '%s:%d' % (os.path.basename(hf.__file__), line),
+						function = func.__name__, facesOut = faceCount(result))
+			return result
+		return traced
+	def chromeTrace(self, fileName):
+		"""Grava o arquivo JSON para chrome://tracing ou ui.perfetto.dev."""
+		with open(fileName, 'w') as f:
+			json.dump({'traceEvents': self.events, 'displayTimeUnit': 'ms'}, f)
+	def summary(self, top = 20):
+		"""As 'top' operacoes (por linha de codigo) de maior tempo total."""
+		total = {}
+		for e in self.events:
+			if e['cat'] == 'boolean':
+				k = (e['args']['line'], e['name'], e['args']['function'])
+				n, dt, fin, fout = total.get(k, (0, 0.0, 0, 0))
+				total[k] = (n + 1, dt + e['dur'], fin + sum(e['args']['facesIn']), fout + e['args']['facesOut'])
+		lines = ['%-24s %-15s %-22s %5s %10s %9s %9s' % ('linha', 'operacao', 'funcao', 'n', 'tempo', 'faces in', 'faces out')]
+		for (line, op, func), (n, dt, fin, fout) in sorted(total.items(), key = lambda x: -x[1][1])[:top]:
+			lines.append('%-24s %-15s %-22s %5d %8.3f s %9d %9d' % (line, op, func, n, dt*1e-6, fin//n, fout//n))
+		parts = [e for e in self.events if e['cat'] == 'builder']
+		lines.append('')
+		lines.extend('%-24s %8.3f s' % (e['name'], e['dur']*1e-6) for e in sorted(parts, key = lambda e: -e['dur']))
+		return '\n'.join(lines)
+
+def tracedModule(tracer, module = hf):
+	"""Copia do espaco de nomes do modulo com as funcoes e classes recompiladas para registrar as operacoes
+	das formas (mesmos numeros de linha), as funcoes auxiliares e as construtoras registradas no tracer.
+	O modulo original nao e alterado; o build() da copia constroi as partes rastreadas (sem cache)."""
+	tree = ast.parse(inspect.getsource(module), module.__file__)
+	nodes = [n for n in tree.body if isinstance(n, (ast.FunctionDef, ast.ClassDef))]
+	for n in nodes:
+		n.decorator_list = []
+	ns = dict(vars(module))
+	exec(compile(_OpRewriter().visit(ast.Module(body = nodes, type_ignores = [])), module.__file__, 'exec'), ns)
+	ns['_traceOp'] = tracer.op
+	ns['_primitives'] = {}
+	for name in tracedHelpers:
+		ns[name] = tracer.wrap(ns[name], 'helper')
+	ns['_builders'] = {}
+	for name, (func, deps) in module._builders.items():
+		ns['_builders'][name] = (tracer.wrap(ns[func.__name__], 'builder', name), deps)
+	return ns
+
+def traceBuild(names, tracer = None):
+	"""Constroi as partes com o rastreamento ligado; retorna (partes, tracer)."""
+	tracer = Tracer() if tracer is None else tracer
+	parts = tracedModule(tracer)['build'](names)
+	return parts, tracer
+
+def parseArgs(args):
+	parser = argparse.ArgumentParser(prog = 'horus_trace.py', description = 'Rastreia as operacoes de forma na construcao das partes do Horus.')
+	parser.add_argument('parts', nargs = '*', default = hf.horusParts, help = 'partes a construir (padrao: todas)')
+	parser.add_argument('-o', '--output', default = 'horus_trace.json', help = 'arquivo de rastreamento (Chrome/Perfetto)')
+	parser.add_argument('-n', '--top', type = int, default = 20, help = 'numero de operacoes no resumo')
+	opts = parser.parse_args(args)
+	for name in opts.parts:
+		if name not in hf.horusParts:
+			parser.error('parte desconhecida: %s (opcoes: %s)' % (name, ', '.join(hf.horusParts)))
+	return opts
+
+def main(args):
+	opts = parseArgs(args)
+	parts, tracer = traceBuild(opts.parts)
+	tracer.chromeTrace(opts.output)
+	print(tracer.summary(opts.top))
+	print('%d operacoes -> %s' % (len(tracer.events), opts.output))
+
+if __name__ == '__main__':
+	main(scriptArgs(__file__))
@@ -27,13 +27,13 @@ FreeCAD Python scripting codes
 *************************************************************************
 """
 
-import sys, os
-sys.path.append('/home/joao/Venus/Codigos/FreeCAD/myFreeCAD')
-
-import math
+import sys, os, math
+import numpy
+import FreeCAD
 from FreeCAD import Base
 from FreeCAD import Part
-import myFreeCAD as myf
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from spiralCoil_params import *
 
 
 
@@ -59,25 +59,50 @@ def makeRing(rext, rint, height):
 	c = Part.makeCylinder(rext, height)
 	return c.cut(Part.makeCylinder(rint, height))
 
-def makeFlatCoil(rint, rext, height, thickness, turns, stepsPerTurn = 50):	
+def spiralCurves(rint, rext, thickness, turns, stepsPerTurn = 50, tolerance = None):
+	"""Curvas interna e externa (arrays n x 3) da espiral de Arquimedes da mola plana.
+	Sem tolerancia, usa stepsPerTurn pontos por volta; com tolerancia cordal [mm], o passo angular
+	se adapta ao raio de curvatura local (mesma amostragem angular para as duas curvas)."""
 	N = turns*stepsPerTurn
 	da = 2.0*math.pi/stepsPerTurn
-	rout = rext - thickness
-	dr = (rout - rint)/(N-1)
-	traj = []	
-	for i in range(N+1):
-		r = rint + i*dr
-		traj.append([r*math.cos(i*da),r*math.sin(i*da),0])   
-	for i in range(N, -1, -1):		
-		r = rint + i*dr + thickness
-		traj.append([r*math.cos(i*da),r*math.sin(i*da),0])   	
-	return makePlate(traj, VZ*height, True)
+	b = (rext - thickness - rint)/(N-1)/da   #r = rint + b*theta
+	if tolerance is None:
+		theta = numpy.arange(N+1)*da
+	else:
+		fine = numpy.linspace(0.0, N*da, 16*N+1)
+		r = rint + thickness + b*fine
+		rho = (r**2 + b**2)**1.5/(r**2 + 2*b**2)   #raio de curvatura da espiral
+		dtheta = numpy.sqrt(8*rho*tolerance/(r**2 + b**2))   #passo com flecha da corda igual a tolerancia
+		count = numpy.concatenate([[0.0], numpy.cumsum(numpy.diff(fine)*(1/dtheta[1:] + 1/dtheta[:-1])/2)])
+		theta = numpy.interp(numpy.linspace(0.0, count[-1], int(math.ceil(count[-1]))+1), count, fine)
+	r = rint + b*theta
+	c, s = numpy.cos(theta), numpy.sin(theta)
+	inner = numpy.column_stack([r*c, r*s, numpy.zeros_like(r)])
+	outer = numpy.column_stack([(r+thickness)*c, (r+thickness)*s, numpy.zeros_like(r)])
+	return inner, outer
+
+def makeFlatCoil(rint, rext, height, thickness, turns, stepsPerTurn = 50, mode = 'polygon', tolerance = 0.01):
+	"""Mola plana em espiral de Arquimedes. mode: 'polygon' (stepsPerTurn lados por volta), 'polyline'
+	(lados adaptados a tolerancia cordal) ou 'bspline' (curvas interna e externa suaves, 6 faces)."""
+	if mode == 'bspline':
+		inner, outer = spiralCurves(rint, rext, thickness, turns, stepsPerTurn)
+		edges = []
+		for pts in (inner, outer[::-1]):
+			bs = Part.BSplineCurve()
+			bs.interpolate([Base.Vector(*p) for p in pts])
+			edges.append(bs.toShape())
+		pi, po = [Base.Vector(*p) for p in (inner[-1], outer[-1])], [Base.Vector(*p) for p in (outer[0], inner[0])]
+		wire = Part.Wire([edges[0], Part.LineSegment(*pi).toShape(), edges[1], Part.LineSegment(*po).toShape()])
+		return Part.Face(wire).extrude(VZ*height)
+	inner, outer = spiralCurves(rint, rext, thickness, turns, stepsPerTurn, tolerance if mode == 'polyline' else None)
+	return makePlate(numpy.concatenate([inner, outer[::-1]]), VZ*height, True)
 
 class document(object):
 	def __init__(self, name = 'Document'):
 		"""Classe para criacao de documentos gerais no FreeCAD."""
 		self.doc = FreeCAD.newDocument(name)
 		self.featuresDict = {}
+		self.colorsDict = {}
 	def includeFeature(self, feature, featureName):
 		x = self.doc.addObject("Part::Feature",featureName)
 		x.Shape = feature
@@ -90,7 +115,7 @@ class document(object):
 	def addTechDraw(self, featuresList = 'allFeatures', direction = (1.0, 1.0, 1.0), scale = 0.05, pageName = 'Page', templateName = 'Template', viewName = 'View'):
 		page = self.doc.addObject('TechDraw::DrawPage', pageName)
 		template = self.doc.addObject('TechDraw::DrawSVGTemplate', templateName)
-		template.Template = '/tmp/.mount_FreeCA3rQBHp/usr/data/Mod/TechDraw/Templates/A4_LandscapeTD.svg'
+		template.Template = os.path.join(FreeCAD.getResourceDir(), 'Mod', 'TechDraw', 'Templates', 'A4_LandscapeTD.svg')
 		page.Template = template
 		view = self.doc.addObject('TechDraw::DrawViewPart', viewName)
 		page.addView(view)
@@ -101,7 +126,9 @@ class document(object):
 		view.Direction = direction
 		view.Scale = scale
 	def setColor(self, featureName, r, g, b):
-		self.featuresDict[featureName].ViewObject.ShapeColor = (r,g,b)
+		self.colorsDict[featureName] = (r,g,b)
+		if FreeCAD.GuiUp:
+			self.featuresDict[featureName].ViewObject.ShapeColor = (r,g,b)
 
 
 
@@ -109,36 +136,28 @@ class document(object):
 # Spiral coil design for the Stellector Project
 #**********************************************
 
-#Tolerancia da impressora 3D:
-tol = 0.20
-
-coilParams1 = {'rint': 10.5/2+tol/2, 'rext': 19.2 - 4.0, 'height': 5.0, 'thickness': 1.0, 'turns': 3} 
-coilParams2 = {'rint': 10.5/2+tol/2, 'rext': 19.2 - 4.0, 'height': 5.0, 'thickness': 1.0, 'turns': 5} #escolhida
-coilParams3 = {'rint': 10.5/2+tol/2, 'rext': 19.2 - 4.0, 'height': 5.0, 'thickness': 0.5, 'turns': 3} 
-coilParams4 = {'rint': 10.5/2+tol/2, 'rext': 19.2 - 4.0, 'height': 5.0, 'thickness': 0.75, 'turns': 6} 
-coilParams5 = {'rint': 10.5/2+tol/2, 'rext': 22.2 - 4.0, 'height': 5.0, 'thickness': 0.75, 'turns': 2} #escolhida para retracao
-coilParams6 = {'rint': 10.5/2+tol/2, 'rext': 22.2 - 4.0, 'height': 5.0, 'thickness': 1.0, 'turns': 2}
-
-ringParams = {'thickness': 1.0}
+#Parametros da mola e variantes: ver spiralCoil_params.py
 
-lingParams = {'rint': 2.1+tol/2, 'rext':4.5, 'width':4.0, 'thickness': 1.0}
+#Geracao da espiral (ver makeFlatCoil) e tolerancia cordal do modo 'polyline' [mm]. O padrao 'polygon' mantem a
+#geometria das malhas versionadas; 'bspline' e 'polyline' sao escolhidos por variante ('mode') ou em spiralCoil_sweep.py --mode
+coilMode = 'polygon'
+coilTolerance = 0.01
 
-#Criacao do documento:
-doc = document('Mola Plana')
+def molaPart(c, r = ringParams, l = lingParams):
+	espiral = makeFlatCoil(c['rint'],c['rext'],c['height'],c['thickness'],c['turns'],c.get('stepsPerTurn', 50),c.get('mode', coilMode),c.get('tolerance', coilTolerance))
+	anelInterno = makeRing(c['rint']+r['thickness'],c['rint'],c['height'])
 
-c = coilParams4
-r = ringParams
-l = lingParams
-espiral = makeFlatCoil(c['rint'],c['rext'],c['height'],c['thickness'],c['turns'])
-anelInterno = makeRing(c['rint']+r['thickness'],c['rint'],c['height'])
+	linBaseVecs = [[c['rext']-c['thickness'],l['rext'],0], [c['rext']+l['width'],l['rext'],0], [c['rext']+l['width'],-l['rext'],0], [c['rext']-c['thickness'],-l['rext'],0]]
+	lingueta = makePlate(linBaseVecs, VZ*l['thickness'], True)
+	anelInt = Part.makeCylinder(l['rint'], l['thickness'])
+	anelExt = Part.makeCylinder(l['rext'], l['thickness'])
+	anelInt.translate(VX*(c['rext']+l['width']) - 0*VY*l['rext'])
+	anelExt.translate(VX*(c['rext']+l['width']) - 0*VY*l['rext'])
+	lingueta = lingueta.fuse(anelExt).cut(anelInt)
 
-linBaseVecs = [[c['rext']-c['thickness'],l['rext'],0], [c['rext']+l['width'],l['rext'],0], [c['rext']+l['width'],-l['rext'],0], [c['rext']-c['thickness'],-l['rext'],0]]
-lingueta = makePlate(linBaseVecs, VZ*l['thickness'], True)
-anelInt = Part.makeCylinder(l['rint'], l['thickness'])
-anelExt = Part.makeCylinder(l['rext'], l['thickness'])
-anelInt.translate(VX*(c['rext']+l['width']) - 0*VY*l['rext'])
-anelExt.translate(VX*(c['rext']+l['width']) - 0*VY*l['rext'])
-lingueta = lingueta.fuse(anelExt).cut(anelInt)
+	return espiral.fuse(anelInterno).fuse(lingueta)
 
-mola = espiral.fuse(anelInterno).fuse(lingueta)
-doc.includeFeature(mola, 'Mola')
+if __name__ == '__main__':
+	#Criacao do documento:
+	doc = document('Mola Plana')
+	doc.includeFeature(molaPart(coilParams4), 'Mola')
@@ -0,0 +1,142 @@
+# coding: utf-8
+
+"""
+Copyright 2021 João T. Carvalho-Neto, Fernando A. Pedersen and Matheus N. S. Silva
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+****************************************
+Stellector Project spiral coil.
+
+Analytic stiffness and stress model of the flat spiral coil (NumPy, no FreeCAD)
+****************************************
+"""
+
+import sys, os, time, json, math
+import argparse
+import numpy
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import spiralCoil_params as sp
+
+
+#Modulo de elasticidade e tensao de escoamento dos materiais de impressao [MPa]
+materials = {	'PLA': {'E': 3500.0, 'yield': 50.0},
+				'PETG': {'E': 2100.0, 'yield': 45.0},
+				'ABS': {'E': 2000.0, 'yield': 35.0}}
+
+coilKeys = ['rint', 'rext', 'height', 'thickness', 'turns', 'stepsPerTurn']
+
+def spiralLength(a, b, theta):
+	"""Comprimento da espiral de Arquimedes r = a + b*t, de t = 0 a theta (b > 0)."""
+	def s(r):
+		q = numpy.sqrt(r**2 + b**2)
+		return (r*q + b**2*numpy.log(r + q))/(2*b)
+	return s(a + b*theta) - s(a)
+
+def coilModel(rint, rext, height, thickness, turns, E = materials['PLA']['E'], stepsPerTurn = 50):
+	"""Modelo de viga curva da mola de makeFlatCoil (mesma espiral: r = rint + b*theta em 'turns' voltas),
+	com as extremidades engastadas no anel interno e na lingueta e momento fletor uniforme ao longo da lamina.
+	Todos os argumentos podem ser arrays (avaliados em lote, com broadcast). Retorna dicionario de arrays:
+	length [mm], stiffness [N.mm/rad] (M = E*h*t^3*phi/(12*L)), gap [mm] entre espiras, contactAngle [rad]
+	(enrolamento em que as espiras se encostam) e stressPerRad [MPa/rad] (tensao na fibra interna da primeira
+	espira, pela teoria de viga curva de Winkler)."""
+	rint, rext, h, t, n = [numpy.asarray(x, dtype = numpy.float64) for x in (rint, rext, height, thickness, turns)]
+	N = n*stepsPerTurn
+	b = (rext - t - rint)/(N - 1)/(2*math.pi/stepsPerTurn)
+	a = rint + t/2
+	length = spiralLength(a, b, 2*math.pi*n)
+	stiffness = E*h*t**3/(12*length)
+	pitch = 2*math.pi*b
+	gap = pitch - t
+	contactAngle = numpy.where(gap > 0, 2*math.pi*n*(pitch/t - 1), 0.0)
+	ri, ro = a - t/2, a + t/2
+	rn = t/numpy.log(ro/ri)   #raio da linha neutra
+	e = a - rn
+	stressPerRad = stiffness*(rn - ri)/(h*t*e*ri)
+	return {'length': length, 'stiffness': stiffness, 'gap': gap, 'contactAngle': contactAngle, 'stressPerRad': stressPerRad}
+
+def torqueCurve(model, angles):
+	"""Torque [N.mm] e tensao maxima [MPa] (arrays len(angles) x formato do modelo) em cada angulo de enrolamento
+	[graus]; NaN a partir do angulo de contato das espiras, onde o modelo linear deixa de valer."""
+	phi = numpy.radians(numpy.asarray(angles, dtype = numpy.float64)).reshape((-1,) + (1,)*numpy.ndim(model['stiffness']))
+	valid = numpy.abs(phi) < model['contactAngle']
+	torque = numpy.where(valid, model['stiffness']*phi, numpy.nan)
+	stress = numpy.where(valid, model['stressPerRad']*numpy.abs(phi), numpy.nan)
+	return torque, stress
+
+def candidateGrid(grid):
+	"""Produto cartesiano das listas de valores de cada parametro, como arrays 1D (um elemento por candidata)."""
+	keys = [k for k in coilKeys if k in grid]
+	mesh = numpy.meshgrid(*[numpy.asarray(grid[k], dtype = numpy.float64) for k in keys], indexing = 'ij')
+	return {k: m.ravel() for k, m in zip(keys, mesh)}
+
+def rankCoils(candidates, torque, angle, material = materials['PLA'], safety = 2.0, minGap = 0.2, stepsPerTurn = 50):
+	"""Ordena as candidatas (dicionario parametro -> array) pelo erro relativo do torque no angulo de
+	enrolamento [graus] em relacao ao torque desejado [N.mm], descartando as que encostam as espiras, excedem
+	a tensao de escoamento/safety ou tem folga entre espiras menor que minGap. Retorna (indices ordenados, modelo)."""
+	c = candidates
+	model = coilModel(c['rint'], c['rext'], c['height'], c['thickness'], c['turns'], material['E'], stepsPerTurn)
+	T, sigma = torqueCurve(model, [angle])
+	T, sigma = T[0], sigma[0]
+	ok = numpy.isfinite(T) & (sigma <= material['yield']/safety) & (model['gap'] >= minGap)
+	error = numpy.abs(T - torque)/torque
+	idx = numpy.flatnonzero(ok)
+	return idx[numpy.lexsort((sigma[idx], error[idx]))], dict(model, torque = T, stress = sigma, error = error)
+
+def parseArgs(args):
+	parser = argparse.ArgumentParser(prog = 'spiralCoil_model.py', description = 'Modelo analitico da mola plana: ranqueia variantes pelo torque de pre-tensao.')
+	d = sp.coilParams2
+	parser.add_argument('--rint', type = float, nargs = '+', default = [d['rint']])
+	parser.add_argument('--rext', type = float, nargs = '+', default = list(numpy.arange(d['rext'] - 2.0, d['rext'] + 3.05, 0.5)))
+	parser.add_argument('--height', type = float, nargs = '+', default = [d['height'] - 1.0, d['height'], d['height'] + 1.0])
+	parser.add_argument('--thickness', type = float, nargs = '+', default = list(numpy.arange(0.4, 1.55, 0.05)))
+	parser.add_argument('--turns', type = int, nargs = '+', default = list(range(2, 9)))
+	parser.add_argument('--torque', type = float, default = 10.0, help = 'torque desejado [N.mm] no angulo de enrolamento')
+	parser.add_argument('--angle', type = float, default = 180.0, help = 'angulo de enrolamento de trabalho [graus]')
+	parser.add_argument('--material', choices = sorted(materials), default = 'PLA')
+	parser.add_argument('--E', type = float, help = 'modulo de elasticidade [MPa] (padrao: do material)')
+	parser.add_argument('--safety', type = float, default = 2.0, help = 'fator de seguranca sobre a tensao de escoamento')
+	parser.add_argument('--min-gap', type = float, default = 0.2, help = 'folga minima entre espiras [mm] (tolerancia da impressora)')
+	parser.add_argument('-n', '--top', type = int, default = 10, help = 'numero de candidatas na lista')
+	parser.add_argument('-o', '--output', help = 'lista JSON das melhores candidatas (entrada de spiralCoil_sweep.py --list)')
+	return parser.parse_args(args)
+
+def main(args):
+	opts = parseArgs(args)
+	material = dict(materials[opts.material])
+	if opts.E is not None:
+		material['E'] = opts.E
+	for name, c in sorted(sp.coilParts.items()):
+		m = coilModel(c['rint'], c['rext'], c['height'], c['thickness'], c['turns'], material['E'])
+		T, sigma = torqueCurve(m, [opts.angle])
+		print('%s: k=%7.3f N.mm/rad  T=%7.3f N.mm  sigma=%5.1f MPa  folga=%.3f mm' % (name, m['stiffness'], T[0], sigma[0], m['gap']))
+	candidates = candidateGrid(vars(opts))
+	t0 = time.perf_counter()
+	order, model = rankCoils(candidates, opts.torque, opts.angle, material, opts.safety, opts.min_gap)
+	dt = time.perf_counter() - t0
+	best = order[:opts.top]
+	for i in best:
+		print('rext=%5.2f h=%.2f e=%.2f voltas=%d  k=%7.3f N.mm/rad  T=%7.3f N.mm  sigma=%5.1f MPa  folga=%.3f mm' % (candidates['rext'][i],
+			candidates['height'][i], candidates['thickness'][i], candidates['turns'][i], model['stiffness'][i], model['torque'][i], model['stress'][i], model['gap'][i]))
+	n = len(candidates['rint'])
+	print('%d de %d candidatas viaveis, avaliadas em %.3f s (%.0f por segundo)' % (len(order), n, dt, n/max(dt, 1e-9)))
+	if opts.output:
+		keys = [k for k in coilKeys if k in candidates]
+		with open(opts.output, 'w') as f:
+			json.dump([{k: int(candidates[k][i]) if k in ('turns', 'stepsPerTurn') else round(float(candidates[k][i]), 6) for k in keys} for i in best], f, indent = 2)
+
+if __name__ == '__main__':
+	main(sys.argv[1:])
@@ -0,0 +1,53 @@
+# coding: utf-8
+
+"""
+Copyright 2021 João T. Carvalho-Neto, Fernando A. Pedersen and Matheus N. S. Silva
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+****************************************************
+Spiral coil design for the Horus Stellector Project.
+
+Design parameters (pure Python, no FreeCAD)
+****************************************************
+"""
+
+
+#**********************************************
+# Spiral coil design for the Stellector Project
+#**********************************************
+
+#Tolerancia da impressora 3D:
+tol = 0.20
+
+coilParams1 = {'rint': 10.5/2+tol/2, 'rext': 19.2 - 4.0, 'height': 5.0, 'thickness': 1.0, 'turns': 3} 
+coilParams2 = {'rint': 10.5/2+tol/2, 'rext': 19.2 - 4.0, 'height': 5.0, 'thickness': 1.0, 'turns': 5} #escolhida
+coilParams3 = {'rint': 10.5/2+tol/2, 'rext': 19.2 - 4.0, 'height': 5.0, 'thickness': 0.5, 'turns': 3} 
+coilParams4 = {'rint': 10.5/2+tol/2, 'rext': 19.2 - 4.0, 'height': 5.0, 'thickness': 0.75, 'turns': 6} 
+coilParams5 = {'rint': 10.5/2+tol/2, 'rext': 22.2 - 4.0, 'height': 5.0, 'thickness': 0.75, 'turns': 2} #escolhida para retracao
+coilParams6 = {'rint': 10.5/2+tol/2, 'rext': 22.2 - 4.0, 'height': 5.0, 'thickness': 1.0, 'turns': 2}
+
+ringParams = {'thickness': 1.0}
+
+lingParams = {'rint': 2.1+tol/2, 'rext':4.5, 'width':4.0, 'thickness': 1.0}
+
+#Variantes da mola:
+coilParts = {'Mola%d' % (i+1): c for i, c in enumerate([coilParams1, coilParams2, coilParams3, coilParams4, coilParams5, coilParams6])}
+
+def coilGap(rint, rext, thickness, turns, stepsPerTurn = 50):
+	"""Folga radial entre espiras consecutivas da mola gerada por makeFlatCoil."""
+	N = turns*stepsPerTurn
+	dr = (rext - thickness - rint)/(N-1)
+	return dr*stepsPerTurn - thickness
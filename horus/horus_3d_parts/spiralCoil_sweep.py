@@ -0,0 +1,126 @@
+# coding: utf-8
+
+"""
+Copyright 2021 João T. Carvalho-Neto, Fernando A. Pedersen and Matheus N. S. Silva
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+****************************************************
+Spiral coil design for the Horus Stellector Project.
+
+Parameter sweep of the spiral coil variants
+*************************************************************************
+"""
+
+import sys, os, time, json, csv, itertools
+import argparse
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import spiralCoil_freecad as sc
+from horus_build import scriptArgs
+from horus_export import exportShape
+
+
+coilKeys = ['rint', 'rext', 'height', 'thickness', 'turns', 'stepsPerTurn']
+tableKeys = ['name'] + coilKeys + ['volume', 'faces', 'gap', 'buildTime', 'file']
+
+def gridVariants(grid):
+	"""Produto cartesiano das listas de valores de cada parametro (dicionario parametro -> lista)."""
+	keys = [k for k in coilKeys if k in grid]
+	return [dict(zip(keys, values)) for values in itertools.product(*[grid[k] for k in keys])]
+
+def buildVariant(job):
+	"""Constroi (e exporta) uma variante da mola; retorna a linha da tabela de resultados."""
+	name, c, r, l, fileName, tolerance = job
+	c = dict(c)
+	c.setdefault('stepsPerTurn', 50)
+	t0 = time.perf_counter()
+	mola = sc.molaPart(c, r, l)
+	dt = time.perf_counter() - t0
+	if fileName:
+		exportShape(mola, fileName, tolerance)
+	row = {'name': name, 'volume': mola.Volume, 'faces': len(mola.Faces), 'buildTime': dt, 'file': os.path.basename(fileName or '')}
+	row['gap'] = sc.coilGap(c['rint'], c['rext'], c['thickness'], c['turns'], c['stepsPerTurn'])
+	row.update((k, c[k]) for k in coilKeys)
+	return row
+
+def sweep(variants, r = sc.ringParams, l = sc.lingParams, outdir = '.', fmt = 'stl', tolerance = None, jobs = None):
+	"""Constroi todas as variantes (lista de dicionarios de parametros da mola) num conjunto de processos.
+	Retorna as linhas da tabela de resultados, na ordem das variantes."""
+	jobList = []
+	for i, c in enumerate(variants):
+		name = 'mola_%03d' % i
+		fileName = os.path.join(outdir, name + '.' + fmt) if fmt else None
+		jobList.append((name, c, r, l, fileName, tolerance))
+	if jobs == 1:
+		return [buildVariant(job) for job in jobList]
+	import multiprocessing
+	from concurrent.futures import ProcessPoolExecutor
+	with ProcessPoolExecutor(jobs, mp_context = multiprocessing.get_context('fork')) as pool:
+		return list(pool.map(buildVariant, jobList))
+
+def writeTable(rows, baseName):
+	with open(baseName + '.json', 'w') as f:
+		json.dump(rows, f, indent = 2)
+	with open(baseName + '.csv', 'w', newline = '') as f:
+		w = csv.DictWriter(f, fieldnames = tableKeys)
+		w.writeheader()
+		w.writerows(rows)
+
+def keyValues(items):
+	"""['thickness=1.0', ...] -> {'thickness': 1.0, ...}"""
+	return {k: float(v) for k, v in (item.split('=') for item in items)}
+
+def parseArgs(args):
+	d = sc.coilParams4
+	parser = argparse.ArgumentParser(prog = 'spiralCoil_sweep.py', description = 'Constroi e compara variantes da mola plana.')
+	parser.add_argument('--rint', type = float, nargs = '+', default = [d['rint']])
+	parser.add_argument('--rext', type = float, nargs = '+', default = [d['rext']])
+	parser.add_argument('--height', type = float, nargs = '+', default = [d['height']])
+	parser.add_argument('--thickness', type = float, nargs = '+', default = [d['thickness']])
+	parser.add_argument('--turns', type = int, nargs = '+', default = [d['turns']])
+	parser.add_argument('--stepsPerTurn', type = int, nargs = '+', default = [50])
+	parser.add_argument('--mode', choices = ['polygon', 'polyline', 'bspline'], default = sc.coilMode, help = 'geracao da espiral (ver makeFlatCoil)')
+	parser.add_argument('--list', help = 'arquivo JSON com a lista de variantes (substitui a grade)')
+	parser.add_argument('--ring', nargs = '+', default = [], metavar = 'CHAVE=VALOR', help = 'altera ringParams')
+	parser.add_argument('--ling', nargs = '+', default = [], metavar = 'CHAVE=VALOR', help = 'altera lingParams')
+	parser.add_argument('-f', '--format', default = 'stl', choices = ['stl', 'obj', 'step', 'none'], help = 'formato dos arquivos das variantes')
+	parser.add_argument('-t', '--tolerance', type = float, help = 'deflexao linear da tesselagem [mm] (padrao: horus_mesh.defaultDeflection, como em horus_export.py)')
+	parser.add_argument('-d', '--outdir', default = 'sweep', help = 'diretorio de saida')
+	parser.add_argument('-j', '--jobs', type = int, default = None, help = 'numero de processos (padrao: numero de CPUs)')
+	return parser.parse_args(args)
+
+def main(args):
+	opts = parseArgs(args)
+	if opts.list:
+		with open(opts.list) as f:
+			variants = json.load(f)
+	else:
+		variants = gridVariants(vars(opts))
+	for c in variants:
+		c.setdefault('mode', opts.mode)
+	r = dict(sc.ringParams, **keyValues(opts.ring))
+	l = dict(sc.lingParams, **keyValues(opts.ling))
+	if not os.path.isdir(opts.outdir):
+		os.makedirs(opts.outdir)
+	t0 = time.time()
+	rows = sweep(variants, r, l, opts.outdir, None if opts.format == 'none' else opts.format, opts.tolerance, opts.jobs)
+	writeTable(rows, os.path.join(opts.outdir, 'sweep'))
+	for row in rows:
+		print('%s  e=%.2f voltas=%d  V=%8.1f mm3  faces=%5d  folga=%6.3f mm  %6.2f s' % (row['name'], row['thickness'], row['turns'], row['volume'], row['faces'], row['gap'], row['buildTime']))
+	print('%d variantes em %.1f s -> %s' % (len(rows), time.time() - t0, opts.outdir))
+
+if __name__ == '__main__':
+	main(scriptArgs(__file__))